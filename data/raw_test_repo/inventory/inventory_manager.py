@@ -1,5 +1,7 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
-from typing import Dict, List, Optional
+import heapq
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from ..models.product import Item
 
 
@@ -8,23 +10,30 @@ class Store:
     def __init__(self, cap: int=20):
         self.cap = cap
         self._data: Dict[str, Item] = {}
-        self._map: Dict[int, str] = {}
+        self._pos_to_item: Dict[int, Item] = {}
+        self._code_to_pos: Dict[str, int] = {}
+        self._free: List[int] = list(range(cap))
+        self._in_free: Set[int] = set(self._free)
 
     def put(self, obj: Item, pos: Optional[int]=None) ->bool:
-        if obj.code in self._data:
-            curr = self._data[obj.code]
+        curr = self._data.get(obj.code)
+        if curr is not None:
             curr.count += obj.count
             return True
         if pos is not None:
             if pos < 0 or pos >= self.cap:
                 return False
-            if pos in self._map:
+            if pos in self._pos_to_item:
                 return False
-            self._map[pos] = obj.code
+            self._pos_to_item[pos] = obj
+            self._code_to_pos[obj.code] = pos
         else:
-            for i in range(self.cap):
-                if i not in self._map:
-                    self._map[i] = obj.code
+            while self._free:
+                i = heapq.heappop(self._free)
+                self._in_free.discard(i)
+                if i not in self._pos_to_item:
+                    self._pos_to_item[i] = obj
+                    self._code_to_pos[obj.code] = i
                     break
             else:
                 return False
@@ -32,11 +41,13 @@ class Store:
         return True
 
     def rm(self, code: str) ->bool:
-        if code not in self._data:
+        pos = self._code_to_pos.pop(code, None)
+        if pos is None:
             return False
-        for k, v in list(self._map.items()):
-            if v == code:
-                del self._map[k]
+        del self._pos_to_item[pos]
+        if pos not in self._in_free:
+            heapq.heappush(self._free, pos)
+            self._in_free.add(pos)
         del self._data[code]
         return True
 
@@ -44,16 +55,23 @@ class Store:
         return self._data.get(code)
 
     def get_at(self, pos: int) ->Optional[Item]:
-        if pos not in self._map:
-            return None
-        code = self._map[pos]
-        return self._data.get(code)
+        return self._pos_to_item.get(pos)
+
+    def ls(self) ->Iterator[Item]:
+        now = datetime.now()
+        # Same test as Item.check, inlined to skip a call per item
+        return (obj for obj in self._data.values() if obj.count > 0 and (obj
+            .exp is None or now <= obj.exp))
+
+    def ls_list(self) ->List[Item]:
+        return list(self.ls())
 
-    def ls(self) ->List[Item]:
-        return [obj for obj in self._data.values() if obj.check()]
+    def ls_with_pos(self) ->List[Tuple[int, Item]]:
+        now = datetime.now()
+        slots = self._pos_to_item
+        # Same test as Item.check, inlined to skip a call per item
+        return [(p, obj) for p in range(self.cap) if (obj := slots.get(p)) is not
+            None and obj.count > 0 and (obj.exp is None or now <= obj.exp)]
 
     def find(self, code: str) ->Optional[int]:
-        for k, v in self._map.items():
-            if v == code:
-                return k
-        return None
+        return self._code_to_pos.get(code)
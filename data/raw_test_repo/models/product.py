@@ -1,9 +1,10 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime
+from decimal import Decimal
 
-@dataclass
+@dataclass(init=False)
 class Item:
     """
     Summary:
@@ -46,14 +47,39 @@ class Item:
     - exp (Optional[datetime]): The expiration date of the item, if applicable.
     - grp (str): The group classification of the item, useful for categorization.
     """
+    __slots__ = ('code', 'label', 'val', 'count', 'exp', 'grp', '_price')
     code: str
     label: str
     val: float
     count: int
-    exp: Optional[datetime] = None
-    grp: str = 'misc'
+    exp: Optional[datetime]
+    grp: str
+
+    def __init__(self, code: str, label: str, val: float, count: int, exp:
+        Optional[datetime]=None, grp: str='misc'):
+        self.code = code
+        self.label = label
+        self.val = val
+        self.count = count
+        self.exp = exp
+        self.grp = grp
+        self._price: Optional[Tuple[float, Decimal]] = None
+
+    @property
+    def price(self) -> Decimal:
+        """
+        The item's value as a Decimal, converted from `val` on first access
+        and reused until `val` is reassigned.
+
+        Returns:
+            Decimal: The value parsed from the string form of `val`.
+        """
+        cached = self._price
+        if cached is None or cached[0] is not self.val:
+            cached = self._price = (self.val, Decimal(str(self.val)))
+        return cached[1]
 
-    def check(self) -> bool:
+    def check(self, now: Optional[datetime]=None) -> bool:
         """
         Validates the current object's state based on count and expiration.
 
@@ -66,15 +92,22 @@ class Item:
         that can be used in resource management, token validation, or lifecycle
         tracking scenarios.
 
+        Args:
+            now (Optional[datetime]): Timestamp to compare the expiration
+                against. Batch callers can pass a single value for many
+                objects; defaults to the current time.
+
         Returns:
             bool: True if the object is valid (count > 0 and not expired),
                   False otherwise.
         """
         if self.count <= 0:
             return False
-        if self.exp and datetime.now() > self.exp:
-            return False
-        return True
+        if self.exp is None:
+            return True
+        if now is None:
+            now = datetime.now()
+        return now <= self.exp
 
     def mod(self, n: int=1) -> bool:
         """
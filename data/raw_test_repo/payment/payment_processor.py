@@ -1,9 +1,14 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
-from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
-from decimal import Decimal
+from typing import Optional, Protocol
+from decimal import ROUND_HALF_UP, Decimal
+_ZERO = Decimal('0.00')
+_CENT = Decimal('0.01')
+
+
+def _to_cents(amt: Decimal) ->int:
+    return int(amt.quantize(_CENT, rounding=ROUND_HALF_UP).scaleb(2))
 
 
 class TxStatus(Enum):
@@ -22,41 +27,47 @@ class Tx:
     msg: Optional[str] = None
 
 
-class Handler(ABC):
+class Handler(Protocol):
 
-    @abstractmethod
     def proc(self, amt: Decimal) ->Tx:
-        pass
+        ...
 
-    @abstractmethod
     def rev(self, tx: Tx) ->bool:
-        pass
+        ...
 
 
 class Cash(Handler):
 
     def __init__(self):
-        self.bal: Decimal = Decimal('0.00')
+        self._cents: int = 0
+        self._txid_prefix = f'C_{id(self)}'
+
+    @property
+    def bal(self) ->Decimal:
+        if not self._cents:
+            return _ZERO
+        return Decimal(self._cents).scaleb(-2)
 
     def add(self, amt: Decimal) ->None:
-        self.bal += amt
+        self._cents += _to_cents(amt)
 
     def proc(self, amt: Decimal) ->Tx:
-        if self.bal >= amt:
-            self.bal -= amt
-            return Tx(id=f'C_{id(self)}', amt=amt, st=TxStatus.DONE, mth='cash'
-                )
-        return Tx(id=f'C_{id(self)}', amt=amt, st=TxStatus.ERR, mth='cash',
+        cost = _to_cents(amt)
+        if self._cents >= cost:
+            self._cents -= cost
+            return Tx(id=self._txid_prefix, amt=Decimal(cost).scaleb(-2),
+                st=TxStatus.DONE, mth='cash')
+        return Tx(id=self._txid_prefix, amt=amt, st=TxStatus.ERR, mth='cash',
             msg='insufficient')
 
     def rev(self, tx: Tx) ->bool:
         if tx.st == TxStatus.DONE:
-            self.bal += tx.amt
+            self._cents += _to_cents(tx.amt)
             tx.st = TxStatus.RET
             return True
         return False
 
     def ret(self) ->Decimal:
         tmp = self.bal
-        self.bal = Decimal('0.00')
+        self._cents = 0
         return tmp
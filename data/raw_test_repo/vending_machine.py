@@ -15,15 +15,13 @@ class Sys:
     def __init__(self, h: Optional[Handler]=None):
         self.store = Store()
         self.h = h or Cash()
+        self._is_cash = isinstance(self.h, Cash)
+        self._proc = self.h.proc
+        self._rev = self.h.rev
         self._tx: Optional[Tx] = None
 
     def ls(self) ->List[Tuple[int, Item]]:
-        items = []
-        for item in self.store.ls():
-            pos = self.store.find(item.code)
-            if pos is not None:
-                items.append((pos, item))
-        return sorted(items, key=lambda x: x[0])
+        return self.store.ls_with_pos()
 
     def pick(self, pos: int) ->Optional[Item]:
         item = self.store.get_at(pos)
@@ -34,32 +32,32 @@ class Sys:
         return item
 
     def add_money(self, amt: Decimal) ->None:
-        if not isinstance(self.h, Cash):
+        if not self._is_cash:
             raise SysErr('cash not supported')
         self.h.add(amt)
 
     def buy(self, pos: int) ->Tuple[Item, Optional[Decimal]]:
         item = self.pick(pos)
-        tx = self.h.proc(Decimal(str(item.val)))
+        tx = self._proc(item.price)
         self._tx = tx
         if tx.st != TxStatus.DONE:
             raise SysErr(tx.msg or 'tx failed')
         if not item.mod():
-            self.h.rev(tx)
+            self._rev(tx)
             raise SysErr('dispense failed')
         ret = None
-        if isinstance(self.h, Cash):
+        if self._is_cash:
             ret = self.h.ret()
         return item, ret
 
     def cancel(self) ->Optional[Decimal]:
         if not self._tx:
             raise SysErr('no tx')
-        ok = self.h.rev(self._tx)
+        ok = self._rev(self._tx)
         if not ok:
             raise SysErr('rev failed')
         ret = None
-        if isinstance(self.h, Cash):
+        if self._is_cash:
             ret = self.h.ret()
         self._tx = None
         return ret
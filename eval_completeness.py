@@ -1,11 +1,153 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
 import ast
+import gzip
+import hashlib
+import json
 import os
-from typing import Dict, Any, List, Union
+import re
+import shelve
+import sys
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
+import evaluator.completeness
 from evaluator.completeness import ClassCompletenessEvaluator, FunctionCompletenessEvaluator
 from tabulate import tabulate
 
+# ANSI color codes
+GREEN = '\033[92m'
+RED = '\033[91m'
+BLUE = '\033[94m'
+YELLOW = '\033[93m'
+BOLD = '\033[1m'
+ENDC = '\033[0m'
+
+# Table cells keyed by (element required, element present)
+ELEMENT_CELLS = {
+    (True, True): f"{YELLOW}R{ENDC} | {GREEN}✓{ENDC}",
+    (True, False): f"{YELLOW}R{ENDC} | {RED}✗{ENDC}",
+    (False, True): f"- | {GREEN}✓{ENDC}",
+    (False, False): f"- | {RED}✗{ENDC}",
+}
+
+# Matches a line that starts a top-level class or function definition,
+# allowing for a UTF-8 byte order mark on the first line
+TOP_LEVEL_DEFINITION = re.compile(rb'^(?:\xef\xbb\xbf)?(?:async[ \t]+)?(?:class|def)[ \t]', re.MULTILINE)
+
+# Tables with more rows than this are printed without box drawing
+LARGE_TABLE_ROWS = 50
+
+# Maximum number of definitions whose evaluator results are memoized per process
+NODE_CACHE_SIZE = 4096
+
+# Directory holding cached per-file results between runs when the command
+# line enables caching with --cache
+DEFAULT_CACHE_DIR = '.docagent_cache'
+
+# Cached results are only valid for the evaluation code that produced them
+_EVALUATOR_DIGEST = hashlib.sha256(
+    Path(__file__).read_bytes() + Path(evaluator.completeness.__file__).read_bytes()
+).hexdigest()[:16]
+
+def _cache_key(source: bytes) -> str:
+    """
+    Build the result-cache key for a file's contents.
+    
+    Args:
+        source: Raw bytes of the file
+        
+    Returns:
+        Key combining the Python version, the evaluator digest, the module
+        cached EvalItems unpickle from ('__main__' when run as a script) and
+        the SHA-256 of the source
+    """
+    version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    return f"{version}:{_EVALUATOR_DIGEST}:{EvalItem.__module__}:{hashlib.sha256(source).hexdigest()}"
+
+@dataclass
+class EvalItem:
+    """
+    Completeness result for a single class, method or function.
+    
+    Declares __slots__ so the many items held for a large directory carry no
+    per-instance __dict__.
+    
+    Attributes:
+        name: Name of the class or function; methods are prefixed with the
+            class name
+        type: One of 'class', 'method' or 'function'
+        completeness_score: Score between 0 and 1
+        completeness_elements: Whether each docstring element is present
+        element_required: Whether each docstring element is required
+        file: Path of the file the item was found in
+    """
+    __slots__ = ('name', 'type', 'completeness_score', 'completeness_elements',
+                 'element_required', 'file')
+    
+    name: str
+    type: str
+    completeness_score: float
+    completeness_elements: Dict[str, bool]
+    element_required: Dict[str, bool]
+    file: str
+
+# Evaluators shared by every file evaluated in this process; worker processes
+# inherit them when forked or build them once on import
+CLASS_EVALUATOR = ClassCompletenessEvaluator()
+FUNCTION_EVALUATOR = FunctionCompletenessEvaluator()
+
+# Evaluator results keyed by evaluator kind and the digest of a definition's
+# source lines, shared by every file evaluated in this process
+_node_results: Dict[Tuple[str, bytes], Tuple[float, Dict[str, bool], Dict[str, bool]]] = {}
+
+def evaluate_node(evaluator: Union[ClassCompletenessEvaluator, FunctionCompletenessEvaluator],
+                  kind: str, node: ast.AST,
+                  lines: List[bytes]) -> Tuple[float, Dict[str, bool], Dict[str, bool]]:
+    """
+    Evaluate a class or function, reusing the result for identical source.
+    
+    The evaluators only look at the definition itself, so definitions with
+    the same source lines (duplicated helpers, vendored or generated code)
+    share one result. At most NODE_CACHE_SIZE results are kept, dropping the
+    oldest first.
+    
+    Args:
+        evaluator: Evaluator to run on a cache miss
+        kind: Evaluator kind ('class' or 'function'), part of the cache key
+        node: Class or function definition node
+        lines: Source lines of the file, with line endings
+        
+    Returns:
+        Tuple of the completeness score, element scores and element
+        requirements; the dictionaries may be shared and must not be modified
+    """
+    segment = b''.join(lines[node.lineno - 1:node.end_lineno])
+    key = (kind, hashlib.blake2b(segment, digest_size=16).digest())
+    result = _node_results.get(key)
+    if result is None:
+        result = (evaluator.evaluate(node), evaluator.element_scores, evaluator.element_required)
+        if len(_node_results) >= NODE_CACHE_SIZE:
+            del _node_results[next(iter(_node_results))]
+        _node_results[key] = result
+    return result
+
+def read_source(source_file: str) -> bytes:
+    """
+    Read the raw bytes of a Python source file.
+    
+    Args:
+        source_file: Path to the Python file to read
+        
+    Returns:
+        The undecoded file contents
+    """
+    with open(source_file, 'rb') as f:
+        return f.read()
+
 def run_docstring_tests(source_file: str) -> Dict[str, Any]:
     """
     Run comprehensive docstring evaluation tests on a Python source file.
@@ -25,11 +167,42 @@ def run_docstring_tests(source_file: str) -> Dict[str, Any]:
         >>> print(results['functions'][0])
         1.0
     """
-    with open(source_file, 'r', encoding='utf-8') as f:
-        source = f.read()
+    return analyze_source(source_file, read_source(source_file))
+
+def analyze_source(source_file: str, source: bytes) -> Dict[str, Any]:
+    """
+    Evaluate docstrings in already-read Python source.
+    
+    Args:
+        source_file: Path the source was read from, used in the results
+        source: Raw bytes of the file; decoding follows the file's encoding
+            declaration, as with any Python source
+        
+    Returns:
+        Dictionary containing evaluation results in the same format as
+        run_docstring_tests
+    """
+    # Only top-level classes and functions are evaluated, so a file without
+    # an unindented definition has nothing to report and is not parsed
+    if not TOP_LEVEL_DEFINITION.search(source):
+        return {
+            'status': 'success',
+            'file': source_file,
+            'classes': [],
+            'functions': [],
+            'debug_info': {},
+            'statistics': {
+                'total_classes': 0,
+                'total_functions': 0,
+                'average_class_score': 0.0,
+                'average_function_score': 0.0
+            }
+        }
     
     try:
-        tree = ast.parse(source)
+        # Equivalent to ast.parse without type comments or inherited
+        # __future__ flags; only the AST is built, never bytecode
+        tree = compile(source, source_file, 'exec', flags=ast.PyCF_ONLY_AST, dont_inherit=True)
     except SyntaxError as e:
         return {
             'status': 'error',
@@ -44,66 +217,173 @@ def run_docstring_tests(source_file: str) -> Dict[str, Any]:
         'debug_info': {}
     }
     
-    # Instantiate evaluators
-    class_evaluator = ClassCompletenessEvaluator()
-    func_evaluator = FunctionCompletenessEvaluator()
-    
-    # Process all nodes in the AST
-    for node in ast.iter_child_nodes(tree):
-        if isinstance(node, ast.ClassDef):
-            class_result = {
-                'name': node.name,
-                'type': 'class',
-                'completeness_score': class_evaluator.evaluate(node),
-                'completeness_elements': class_evaluator.element_scores,
-                'element_required': class_evaluator.element_required
-            }
+    class_def = ast.ClassDef
+    function_defs = (ast.FunctionDef, ast.AsyncFunctionDef)
+    lines = source.splitlines(keepends=True)
+    
+    # Process all top-level nodes in a single pass over the module body
+    for node in tree.body:
+        node_type = type(node)
+        if node_type is class_def:
+            score, elements, required = evaluate_node(CLASS_EVALUATOR, 'class', node, lines)
+            class_result = EvalItem(
+                name=node.name,
+                type='class',
+                completeness_score=score,
+                completeness_elements=elements,
+                element_required=required,
+                file=source_file
+            )
             results['classes'].append(class_result)
             
             # Evaluate methods within the class
-            for method in [n for n in ast.iter_child_nodes(node) if isinstance(n, ast.FunctionDef)]:
-                # Skip __init__ methods
-                if method.name == '__init__':
+            for method in node.body:
+                # Skip anything that is not a method, and __init__ methods
+                if type(method) not in function_defs or method.name == '__init__':
                     continue
                     
-                method_result = {
-                    'name': f"{node.name}.{method.name}",
-                    'type': 'method',
-                    'completeness_score': func_evaluator.evaluate(method),
-                    'completeness_elements': func_evaluator.element_scores,
-                    'element_required': func_evaluator.element_required
-                }
+                score, elements, required = evaluate_node(FUNCTION_EVALUATOR, 'function', method, lines)
+                method_result = EvalItem(
+                    name=f"{node.name}.{method.name}",
+                    type='method',
+                    completeness_score=score,
+                    completeness_elements=elements,
+                    element_required=required,
+                    file=source_file
+                )
                 results['functions'].append(method_result)
                 
-        elif isinstance(node, ast.FunctionDef):
+        elif node_type in function_defs:
             # Only process top-level functions
-            func_result = {
-                'name': node.name,
-                'type': 'function',
-                'completeness_score': func_evaluator.evaluate(node),
-                'completeness_elements': func_evaluator.element_scores,
-                'element_required': func_evaluator.element_required
-            }
+            score, elements, required = evaluate_node(FUNCTION_EVALUATOR, 'function', node, lines)
+            func_result = EvalItem(
+                name=node.name,
+                type='function',
+                completeness_score=score,
+                completeness_elements=elements,
+                element_required=required,
+                file=source_file
+            )
             results['functions'].append(func_result)
     
     # Add overall statistics
     results['statistics'] = {
         'total_classes': len(results['classes']),
         'total_functions': len(results['functions']),
-        'average_class_score': sum(r['completeness_score'] for r in results['classes']) / 
+        'average_class_score': sum(r.completeness_score for r in results['classes']) / 
                              max(1, len(results['classes'])),
-        'average_function_score': sum(r['completeness_score'] for r in results['functions']) / 
+        'average_function_score': sum(r.completeness_score for r in results['functions']) / 
                                 max(1, len(results['functions']))
     }
     
     return results
 
-def process_directory(directory_path: str) -> Dict[str, Any]:
+def iter_python_files(root: str) -> Iterator[str]:
+    """
+    Recursively yield the paths of Python files below a directory.
+    
+    Uses os.scandir so paths and file types come from the directory listing
+    without extra stat calls. Order matches os.walk: a directory's files are
+    yielded before those of its subdirectories, and unreadable directories
+    are skipped.
+    
+    Args:
+        root: Directory to search
+        
+    Yields:
+        Path of each .py file found
+    """
+    subdirs = []
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.endswith('.py') and not entry.is_dir():
+                    yield entry.path
+    except OSError:
+        return
+    for subdir in subdirs:
+        yield from iter_python_files(subdir)
+
+def _evaluate_in_order(python_files: List[str], readers: ThreadPoolExecutor,
+                       executor: ProcessPoolExecutor, cache: Optional[Any],
+                       window: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Evaluate files in parallel and yield their results in file order.
+    
+    At most `window` files are being read and at most `window` are waiting
+    for or holding a result at any time, so memory stays bounded however
+    large the tree is.
+    
+    Args:
+        python_files: Paths of the files to evaluate
+        readers: Thread pool used to read file contents
+        executor: Process pool used to evaluate files
+        cache: Persistent result cache, or None to evaluate every file
+        window: Maximum number of files in flight at each stage
+        
+    Yields:
+        Tuples of (file path, file result)
+    """
+    paths = iter(python_files)
+    reads = deque()
+    pending = deque()
+    
+    def submit_read() -> None:
+        py_file = next(paths, None)
+        if py_file is not None:
+            reads.append((py_file, readers.submit(read_source, py_file)))
+    
+    for _ in range(window):
+        submit_read()
+    
+    while reads or pending:
+        # Hand loaded files to the process pool as soon as there is room
+        while reads and len(pending) < window:
+            py_file, read = reads.popleft()
+            source = read.result()
+            submit_read()
+            key = _cache_key(source)
+            if cache is not None and key in cache:
+                pending.append((py_file, key, None))
+            else:
+                pending.append((py_file, key, executor.submit(analyze_source, py_file, source)))
+            del source
+        
+        py_file, key, future = pending.popleft()
+        if future is None:
+            file_result = cache[key]
+            # Identical contents may live at another path
+            file_result['file'] = py_file
+            for item in file_result['classes'] + file_result['functions']:
+                item.file = py_file
+        else:
+            file_result = future.result()
+            if cache is not None and file_result['status'] == 'success':
+                cache[key] = file_result
+        yield py_file, file_result
+
+def process_directory(directory_path: str, max_workers: Optional[int] = None,
+                      cache_dir: Optional[str] = None,
+                      output_path: Optional[str] = None) -> Dict[str, Any]:
     """
     Process all Python files in a directory and its subdirectories.
     
+    Files are evaluated in parallel worker processes; results are aggregated
+    in the original file order. When a cache directory is given, results for
+    file contents seen in a previous run are loaded from it instead of being
+    re-evaluated.
+    
     Args:
         directory_path: Path to the directory to analyze
+        max_workers: Number of worker processes (defaults to the CPU count)
+        cache_dir: Directory for the persistent result cache, or None (the
+            default) to evaluate every file without writing anything
+        output_path: If given, per-file results are streamed to this JSON
+            Lines file (gzip-compressed when it ends in .gz) instead of being
+            kept in the returned dictionary; read them back with
+            load_file_results
         
     Returns:
         Dictionary containing aggregated evaluation results for all files
@@ -131,11 +411,7 @@ def process_directory(directory_path: str) -> Dict[str, Any]:
     }
     
     # Find all Python files recursively
-    python_files = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.py'):
-                python_files.append(os.path.join(root, file))
+    python_files = list(iter_python_files(str(directory)))
     
     if not python_files:
         aggregate_results['status'] = 'error'
@@ -144,49 +420,122 @@ def process_directory(directory_path: str) -> Dict[str, Any]:
     
     aggregate_results['statistics']['total_files'] = len(python_files)
     
-    # Process each Python file
-    all_class_scores = []
-    all_function_scores = []
+    # Running score totals; counts come from the class/function statistics
+    class_score_total = 0.0
+    function_score_total = 0.0
     
-    for py_file in python_files:
-        file_result = run_docstring_tests(py_file)
-        
-        if file_result['status'] == 'success':
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_context = shelve.open(os.path.join(cache_dir, 'completeness'))
+    else:
+        cache_context = nullcontext(None)
+    
+    if output_path:
+        open_output = gzip.open if output_path.endswith('.gz') else open
+        output_context = open_output(output_path, 'wt', encoding='utf-8')
+    else:
+        output_context = nullcontext()
+    
+    workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=8) as readers, \
+            ProcessPoolExecutor(max_workers=workers) as executor, \
+            cache_context as cache, output_context as output:
+        # Aggregate in file order; only a bounded window of files is read
+        # and in flight at once
+        results = _evaluate_in_order(python_files, readers, executor, cache, 2 * workers)
+        for py_file, file_result in results:
+            if file_result['status'] != 'success':
+                aggregate_results['statistics']['failed_files'] += 1
+                continue
+            
             aggregate_results['successful_files'] = aggregate_results['statistics']['successful_files'] + 1
-            aggregate_results['file_results'].append(file_result)
             aggregate_results['files'].append(py_file)
             
-            # Accumulate classes and functions with file path context
+            # Accumulate class and function scores
             for class_result in file_result['classes']:
-                class_result['file'] = py_file
-                aggregate_results['classes'].append(class_result)
-                all_class_scores.append(class_result['completeness_score'])
+                class_score_total += class_result.completeness_score
             
             for func_result in file_result['functions']:
-                func_result['file'] = py_file
-                aggregate_results['functions'].append(func_result)
-                all_function_scores.append(func_result['completeness_score'])
+                function_score_total += func_result.completeness_score
+            
+            if output is not None:
+                output.write(json.dumps(file_result, default=asdict) + '\n')
+            else:
+                aggregate_results['file_results'].append(file_result)
+                aggregate_results['classes'].extend(file_result['classes'])
+                aggregate_results['functions'].extend(file_result['functions'])
                 
             # Update statistics
             aggregate_results['statistics']['total_classes'] += file_result['statistics']['total_classes']
             aggregate_results['statistics']['total_functions'] += file_result['statistics']['total_functions']
-        else:
-            aggregate_results['statistics']['failed_files'] += 1
     
     # Calculate average scores
-    if all_class_scores:
-        aggregate_results['statistics']['average_class_score'] = sum(all_class_scores) / len(all_class_scores)
+    statistics = aggregate_results['statistics']
+    total_classes = statistics['total_classes']
+    total_functions = statistics['total_functions']
+    if total_classes:
+        statistics['average_class_score'] = class_score_total / total_classes
     
-    if all_function_scores:
-        aggregate_results['statistics']['average_function_score'] = sum(all_function_scores) / len(all_function_scores)
+    if total_functions:
+        statistics['average_function_score'] = function_score_total / total_functions
     
     # Calculate overall average score (classes and functions combined)
-    all_scores = all_class_scores + all_function_scores
-    if all_scores:
-        aggregate_results['statistics']['overall_average_score'] = sum(all_scores) / len(all_scores)
+    if total_classes or total_functions:
+        statistics['overall_average_score'] = (
+            (class_score_total + function_score_total) / (total_classes + total_functions)
+        )
     
     return aggregate_results
 
+def load_file_results(output_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily read per-file results streamed by process_directory.
+    
+    Args:
+        output_path: JSON Lines file written by process_directory
+        
+    Yields:
+        One run_docstring_tests-style result per successfully processed file,
+        suitable for print_evaluation_results
+    """
+    open_output = gzip.open if output_path.endswith('.gz') else open
+    with open_output(output_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            file_result = json.loads(line)
+            file_result['classes'] = [EvalItem(**item) for item in file_result['classes']]
+            file_result['functions'] = [EvalItem(**item) for item in file_result['functions']]
+            yield file_result
+
+@lru_cache(maxsize=None)
+def format_score(score: float) -> str:
+    """
+    Format a score with two decimals, colored by quality band.
+    
+    Scores are weighted fractions of a handful of docstring elements, so only
+    a few distinct values occur and each formatted string is built once.
+    
+    Args:
+        score: Score between 0 and 1
+        
+    Returns:
+        The score wrapped in green (>= 0.8), yellow (>= 0.5) or red ANSI codes
+    """
+    color = GREEN if score >= 0.8 else YELLOW if score >= 0.5 else RED
+    return f"{color}{score:.2f}{ENDC}"
+
+def table_format(table_data: List[List[Any]]) -> str:
+    """
+    Choose the tabulate format for a results table.
+    
+    Args:
+        table_data: Rows of the table
+        
+    Returns:
+        'grid' for small tables, 'plain' for tables larger than
+        LARGE_TABLE_ROWS, where box drawing dominates the formatting cost
+    """
+    return 'grid' if len(table_data) <= LARGE_TABLE_ROWS else 'plain'
+
 def print_evaluation_results(results: Dict[str, Any]) -> None:
     """
     Pretty print the evaluation results in a readable format with colors.
@@ -194,14 +543,6 @@ def print_evaluation_results(results: Dict[str, Any]) -> None:
     Args:
         results: Dictionary containing evaluation results from run_docstring_tests
     """
-    # ANSI color codes
-    GREEN = '\033[92m'
-    RED = '\033[91m'
-    BLUE = '\033[94m'
-    YELLOW = '\033[93m'
-    BOLD = '\033[1m'
-    ENDC = '\033[0m'
-    
     # Check if this is a directory result or a file result
     is_directory = 'directory' in results
     
@@ -223,36 +564,12 @@ def print_evaluation_results(results: Dict[str, Any]) -> None:
         print(f"\n{BLUE}{BOLD}OVERALL STATISTICS:{ENDC}")
         
         # Add colored statistics
-        class_score = results['statistics']['average_class_score']
-        if class_score >= 0.8:
-            class_score_str = f"{GREEN}{class_score:.2f}{ENDC}"
-        elif class_score >= 0.5:
-            class_score_str = f"{YELLOW}{class_score:.2f}{ENDC}"
-        else:
-            class_score_str = f"{RED}{class_score:.2f}{ENDC}"
-            
-        func_score = results['statistics']['average_function_score']
-        if func_score >= 0.8:
-            func_score_str = f"{GREEN}{func_score:.2f}{ENDC}"
-        elif func_score >= 0.5:
-            func_score_str = f"{YELLOW}{func_score:.2f}{ENDC}"
-        else:
-            func_score_str = f"{RED}{func_score:.2f}{ENDC}"
-            
-        overall_score = results['statistics']['overall_average_score']
-        if overall_score >= 0.8:
-            overall_score_str = f"{GREEN}{overall_score:.2f}{ENDC}"
-        elif overall_score >= 0.5:
-            overall_score_str = f"{YELLOW}{overall_score:.2f}{ENDC}"
-        else:
-            overall_score_str = f"{RED}{overall_score:.2f}{ENDC}"
-        
         stats_data = [
             ['Total Classes', results['statistics']['total_classes']],
             ['Total Functions/Methods', results['statistics']['total_functions']],
-            ['Average Class Score', class_score_str],
-            ['Average Function Score', func_score_str],
-            ['Overall Average Score', overall_score_str]
+            ['Average Class Score', format_score(results['statistics']['average_class_score'])],
+            ['Average Function Score', format_score(results['statistics']['average_function_score'])],
+            ['Overall Average Score', format_score(results['statistics']['overall_average_score'])]
         ]
         print(tabulate(stats_data, tablefmt='simple'))
         
@@ -270,116 +587,79 @@ def print_evaluation_results(results: Dict[str, Any]) -> None:
             print(f"\n{BLUE}{BOLD}CLASSES:{ENDC}")
             
             headers = ['Class Name', 'Score']
-            elements = list(results['classes'][0]['completeness_elements'].keys())
+            elements = list(results['classes'][0].completeness_elements.keys())
             headers.extend(elements)
             
             table_data = []
             for class_result in results['classes']:
-                row = [class_result['name']]
-                score = class_result['completeness_score']
-                # Color the score based on value
-                if score >= 0.8:
-                    score_str = f"{GREEN}{score:.2f}{ENDC}"
-                elif score >= 0.5:
-                    score_str = f"{YELLOW}{score:.2f}{ENDC}"
-                else:
-                    score_str = f"{RED}{score:.2f}{ENDC}"
-                row.append(score_str)
+                row = [class_result.name]
+                row.append(format_score(class_result.completeness_score))
                 
-                for element in elements:
-                    required = class_result['element_required'][element]
-                    has_element = class_result['completeness_elements'][element]
-                    if has_element:
-                        check = f"{GREEN}✓{ENDC}"
-                    else:
-                        check = f"{RED}✗{ENDC}"
-                    cell = f"{YELLOW if required else '-'}{'R' if required else ''}{ENDC if required else ''} | {check}"
-                    row.append(cell)
+                required = class_result.element_required
+                present = class_result.completeness_elements
+                row.extend(ELEMENT_CELLS[required[element], present[element]] for element in elements)
                 
                 table_data.append(row)
                 
-            print(tabulate(table_data, headers=headers, tablefmt='grid'))
+            print(tabulate(table_data, headers=headers, tablefmt=table_format(table_data)))
         
         # Print function/method results table
         if results['functions']:
             print(f"\n{BLUE}{BOLD}FUNCTIONS/METHODS:{ENDC}")
             
             headers = ['Function Name', 'Type', 'Score']
-            elements = list(results['functions'][0]['completeness_elements'].keys())
+            elements = list(results['functions'][0].completeness_elements.keys())
             headers.extend(elements)
             
             table_data = []
             for func_result in results['functions']:
-                row = [func_result['name'], func_result['type']]
-                score = func_result['completeness_score']
-                # Color the score based on value
-                if score >= 0.8:
-                    score_str = f"{GREEN}{score:.2f}{ENDC}"
-                elif score >= 0.5:
-                    score_str = f"{YELLOW}{score:.2f}{ENDC}"
-                else:
-                    score_str = f"{RED}{score:.2f}{ENDC}"
-                row.append(score_str)
+                row = [func_result.name, func_result.type]
+                row.append(format_score(func_result.completeness_score))
                 
-                for element in elements:
-                    required = func_result['element_required'][element]
-                    has_element = func_result['completeness_elements'][element]
-                    if has_element:
-                        check = f"{GREEN}✓{ENDC}"
-                    else:
-                        check = f"{RED}✗{ENDC}"
-                    cell = f"{YELLOW if required else '-'}{'R' if required else ''}{ENDC if required else ''} | {check}"
-                    row.append(cell)
+                required = func_result.element_required
+                present = func_result.completeness_elements
+                row.extend(ELEMENT_CELLS[required[element], present[element]] for element in elements)
                 
                 table_data.append(row)
                 
-            print(tabulate(table_data, headers=headers, tablefmt='grid'))
+            print(tabulate(table_data, headers=headers, tablefmt=table_format(table_data)))
         
         # Print overall statistics
         print(f"\n{BLUE}{BOLD}OVERALL STATISTICS:{ENDC}")
-        stats_data = []
         
         # Add colored statistics
-        class_score = results['statistics']['average_class_score']
-        if class_score >= 0.8:
-            class_score_str = f"{GREEN}{class_score:.2f}{ENDC}"
-        elif class_score >= 0.5:
-            class_score_str = f"{YELLOW}{class_score:.2f}{ENDC}"
-        else:
-            class_score_str = f"{RED}{class_score:.2f}{ENDC}"
-            
-        func_score = results['statistics']['average_function_score']
-        if func_score >= 0.8:
-            func_score_str = f"{GREEN}{func_score:.2f}{ENDC}"
-        elif func_score >= 0.5:
-            func_score_str = f"{YELLOW}{func_score:.2f}{ENDC}"
-        else:
-            func_score_str = f"{RED}{func_score:.2f}{ENDC}"
-            
         stats_data = [
             ['Total Classes', results['statistics']['total_classes']],
             ['Total Functions/Methods', results['statistics']['total_functions']],
-            ['Average Class Score', class_score_str],
-            ['Average Function Score', func_score_str]
+            ['Average Class Score', format_score(results['statistics']['average_class_score'])],
+            ['Average Function Score', format_score(results['statistics']['average_function_score'])]
         ]
         print(tabulate(stats_data, tablefmt='simple'))
 
 if __name__ == "__main__":
     # Example usage
-    import sys
+    # Caching writes DEFAULT_CACHE_DIR into the working directory, so it is opt-in
+    args = [arg for arg in sys.argv[1:] if arg != '--cache']
+    use_cache = len(args) < len(sys.argv) - 1
     
-    if len(sys.argv) < 2:
-        print("Usage: python eval_completeness.py <path_to_python_file_or_directory>")
+    if not args:
+        print("Usage: python eval_completeness.py [--cache] <path_to_python_file_or_directory> [output.jsonl[.gz]]")
         sys.exit(1)
     
-    path = sys.argv[1]
+    path = args[0]
     if not Path(path).exists():
         print(f"Error: Path not found: {path}")
         sys.exit(1)
     
     if Path(path).is_dir():
         # Process directory
-        results = process_directory(path)
+        # Optionally stream per-file results to a JSON Lines file
+        output_path = args[1] if len(args) > 1 else None
+        results = process_directory(
+            path,
+            cache_dir=DEFAULT_CACHE_DIR if use_cache else None,
+            output_path=output_path
+        )
         if results['status'] == 'success':
             print_evaluation_results(results)
         else:
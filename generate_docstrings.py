@@ -27,10 +27,15 @@ import json
 import argparse
 import logging
 import random
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Dict, List, Set, Optional, Any
-from collections import defaultdict
-import tiktoken  # Add this import for token counting
+from typing import Dict, List, Set, Optional, Any, Tuple, TYPE_CHECKING
+from collections import defaultdict, deque
+from functools import lru_cache
 
 # Setup logging
 logging.basicConfig(
@@ -47,27 +52,100 @@ from src.dependency_analyzer import (
     CodeComponent, 
     DependencyParser, 
     dependency_first_dfs, 
-    build_graph_from_components
+    build_graph_from_components,
+    parse_source
 )
 from src.visualizer import ProgressVisualizer
-from src.agent.orchestrator import Orchestrator
 
+# The tokenizer and the orchestrator (with its LLM clients) are imported
+# lazily, so --help and placeholder runs do not pay for loading them
+if TYPE_CHECKING:
+    from src.agent.orchestrator import Orchestrator
 
-def generate_test_docstring(component: CodeComponent) -> str:
+
+# Parsed files keyed by path, holding (mtime, source, tree, symbol_index);
+# entries are dropped whenever set_docstring_in_file rewrites the file.
+_ast_cache: Dict[str, Tuple[float, str, ast.AST, Dict[tuple, ast.AST]]] = {}
+
+
+def _build_symbol_index(tree: ast.AST) -> Dict[tuple, ast.AST]:
     """
-    Generate a placeholder docstring for test mode.
+    Index the top-level functions, classes and methods of a parsed file.
+    
+    Keys are ('function', name), ('class', name) and ('method', class_name, name).
+    When a name is defined more than once, the first definition wins, and methods
+    are only indexed for the first class of a given name.
     
     Args:
-        component: The code component to generate a placeholder docstring for.
+        tree: The parsed module.
         
     Returns:
-        A placeholder docstring based on the component type.
+        A dictionary mapping symbol keys to their AST nodes.
     """
-    comp_type = component.component_type
-    name = component.id.split(".")[-1]
+    index = {}
+    for node in ast.iter_child_nodes(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            index.setdefault(("function", node.name), node)
+        elif isinstance(node, ast.ClassDef) and ("class", node.name) not in index:
+            index[("class", node.name)] = node
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    index.setdefault(("method", node.name, item.name), item)
+    return index
+
+
+def _symbol_key(component: CodeComponent) -> tuple:
+    """
+    Build the symbol index key for a component.
     
-    if comp_type == "function":
-        return f"""
+    Args:
+        component: The code component to look up.
+        
+    Returns:
+        The key under which _build_symbol_index stores the component's node.
+    """
+    component_parts = component.id.split(".")
+    if component.component_type == "method":
+        return ("method", *component_parts[-2:])
+    return (component.component_type, component_parts[-1])
+
+
+def _load_tree(file_path: str) -> Tuple[str, ast.AST, Dict[tuple, ast.AST]]:
+    """
+    Read and parse a Python file, reusing the cached tree while the file is unchanged.
+    
+    Args:
+        file_path: Path to the Python file.
+        
+    Returns:
+        A tuple of (source, ast_tree, symbol_index) for the file.
+    """
+    mtime = os.path.getmtime(file_path)
+    cached = _ast_cache.get(file_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1:]
+    
+    with open(file_path, "r", encoding="utf-8") as f:
+        source = f.read()
+    tree = parse_source(source, file_path)
+    index = _build_symbol_index(tree)
+    _ast_cache[file_path] = (mtime, source, tree, index)
+    return source, tree, index
+
+
+class _SanitizeTable(dict):
+    """Translation table mapping every non-alphanumeric character to '_', filled lazily."""
+    
+    def __missing__(self, codepoint: int) -> int:
+        self[codepoint] = codepoint if chr(codepoint).isalnum() else ord('_')
+        return self[codepoint]
+
+
+_SANITIZE_TABLE = _SanitizeTable()
+
+
+# Placeholder docstrings for test mode, formatted with the component name
+_FUNCTION_DOCSTRING_TEMPLATE = """
         Test docstring for function '{name}'.
         
         This is a placeholder docstring generated in test mode.
@@ -80,8 +158,8 @@ def generate_test_docstring(component: CodeComponent) -> str:
         Returns:
             Description of return value
         """
-    elif comp_type == "class":
-        return f"""
+
+_CLASS_DOCSTRING_TEMPLATE = """
         Test docstring for class '{name}'.
         
         This is a placeholder docstring generated in test mode.
@@ -91,9 +169,8 @@ def generate_test_docstring(component: CodeComponent) -> str:
             attr1: Description of first attribute
             attr2: Description of second attribute
         """
-    elif comp_type == "method":
-        class_name = component.id.split(".")[-2]
-        return f"""
+
+_METHOD_DOCSTRING_TEMPLATE = """
         Test docstring for method '{name}' in class '{class_name}'.
         
         This is a placeholder docstring generated in test mode.
@@ -106,15 +183,39 @@ def generate_test_docstring(component: CodeComponent) -> str:
         Returns:
             Description of return value
         """
-    else:
-        return f"""
+
+_DEFAULT_DOCSTRING_TEMPLATE = """
         Test docstring for {comp_type} '{name}'.
         
         This is a placeholder docstring generated in test mode.
         """
 
 
-def generate_docstring_for_component(component: CodeComponent, orchestrator: Optional[Orchestrator], test_mode: str = 'none',
+def generate_test_docstring(component: CodeComponent) -> str:
+    """
+    Generate a placeholder docstring for test mode.
+    
+    Args:
+        component: The code component to generate a placeholder docstring for.
+        
+    Returns:
+        A placeholder docstring based on the component type.
+    """
+    comp_type = component.component_type
+    name = component.id.split(".")[-1]
+    
+    if comp_type == "function":
+        return _FUNCTION_DOCSTRING_TEMPLATE.format(name=name)
+    elif comp_type == "class":
+        return _CLASS_DOCSTRING_TEMPLATE.format(name=name)
+    elif comp_type == "method":
+        class_name = component.id.split(".")[-2]
+        return _METHOD_DOCSTRING_TEMPLATE.format(name=name, class_name=class_name)
+    else:
+        return _DEFAULT_DOCSTRING_TEMPLATE.format(comp_type=comp_type, name=name)
+
+
+def generate_docstring_for_component(component: CodeComponent, orchestrator: Optional["Orchestrator"], test_mode: str = 'none',
                                      dependency_graph: Optional[Dict[str, List[str]]] = None) -> str:
     """
     Generate a docstring for a single component.
@@ -138,52 +239,46 @@ def generate_docstring_for_component(component: CodeComponent, orchestrator: Opt
     # Get the component code
     component_code = component.source_code
     
-    # Estimate token count of the focal component
-    encoding = tiktoken.get_encoding("cl100k_base")  # Default OpenAI encoding
-    token_consume_focal = len(encoding.encode(component_code))
+    # Token count of the focal component, precomputed in main when available
+    token_consume_focal = component.token_count
+    tokens = None
+    if token_consume_focal is None:
+        # Every token covers at least one UTF-8 byte, so code of at most 10000
+        # bytes can never need truncating; skip the BPE pass for it and
+        # estimate ~4 characters per token instead.
+        if len(component_code.encode("utf-8")) <= 10000:
+            token_consume_focal = len(component_code) // 4
+        else:
+            # Only the first 10000 tokens are ever kept, and for typical code they
+            # lie within the first 40000 characters; encode that head first and
+            # only tokenize the whole component if the head does not settle it
+            from src.agent.llm.tokenizer import get_encoding
+            encoding = get_encoding("cl100k_base")
+            head = component_code[:40000]
+            tokens = encoding.encode(head)
+            if len(head) == len(component_code):
+                token_consume_focal = len(tokens)
+            elif len(tokens) > 10000:
+                # Truncating anyway; extrapolate the count over the rest of the code
+                token_consume_focal = len(tokens) * len(component_code) // len(head)
+            else:
+                tokens = encoding.encode(component_code)
+                token_consume_focal = len(tokens)
     
     # Skip if the component is too large (> 10000 tokens)
     if token_consume_focal > 10000:
         # truncate the component code to 10000 tokens
-        component_code = encoding.decode(encoding.encode(component_code)[:10000])
-    
-    # Parse the file
-    with open(file_path, "r", encoding="utf-8") as f:
-        file_content = f.read()
+        from src.agent.llm.tokenizer import get_encoding
+        encoding = get_encoding("cl100k_base")  # Default OpenAI encoding
+        if tokens is None:
+            tokens = encoding.encode(component_code)
+        component_code = encoding.decode(tokens[:10000])
     
-    ast_tree = ast.parse(file_content)
-    ast_node = None
+    # Parse the file (shared with set_docstring_in_file until the file is rewritten)
+    _, ast_tree, symbol_index = _load_tree(file_path)
     
     # Locate the AST node for the component
-    component_parts = component.id.split(".")
-    component_name = component_parts[-1]
-    
-    if component.component_type == "function":
-        # Find top-level function
-        for node in ast.iter_child_nodes(ast_tree):
-            if (isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) 
-                    and node.name == component_name):
-                ast_node = node
-                break
-            
-    elif component.component_type == "class":
-        # Find class
-        for node in ast.iter_child_nodes(ast_tree):
-            if isinstance(node, ast.ClassDef) and node.name == component_name:
-                ast_node = node
-                break
-            
-    elif component.component_type == "method":
-        # Find method inside class
-        class_name, method_name = component_parts[-2:]
-        for node in ast.iter_child_nodes(ast_tree):
-            if isinstance(node, ast.ClassDef) and node.name == class_name:
-                for item in node.body:
-                    if (isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) 
-                            and item.name == method_name):
-                        ast_node = item
-                        break
-                break
+    ast_node = symbol_index.get(_symbol_key(component))
     
     try:
         # Pass component.id as the focal_node_dependency_path
@@ -215,73 +310,133 @@ def set_docstring_in_file(file_path: str, component: CodeComponent, docstring: s
         True if successful, False otherwise.
     """
     # Do not use Try/Except here, we want to fail if there is an error
-    # Read the file
-    with open(file_path, "r", encoding="utf-8") as f:
-        source = f.read()
-    
-    # Parse the file
-    tree = ast.parse(source)
+    # Read and parse the file
+    source, tree, symbol_index = _load_tree(file_path)
     
     # Find the component in the parsed AST
-    component_node = None
-    component_parts = component.id.split(".")
-    component_name = component_parts[-1]
-    
-    if component.component_type == "function":
-        # Find top-level function
-        for node in ast.iter_child_nodes(tree):
-            if (isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) 
-                    and node.name == component_name):
-                component_node = node
-                break
-                
-    elif component.component_type == "class":
-        # Find class
-        for node in ast.iter_child_nodes(tree):
-            if isinstance(node, ast.ClassDef) and node.name == component_name:
-                component_node = node
-                break
-                
-    elif component.component_type == "method":
-        # Find method inside class
-        class_name, method_name = component_parts[-2:]
-        for node in ast.iter_child_nodes(tree):
-            if isinstance(node, ast.ClassDef) and node.name == class_name:
-                for item in node.body:
-                    if (isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) 
-                            and item.name == method_name):
-                        component_node = item
-                        break
-                break
+    component_node = symbol_index.get(_symbol_key(component))
     
     if not component_node:
         logger.error(f"Could not find component {component.id} in {file_path}")
         return False
     
-    # Set the docstring
-    set_node_docstring(component_node, docstring)
+    # Remember the statement the docstring goes in front of (or replaces)
+    first_stmt = component_node.body[0]
+    replace_existing = (
+        isinstance(first_stmt, ast.Expr)
+        and isinstance(first_stmt.value, ast.Constant)
+        and isinstance(first_stmt.value.value, str)
+    )
     
-    # Unparse the AST back to source code
-    if hasattr(ast, "unparse"):
-        new_source = ast.unparse(tree)
-    else:
-        try:
-            import astor
-            new_source = astor.to_source(tree)
-        except ImportError:
-            logger.error(
-                "Error: You need to install 'astor' or use Python 3.9+ to unparse the AST. "
-                f"Skipping file: {file_path}"
-            )
-            return False
+    # Set the docstring; the cached tree is mutated from here on, so drop it
+    set_node_docstring(component_node, docstring)
+    _ast_cache.pop(file_path, None)
+    
+    # Splice the docstring into the original text, which keeps the rest of the
+    # file (comments, formatting) intact; otherwise unparse the whole AST
+    new_source = _splice_docstring(source, component_node.body[0], first_stmt, replace_existing)
+    if new_source is None:
+        if hasattr(ast, "unparse"):
+            new_source = ast.unparse(tree)
+        else:
+            try:
+                import astor
+                new_source = astor.to_source(tree)
+            except ImportError:
+                logger.error(
+                    "Error: You need to install 'astor' or use Python 3.9+ to unparse the AST. "
+                    f"Skipping file: {file_path}"
+                )
+                return False
     
     # Write back to the file
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(new_source)
+    _replace_file(file_path, new_source)
     
     return True
 
 
+def _replace_file(file_path: str, content: str):
+    """
+    Write a file by renaming a complete temporary copy over it.
+    
+    Workers documenting other files read this one without taking its lock, so
+    they must see either the old or the new content, never a truncated file.
+    
+    Args:
+        file_path: Path to the file to replace.
+        content: The new file content.
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _splice_docstring(source: str, docstring_node: ast.Expr, first_stmt: ast.stmt,
+                      replace_existing: bool) -> Optional[str]:
+    """
+    Write a docstring statement into the original source text.
+    
+    The docstring either replaces the existing docstring statement or is inserted
+    on its own line in front of the first statement of the body. Bodies that start
+    on the header line (e.g. ``def f(): pass``) are left to the caller.
+    
+    Args:
+        source: The original file content the AST was parsed from.
+        docstring_node: The docstring statement created by set_node_docstring.
+        first_stmt: The first statement of the body before the docstring was set.
+        replace_existing: Whether first_stmt is an existing docstring to replace.
+        
+    Returns:
+        The updated source, or None if the docstring cannot be spliced in.
+    """
+    if not hasattr(ast, "unparse"):
+        return None
+    
+    lines = source.split("\n")
+    
+    def offset(lineno: int, col_offset: int) -> int:
+        # AST columns are UTF-8 byte offsets within the line
+        line = lines[lineno - 1]
+        col = len(line.encode("utf-8")[:col_offset].decode("utf-8"))
+        return sum(len(l) + 1 for l in lines[:lineno - 1]) + col
+    
+    # Rendering a module with just the docstring yields the same literal that
+    # unparsing the whole tree would
+    literal = ast.unparse(ast.Module(body=[docstring_node], type_ignores=[]))
+    
+    if replace_existing:
+        start = offset(first_stmt.lineno, first_stmt.col_offset)
+        end = offset(first_stmt.end_lineno, first_stmt.end_col_offset)
+        return source[:start] + literal + source[end:]
+    
+    # Insert above the first statement (or its decorators) if it starts its own line
+    decorators = getattr(first_stmt, "decorator_list", None)
+    lineno = decorators[0].lineno if decorators else first_stmt.lineno
+    line = lines[lineno - 1]
+    indent = line[:len(line) - len(line.lstrip())]
+    if decorators:
+        if not line.lstrip().startswith("@"):
+            return None
+    elif len(indent.encode("utf-8")) != first_stmt.col_offset:
+        return None
+    
+    start = offset(lineno, 0)
+    return source[:start] + indent + literal + "\n" + source[start:]
+
+
+@lru_cache(maxsize=None)
+def _indent_str(col_offset: int) -> str:
+    """Return the indentation for docstring lines of a node at the given column."""
+    return ' ' * (col_offset + 4)
+
+
 def set_node_docstring(node: ast.AST, docstring: str):
     """
     Safely set or update the docstring on an AST node (ClassDef, FunctionDef, etc.).
@@ -307,16 +462,21 @@ def set_node_docstring(node: ast.AST, docstring: str):
 
     # 3. Determine how many spaces to indent for doc lines plus triple quotes.
     existing_indent = getattr(node, 'col_offset', 0)
-    doc_indent_str = ' ' * (existing_indent + 4)
+    doc_indent_str = _indent_str(existing_indent)
 
     # 4. Build the final string: 
     #    - Start with a newline (so triple quotes appear on a new line).
     #    - Indent all docstring lines.
     #    - End with a newline+same indentation (so the closing triple quotes
     #      line also has the doc_indent_str).
+    #    Like textwrap.indent, whitespace-only lines are left unindented.
+    indented = "\n".join(
+        doc_indent_str + line if line.strip() else line
+        for line in dedented.split("\n")
+    )
     prepared_docstring = (
         "\n"
-        + textwrap.indent(dedented, doc_indent_str)
+        + indented
         + "\n"
         + doc_indent_str
     )
@@ -341,6 +501,205 @@ def set_node_docstring(node: ast.AST, docstring: str):
             node.body.insert(0, docstring_node)
 
 
+def _skip_reason(component_id: str, component: CodeComponent, overwrite_docstrings: bool) -> Optional[str]:
+    """
+    Decide whether a component is left alone, without logging.
+    
+    Args:
+        component_id: The ID of the component.
+        component: The component to check.
+        overwrite_docstrings: Whether existing docstrings should be overwritten.
+        
+    Returns:
+        Why the component is skipped, or None if it should be documented.
+    """
+    # Skip __init__ methods as they don't need docstrings
+    if component.component_type == "method" and component_id.endswith(".__init__"):
+        return "__init__ methods don't need docstrings"
+    
+    # Skip components that already have docstrings of more than 10 words (unless
+    # overwrite_docstrings is True). Eleven words need at least 21 characters, so
+    # shorter docstrings are ruled out without splitting, and the split stops at
+    # the eleventh word instead of building a list of every word.
+    if component.has_docstring and not overwrite_docstrings:
+        docstring = component.docstring
+        if len(docstring) > 20 and len(docstring.split(None, 10)) > 10:
+            return "already has docstring"
+    
+    return None
+
+
+def _should_skip_component(component_id: str, component: CodeComponent, overwrite_docstrings: bool) -> bool:
+    """
+    Decide whether a component is left alone, logging the reason.
+    
+    Args:
+        component_id: The ID of the component.
+        component: The component to check.
+        overwrite_docstrings: Whether existing docstrings should be overwritten.
+        
+    Returns:
+        True if the component should be skipped, False otherwise.
+    """
+    reason = _skip_reason(component_id, component, overwrite_docstrings)
+    if reason is not None:
+        logger.info(f"Skipping {component_id} - {reason}")
+        return True
+    
+    if component.has_docstring and overwrite_docstrings:
+        logger.info(f"Overwriting existing docstring for {component_id}")
+    
+    return False
+
+
+def _process_component(component_id: str, component: CodeComponent, orchestrator: Optional["Orchestrator"],
+                       test_mode: str, dependency_graph: Dict[str, List[str]]) -> bool:
+    """
+    Generate a docstring for a component and write it to the component's file.
+    
+    Args:
+        component_id: The ID of the component.
+        component: The component to document.
+        orchestrator: The orchestrator instance.
+        test_mode: The test mode to use.
+        dependency_graph: The dependency graph passed to the orchestrator.
+        
+    Returns:
+        True if the docstring was written, False otherwise.
+    """
+    # Log the component type
+    comp_type = component.component_type
+    logger.info(f"Processing {comp_type}: {component_id}")
+    
+    # Generate the docstring
+    logger.info(f"Generating docstring for {component_id}")
+    docstring = generate_docstring_for_component(component, orchestrator, test_mode, dependency_graph)
+    
+    # Update the file with the new docstring
+    success = set_docstring_in_file(component.file_path, component, docstring)
+    
+    if success:
+        logger.info(f"Successfully updated docstring for {component_id}")
+    else:
+        logger.error(f"Failed to update docstring for {component_id}")
+    return success
+
+
+def _refresh_file_components(parser: DependencyParser, components: Dict[str, CodeComponent], file_path: str):
+    """
+    Re-parse a file after a docstring insertion so its components have up-to-date line numbers.
+    
+    Args:
+        parser: The parser that built the components.
+        components: The components dictionary to update in place.
+        file_path: The file that was rewritten.
+    """
+    logger.info(f"Re-parsing file {file_path} for updated line numbers")
+    updated_components = parser.reparse_file(file_path)
+    
+    # Update the components dictionary with new line numbers
+    for comp_id, comp in updated_components.items():
+        if comp_id in components:
+            components[comp_id] = comp
+
+
+def process_components_parallel(sorted_components: List[str], graph: Dict[str, Set[str]],
+                                components: Dict[str, CodeComponent], parser: DependencyParser,
+                                orchestrators: List[Optional["Orchestrator"]], visualizer: ProgressVisualizer,
+                                remaining_by_file: Dict[str, Set[str]], test_mode: str,
+                                dependency_graph: Dict[str, List[str]], overwrite_docstrings: bool):
+    """
+    Process components concurrently while still documenting dependencies first.
+    
+    Scheduling follows Kahn's algorithm over the DFS order: a component becomes ready
+    once every dependency that precedes it in sorted_components has finished, so edges
+    left over from unresolved cycles cannot stall the schedule. Ready components run on
+    a thread pool with one orchestrator per worker. Work on a single file is serialized
+    with a per-file lock, since the file is re-read, rewritten and re-parsed for each of
+    its components; components from different files run in parallel.
+    
+    Args:
+        sorted_components: Component IDs in dependency-first order.
+        graph: The dependency graph (component -> set of dependencies).
+        components: The parsed components, refreshed in place after each write.
+        parser: The parser used to re-parse rewritten files.
+        orchestrators: One orchestrator (or None in placeholder mode) per worker.
+        visualizer: The progress visualizer.
+        remaining_by_file: Component IDs not yet finished, grouped by file path.
+        test_mode: The test mode to use.
+        dependency_graph: The dependency graph passed to the orchestrator.
+        overwrite_docstrings: Whether existing docstrings should be overwritten.
+    """
+    # Only dependencies that come earlier in the order gate a component
+    position = {component_id: index for index, component_id in enumerate(sorted_components)}
+    dependents = defaultdict(list)
+    in_degree = {}
+    for component_id in sorted_components:
+        deps = [
+            dep for dep in graph.get(component_id, ())
+            if position.get(dep, len(position)) < position[component_id]
+        ]
+        in_degree[component_id] = len(deps)
+        for dep in deps:
+            dependents[dep].append(component_id)
+    
+    ready = deque(component_id for component_id in sorted_components if in_degree[component_id] == 0)
+    file_locks = defaultdict(threading.Lock)
+    idle_orchestrators = queue.Queue()
+    for worker_orchestrator in orchestrators:
+        idle_orchestrators.put(worker_orchestrator)
+    
+    def release(component_id: str):
+        for dependent in dependents[component_id]:
+            in_degree[dependent] -= 1
+            if in_degree[dependent] == 0:
+                ready.append(dependent)
+    
+    def work(component_id: str, file_path: str) -> bool:
+        worker_orchestrator = idle_orchestrators.get()
+        try:
+            with file_locks[file_path]:
+                # Pick up the component as refreshed by earlier writes to this file
+                component = components[component_id]
+                success = _process_component(component_id, component, worker_orchestrator,
+                                             test_mode, dependency_graph)
+                remaining_by_file[file_path].discard(component_id)
+                if remaining_by_file[file_path]:
+                    _refresh_file_components(parser, components, file_path)
+            return success
+        finally:
+            idle_orchestrators.put(worker_orchestrator)
+    
+    with ThreadPoolExecutor(max_workers=len(orchestrators)) as executor:
+        pending = {}
+        while ready or pending:
+            while ready:
+                component_id = ready.popleft()
+                component = components.get(component_id)
+                if not component:
+                    logger.warning(f"Component {component_id} not found in parsed components")
+                    release(component_id)
+                    continue
+                
+                if _should_skip_component(component_id, component, overwrite_docstrings):
+                    remaining_by_file[component.file_path].discard(component_id)
+                    visualizer.update(component_id, "completed")
+                    release(component_id)
+                    continue
+                
+                visualizer.update(component_id, "processing")
+                pending[executor.submit(work, component_id, component.file_path)] = component_id
+            
+            if not pending:
+                break
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                component_id = pending.pop(future)
+                visualizer.update(component_id, "completed" if future.result() else "error")
+                release(component_id)
+
+
 def main():
     """
     Main entry point for the docstring generation script with flexible component ordering.
@@ -363,6 +722,12 @@ def main():
     - With --overwrite-docstrings flag, existing docstrings will be overwritten
     - This behavior can also be configured in the config.yaml file under docstring_options.overwrite_docstrings
     
+    Parallel processing:
+    - With --num-workers N (N > 1) in 'topo' mode, up to N components are documented concurrently
+    - A component only starts once the dependencies ordered before it are finished
+    - Each worker uses its own orchestrator; components in the same file are processed one at a time
+    - Workers share one rate limiter per provider and model, so the configured limits apply to all of them together
+    
     Web interface integration:
     - With --enable-web flag, the script enables integration with the web UI
     - This allows visualization of the docstring generation process in a web browser
@@ -408,6 +773,12 @@ def main():
         action='store_true',
         help='Overwrite existing docstrings instead of skipping them (default: False)'
     )
+    parser.add_argument(
+        '--num-workers',
+        type=int,
+        default=1,
+        help='Number of components to document concurrently in topo order mode (default: 1)'
+    )
     
     args = parser.parse_args()
     repo_path = args.repo_path
@@ -415,6 +786,7 @@ def main():
     test_mode = args.test_mode
     order_mode = args.order_mode
     overwrite_docstrings = args.overwrite_docstrings
+    num_workers = max(1, args.num_workers)
     
     # Create output directory for dependency graph
     output_dir = os.path.join("output", "dependency_graphs")
@@ -423,14 +795,17 @@ def main():
     # Extract repository name from path for creating a unique filename
     repo_name = os.path.basename(os.path.normpath(repo_path))
     # Create a sanitized version of the repo name (remove special characters)
-    sanitized_repo_name = ''.join(c if c.isalnum() else '_' for c in repo_name)
+    sanitized_repo_name = repo_name.translate(_SANITIZE_TABLE)
     dependency_graph_path = os.path.join(output_dir, f"{sanitized_repo_name}_dependency_graph.json")
     
     # Initialize the orchestrator for docstring generation
     orchestrator = None
+    orchestrator_test_mode = None
     
     # Initialize orchestrator unless we're in placeholder test mode
     if test_mode != 'placeholder':
+        from src.agent.orchestrator import Orchestrator
+        
         logger.info(f"Initializing orchestrator with config: {config_path}")
         # Pass the test_mode to the orchestrator if it's "context_print"
         orchestrator_test_mode = test_mode if test_mode != 'none' else None
@@ -447,6 +822,9 @@ def main():
     else:
         logger.info("Running in PLACEHOLDER TEST MODE with placeholder docstrings (no LLM calls)")
     
+    # Every worker needs its own orchestrator, since agents keep per-request state
+    orchestrators = [orchestrator]
+    
     # Parse the repository to build the dependency graph
     logger.info(f"Parsing repository: {repo_path}")
     parser = DependencyParser(repo_path)
@@ -456,6 +834,22 @@ def main():
     parser.save_dependency_graph(dependency_graph_path)
     logger.info(f"Dependency graph saved to: {dependency_graph_path}")
     
+    # Count tokens for every component that will be documented in one batch;
+    # tiktoken encodes the batch on several threads, so the per-component calls
+    # can skip the tokenizer
+    if orchestrator:
+        component_list = [
+            component for component_id, component in components.items()
+            if _skip_reason(component_id, component, overwrite_docstrings) is None
+        ]
+        from src.agent.llm.tokenizer import get_encoding
+        token_lists = get_encoding("cl100k_base").encode_ordinary_batch(
+            [component.source_code for component in component_list],
+            num_threads=os.cpu_count() or 1
+        )
+        for component, tokens in zip(component_list, token_lists):
+            component.token_count = len(tokens)
+    
     # Build the graph for traversal
     graph = build_graph_from_components(components)
     
@@ -514,67 +908,54 @@ def main():
     # Show dependency statistics
     visualizer.show_dependency_stats()
     
-    # Process components in order determined by DFS traversal
+    # Track the components still to be processed in each file, so we know
+    # whether a file has to be re-parsed after a docstring is written to it
+    remaining_by_file = defaultdict(set)
     for component_id in sorted_components:
         component = components.get(component_id)
-        if not component:
-            logger.warning(f"Component {component_id} not found in parsed components")
-            continue
-        
-        # Skip __init__ methods as they don't need docstrings
-        if component.component_type == "method" and component_id.endswith(".__init__"):
-            logger.info(f"Skipping {component_id} - __init__ methods don't need docstrings")
-            visualizer.update(component_id, "completed")
-            continue
-        
-        # compute the length of docstring if exists (using white space as delimiter)
-        docstring_length = len(component.docstring.split()) if component.has_docstring else 0
-        # Skip components that already have docstrings (unless overwrite_docstrings is True)
-        if component.has_docstring and not overwrite_docstrings and docstring_length > 10:
-            logger.info(f"Skipping {component_id} - already has docstring")
-            visualizer.update(component_id, "completed")
-            continue
-        elif component.has_docstring and overwrite_docstrings:
-            logger.info(f"Overwriting existing docstring for {component_id}")
-        
-        # Update the visualizer
-        visualizer.update(component_id, "processing")
-        
-        # Log the component type
-        comp_type = component.component_type
-        logger.info(f"Processing {comp_type}: {component_id}")
-        
-        # Generate the docstring
-        logger.info(f"Generating docstring for {component_id}")
-        docstring = generate_docstring_for_component(component, orchestrator, test_mode, dependency_graph)
-        
-        # Update the file with the new docstring
-        file_path = component.file_path
-        success = set_docstring_in_file(file_path, component, docstring)
-        
-        if success:
-            logger.info(f"Successfully updated docstring for {component_id}")
-            visualizer.update(component_id, "completed")
+        if component:
+            remaining_by_file[component.file_path].add(component_id)
+    
+    if num_workers > 1 and order_mode == 'topo':
+        # Document independent components concurrently, one orchestrator per worker
+        logger.info(f"Processing components with {num_workers} workers")
+        if test_mode != 'placeholder':
+            orchestrators.extend(
+                Orchestrator(repo_path=repo_path, config_path=config_path, test_mode=orchestrator_test_mode)
+                for _ in range(num_workers - 1)
+            )
         else:
-            logger.error(f"Failed to update docstring for {component_id}")
-            visualizer.update(component_id, "error")
-        
-        # Re-parse the file in case the line numbers changed due to docstring insertion
-        # This is only necessary if there are more components from the same file
-        same_file_components = [
-            comp_id for comp_id in sorted_components 
-            if comp_id != component_id and components[comp_id].file_path == file_path
-        ]
+            orchestrators.extend([None] * (num_workers - 1))
+        process_components_parallel(
+            sorted_components, graph, components, parser, orchestrators, visualizer,
+            remaining_by_file, test_mode, dependency_graph, overwrite_docstrings
+        )
+    else:
+        if num_workers > 1:
+            logger.info("Parallel processing is only available in topo order mode, processing sequentially")
         
-        if same_file_components:
-            logger.info(f"Re-parsing file {file_path} for updated line numbers")
-            parser = DependencyParser(repo_path)
-            updated_components = parser.parse_repository()
+        # Process components in order determined by DFS traversal
+        for component_id in sorted_components:
+            component = components.get(component_id)
+            if not component:
+                logger.warning(f"Component {component_id} not found in parsed components")
+                continue
+            remaining_by_file[component.file_path].discard(component_id)
+            
+            if _should_skip_component(component_id, component, overwrite_docstrings):
+                visualizer.update(component_id, "completed")
+                continue
+            
+            # Update the visualizer
+            visualizer.update(component_id, "processing")
+            
+            success = _process_component(component_id, component, orchestrator, test_mode, dependency_graph)
+            visualizer.update(component_id, "completed" if success else "error")
             
-            # Update the components dictionary with new line numbers
-            for comp_id, comp in updated_components.items():
-                if comp_id in components:
-                    components[comp_id] = comp
+            # Re-parse the file in case the line numbers changed due to docstring insertion
+            # This is only necessary if there are more components from the same file
+            if remaining_by_file[component.file_path]:
+                _refresh_file_components(parser, components, component.file_path)
     
     # Finalize the visualization
     visualizer.finalize()
@@ -602,10 +983,14 @@ def main():
             # Access the rate limiters from agents
             rate_limiters = []
             
-            for agent_name in ['reader', 'writer', 'verifier']:
-                agent = getattr(orchestrator, agent_name, None)
-                if agent and hasattr(agent, 'llm') and hasattr(agent.llm, 'rate_limiter'):
-                    rate_limiters.append(agent.llm.rate_limiter)
+            for worker_orchestrator in orchestrators:
+                for agent_name in ['reader', 'writer', 'verifier']:
+                    agent = getattr(worker_orchestrator, agent_name, None)
+                    if agent and hasattr(agent, 'llm') and hasattr(agent.llm, 'rate_limiter'):
+                        # Agents using the same provider and model share a limiter,
+                        # so count each one once
+                        if not any(limiter is agent.llm.rate_limiter for limiter in rate_limiters):
+                            rate_limiters.append(agent.llm.rate_limiter)
             
             # Print statistics for each rate limiter
             if rate_limiters:
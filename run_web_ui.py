@@ -69,10 +69,7 @@ def main():
     
     # Import and run the web app
     try:
-        # First try to import eventlet to ensure it's properly initialized
-        import eventlet
-        eventlet.monkey_patch()
-        
+        # eventlet has already monkey-patched the stdlib at the top of this module
         from src.web.app import create_app
         
         app, socketio = create_app(debug=args.debug)
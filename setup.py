@@ -34,10 +34,38 @@ visualization_requires = [
 cuda_requires = [
     "torch>=2.0.0",
     "accelerate>=1.4.0",
+    "transformers>=4.48.0",
+    "huggingface-hub>=0.28.0",
+]
+
+# LLM provider SDKs; only the provider set in the agent config is imported
+openai_requires = [
+    "openai>=1.60.1",
+    "langchain-openai>=0.3.2",
+    "langchain-core>=0.3.31",
+]
+
+claude_requires = [
+    "anthropic>=0.45.0",
+    "langchain-anthropic>=0.3.4",
+    "langchain-core>=0.3.31",
+]
+
+gemini_requires = [
+    "google-generativeai>=0.6.0",
+]
+
+providers_requires = openai_requires + claude_requires + gemini_requires + [
+    "langgraph>=0.2.67",
+]
+
+speedups_requires = [
+    "xxhash>=3.0.0",
+    "orjson>=3.9.0",
 ]
 
 # Combine all extras for the 'all' option
-all_requires = dev_requires + web_requires + visualization_requires + cuda_requires
+all_requires = dev_requires + web_requires + visualization_requires + cuda_requires + providers_requires + speedups_requires
 
 setup(
     name="DocstringGenerator",
@@ -72,17 +100,8 @@ setup(
         "code2flow>=2.5.1",
         "pydeps>=3.0.0",
         
-        # AI/LLM related dependencies
-        "anthropic>=0.45.0",
-        "openai>=1.60.1",
-        "langchain-anthropic>=0.3.4",
-        "langchain-openai>=0.3.2",
-        "langchain-core>=0.3.31",
-        "langgraph>=0.2.67",
+        # Token counting (provider SDKs are in the extras below)
         "tiktoken>=0.8.0",
-        "transformers>=4.48.0",
-        "huggingface-hub>=0.28.0",
-        "google-generativeai>=0.6.0",
         
         # Utility packages
         "tqdm>=4.67.1",
@@ -90,26 +109,17 @@ setup(
         "colorama>=0.4.6",
         "termcolor>=2.5.0",
         "pydantic>=2.10.0",
-
-        # Web requirements 
-        "flask>=3.1.0",
-        "flask-socketio>=5.5.1",
-        "eventlet>=0.39.0",
-        "python-socketio>=5.12.1",
-        "python-engineio>=4.11.2",
-        "bidict>=0.23.0",
-        "dnspython>=2.7.0",
-        "six>=1.16.0",
-
-        # CUDA requirements 
-        "torch>=2.0.0",
-        "accelerate>=1.4.0",
     ],
     extras_require={
         "dev": dev_requires,
-        "web": web_requires,  # Keep for potential compatibility, now included in core
+        "web": web_requires,
         "visualization": visualization_requires,
-        "cuda": cuda_requires, # Keep for potential compatibility, now included in core
+        "cuda": cuda_requires,
+        "openai": openai_requires,
+        "claude": claude_requires,
+        "gemini": gemini_requires,
+        "providers": providers_requires,
+        "speedups": speedups_requires,
         "all": all_requires,
     }
 )
\ No newline at end of file
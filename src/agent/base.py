@@ -1,11 +1,49 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from typing import Any, Dict, Optional, List
+import asyncio
+import logging
+import math
 import os
 from pathlib import Path
 
 from .llm.factory import LLMFactory
 from .llm.base import BaseLLM
+from .llm.cache import MAX_CACHED_TEMPERATURE, ResponseCache, get_response_cache
+
+logger = logging.getLogger(__name__)
+
+# Configuration file used when an agent is created without a config path
+_DEFAULT_CONFIG_PATH = "config/agent_config.yaml"
+
+# Response cache database used when cache_enabled is set without a cache_path
+_DEFAULT_CACHE_PATH = "output/cache/llm_responses.sqlite"
+
+class _MemoryView(Sequence):
+    """Read-only view of an agent's memory.
+    
+    Reads go to the agent's current memory list, so the view stays valid
+    across clear_memory() and refresh_memory() without copying anything.
+    """
+    
+    __slots__ = ("_agent",)
+    
+    def __init__(self, agent: "BaseAgent"):
+        self._agent = agent
+    
+    def __getitem__(self, index):
+        return self._agent._memory[index]
+    
+    def __len__(self) -> int:
+        return len(self._agent._memory)
+    
+    def __iter__(self):
+        return iter(self._agent._memory)
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._agent._memory!r})"
+
 
 class BaseAgent(ABC):
     """Base class for all agents in the docstring generation system."""
@@ -20,8 +58,18 @@ class BaseAgent(ABC):
         self.name = name
         self._memory: list[Dict[str, Any]] = []
         
+        # The same messages split the way Claude-style APIs take them, kept
+        # up to date as memory changes so generation does not re-scan it
+        self._system_message: Optional[str] = None
+        self._chat_messages: list[Dict[str, Any]] = []
+        
         # Initialize LLM and parameters from config
         self.llm, self.llm_params = self._initialize_llm(name, config_path)
+        
+        # Optional prompt-to-response cache shared by agents using the same file
+        self._response_cache: Optional[ResponseCache] = None
+        if self.llm_params["cache_enabled"]:
+            self._response_cache = get_response_cache(self.llm_params["cache_path"])
 
     
     def _initialize_llm(self, agent_name: str, config_path: Optional[str] = None) -> tuple[BaseLLM, Dict[str, Any]]:
@@ -36,8 +84,8 @@ class BaseAgent(ABC):
         """
         # Load configuration
         if config_path is None:
-            config_path = "config/agent_config.yaml"
-            print(f"Using default config from {config_path}")
+            config_path = _DEFAULT_CONFIG_PATH
+            logger.debug("Using default config from %s", config_path)
             
         config = LLMFactory.load_config(config_path)
         
@@ -55,10 +103,12 @@ class BaseAgent(ABC):
         llm_params = {
             "max_output_tokens": llm_config.get("max_output_tokens", 4096),
             "temperature": llm_config.get("temperature", 0.1),
-            "model": llm_config.get("model")
+            "model": llm_config.get("model"),
+            "cache_enabled": llm_config.get("cache_enabled", False),
+            "cache_path": llm_config.get("cache_path", _DEFAULT_CACHE_PATH)
         }
 
-        return LLMFactory.create_llm(llm_config), llm_params
+        return LLMFactory.create_llm(llm_config, global_config=config), llm_params
     
     def add_to_memory(self, role: str, content: str) -> None:
         """Add a message to the agent's memory.
@@ -66,9 +116,18 @@ class BaseAgent(ABC):
         Args:
             role: The role of the message sender (e.g., 'system', 'user', 'assistant')
             content: The content of the message
+            
+        Raises:
+            ValueError: If content is empty or None
         """
-        assert content is not None and content != "", "Content cannot be empty"
-        self._memory.append(self.llm.format_message(role, content))
+        if not content:
+            raise ValueError("Content cannot be empty")
+        message = self.llm.format_message(role, content)
+        self._memory.append(message)
+        if role == "system":
+            self._system_message = content
+        else:
+            self._chat_messages.append(message)
     
     def refresh_memory(self, new_memory: list[Dict[str, Any]]) -> None:
         """Replace the current memory with new memory.
@@ -76,23 +135,38 @@ class BaseAgent(ABC):
         Args:
             new_memory: The new memory to replace the current memory
         """
+        # Refreshing with the current memory (or a view of it) changes nothing
+        if new_memory is self._memory or (isinstance(new_memory, _MemoryView) and new_memory._agent is self):
+            return
+        
         self._memory = [
             self.llm.format_message(msg["role"], msg["content"])
             for msg in new_memory
         ]
+        self._system_message = None
+        self._chat_messages = []
+        for msg, source in zip(self._memory, new_memory):
+            if source["role"] == "system":
+                self._system_message = source["content"]
+            else:
+                self._chat_messages.append(msg)
     
     def clear_memory(self) -> None:
         """Clear the agent's memory."""
         self._memory = []
+        self._system_message = None
+        self._chat_messages = []
     
     @property
-    def memory(self) -> list[Dict[str, Any]]:
+    def memory(self) -> Sequence:
         """Get the agent's memory.
         
+        Use add_to_memory(), refresh_memory() or clear_memory() to change it.
+        
         Returns:
-            The agent's memory as a list of message dictionaries
+            A read-only view of the agent's message dictionaries
         """
-        return self._memory.copy()
+        return _MemoryView(self)
     
     def generate_response(self, messages: Optional[List[Dict[str, Any]]] = None) -> str:
         """Generate a response using the agent's LLM and memory.
@@ -103,11 +177,73 @@ class BaseAgent(ABC):
         Returns:
             Generated response text
         """
-        return self.llm.generate(
+        cache_key = self._response_cache_key(messages)
+        if cache_key is not None:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        if messages is None and self.llm.supports_split_messages:
+            # Memory is already split, so the LLM does not have to scan it
+            response = self.llm.generate_chat(
+                system_message=self._system_message,
+                chat_messages=self._chat_messages,
+                temperature=self.llm_params["temperature"],
+                max_tokens=self.llm_params["max_output_tokens"]
+            )
+        else:
+            response = self.llm.generate(
+                messages=messages if messages is not None else self._memory,
+                temperature=self.llm_params["temperature"],
+                max_tokens=self.llm_params["max_output_tokens"]
+            )
+        
+        if cache_key is not None:
+            self._response_cache.set(cache_key, response)
+        return response
+    
+    async def agenerate_response(self, messages: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Async version of generate_response.
+        
+        Args:
+            messages: Optional list of messages to use instead of memory
+            
+        Returns:
+            Generated response text
+        """
+        cache_key = self._response_cache_key(messages)
+        if cache_key is not None:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        response = await self.llm.agenerate(
             messages=messages if messages is not None else self._memory,
             temperature=self.llm_params["temperature"],
             max_tokens=self.llm_params["max_output_tokens"]
         )
+        
+        if cache_key is not None:
+            self._response_cache.set(cache_key, response)
+        return response
+    
+    def _response_cache_key(self, messages: Optional[List[Dict[str, Any]]]) -> Optional[bytes]:
+        """Build the response cache key for a request, if it may be cached.
+        
+        Args:
+            messages: Messages to send, or None to use memory
+            
+        Returns:
+            The cache key, or None if caching is off or sampling is too random
+        """
+        if self._response_cache is None or self.llm_params["temperature"] > MAX_CACHED_TEMPERATURE:
+            return None
+        return ResponseCache.make_key(
+            self.llm_params["model"],
+            messages if messages is not None else self._memory,
+            self.llm_params["temperature"],
+            self.llm_params["max_output_tokens"]
+        )
     
     @abstractmethod
     def process(self, *args, **kwargs) -> Any:
@@ -115,4 +251,46 @@ class BaseAgent(ABC):
         
         This method should be implemented by each specific agent.
         """
-        pass 
\ No newline at end of file
+        pass
+
+
+async def gather_responses(
+    agents: List[BaseAgent],
+    max_concurrency: Optional[int] = None,
+    burst_seconds: float = 10.0
+) -> List[str]:
+    """Generate responses for several agents concurrently.
+    
+    Each agent answers from its own memory. Requests still go through each
+    LLM's rate limiter, which books every request's tokens before it is
+    sent, so token quotas are respected while several are in flight;
+    max_concurrency only caps the number of pending requests.
+    
+    Args:
+        agents: Agents to generate responses for
+        max_concurrency: Maximum number of requests in flight. If None, it is
+            derived from the lowest requests-per-minute limit of the agents'
+            LLMs, allowing burst_seconds worth of requests at once.
+        burst_seconds: Seconds of request budget to allow in flight when
+            deriving max_concurrency
+            
+    Returns:
+        Responses in the same order as agents
+    """
+    if not agents:
+        return []
+    
+    if max_concurrency is None:
+        limits = [
+            agent.llm.rate_limiter.requests_per_minute
+            for agent in agents
+            if getattr(agent.llm, "rate_limiter", None) is not None
+        ]
+        max_concurrency = math.ceil(min(limits) / 60 * burst_seconds) if limits else len(agents)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    
+    async def respond(agent: BaseAgent) -> str:
+        async with semaphore:
+            return await agent.agenerate_response()
+    
+    return list(await asyncio.gather(*(respond(agent) for agent in agents))) 
\ No newline at end of file
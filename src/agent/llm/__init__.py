@@ -1,11 +1,18 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
+import importlib
+
 from .base import BaseLLM
-from .openai_llm import OpenAILLM
-from .claude_llm import ClaudeLLM
-from .huggingface_llm import HuggingFaceLLM
-from .gemini_llm import GeminiLLM
 from .factory import LLMFactory
 
+# Provider wrappers pull in their SDKs (anthropic, openai, transformers/torch,
+# google-generativeai), so they are only imported on first attribute access
+_lazy_imports = {
+    'OpenAILLM': '.openai_llm',
+    'ClaudeLLM': '.claude_llm',
+    'HuggingFaceLLM': '.huggingface_llm',
+    'GeminiLLM': '.gemini_llm',
+}
+
 __all__ = [
     'BaseLLM',
     'OpenAILLM',
@@ -13,4 +20,14 @@ __all__ = [
     'HuggingFaceLLM',
     'GeminiLLM',
     'LLMFactory'
-] 
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    """Import provider LLM classes on first access and cache them on the package."""
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_lazy_imports[name], __package__)
+    attr = getattr(module, name)
+    globals()[name] = attr
+    return attr
\ No newline at end of file
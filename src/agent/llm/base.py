@@ -1,10 +1,33 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, List, Dict, Any, Optional, Sequence
+import asyncio
+import hashlib
+import threading
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Token counts shared by all LLM instances, keyed by _token_cache_key()
+_TOKEN_CACHE_SIZE = 16384
+_TOKEN_COUNTS: "OrderedDict[bytes, int]" = OrderedDict()
+_TOKEN_COUNTS_LOCK = threading.Lock()
+
 
 class BaseLLM(ABC):
     """Base class for LLM wrappers."""
     
+    # Empty so that wrappers declaring __slots__ get no per-instance __dict__
+    __slots__ = ()
+    
+    # Whether generate_chat() takes the system message and chat messages
+    # directly instead of going through the combined message list
+    supports_split_messages = False
+    
     @abstractmethod
     def generate(
         self,
@@ -24,6 +47,58 @@ class BaseLLM(ABC):
         """
         pass
     
+    def generate_chat(
+        self,
+        system_message: Optional[str],
+        chat_messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Generate a response from an already split system message and chat.
+        
+        The default implementation puts the system message first and calls
+        generate(). Wrappers whose API takes the system prompt separately
+        override it and set supports_split_messages.
+        
+        Args:
+            system_message: Optional system prompt
+            chat_messages: Formatted non-system messages
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum number of tokens to generate
+            
+        Returns:
+            The generated response text
+        """
+        messages = list(chat_messages)
+        if system_message:
+            messages.insert(0, self.format_message("system", system_message))
+        return self.generate(messages=messages, temperature=temperature, max_tokens=max_tokens)
+    
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Generate a response without blocking the event loop.
+        
+        The default implementation runs generate() in the loop's default
+        executor. Wrappers with an async client should override it.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content' keys
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum number of tokens to generate
+            
+        Returns:
+            The generated response text
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(self.generate, messages=messages, temperature=temperature, max_tokens=max_tokens)
+        )
+    
     @abstractmethod
     def format_message(self, role: str, content: str) -> Dict[str, str]:
         """Format a message for the specific LLM API.
@@ -35,4 +110,131 @@ class BaseLLM(ABC):
         Returns:
             Formatted message dictionary
         """
-        pass 
\ No newline at end of file
+        pass
+
+
+class TokenCountCacheMixin:
+    """Memoizes token counts in a cache shared by all LLM instances.
+    
+    Counts are keyed on a hash of the counted strings and the tokenizer, so
+    system prompts and code context re-sent by any agent are only counted
+    once per process. The cache is bounded and evicts least recently used
+    entries; it is guarded by a lock because agenerate() counts from
+    executor threads.
+    """
+    
+    __slots__ = ()
+    
+    def _token_cache_key(self, parts: Sequence[str]) -> bytes:
+        """Hash the given strings into a cache key.
+        
+        Args:
+            parts: Strings that together determine the token count
+            
+        Returns:
+            Digest identifying the tokenizer and the counted content
+        """
+        digest = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+        for part in (self._token_cache_namespace(), *parts):
+            data = part.encode("utf-8", "surrogatepass")
+            # Length-prefix each part so different splits never collide
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+        return digest.digest()
+    
+    def _token_cache_namespace(self) -> str:
+        """Name the tokenizer, since the same text counts differently per encoding."""
+        tokenizer = getattr(self, "tokenizer", None)
+        name = getattr(tokenizer, "name", None)
+        return name if isinstance(name, str) else type(self).__name__
+    
+    def _cached_count(self, parts: Sequence[str], count: Callable[[], int]) -> int:
+        """Return the memoized token count for the given strings.
+        
+        Args:
+            parts: Strings that together determine the token count
+            count: Computes the count on a cache miss; exceptions propagate
+                and nothing is stored, so failed counts are retried next time
+            
+        Returns:
+            Token count
+        """
+        key = self._token_cache_key(parts)
+        with _TOKEN_COUNTS_LOCK:
+            if key in _TOKEN_COUNTS:
+                _TOKEN_COUNTS.move_to_end(key)
+                return _TOKEN_COUNTS[key]
+        
+        # Count outside the lock; a concurrent miss just counts twice
+        result = count()
+        with _TOKEN_COUNTS_LOCK:
+            _TOKEN_COUNTS[key] = result
+            if len(_TOKEN_COUNTS) > _TOKEN_CACHE_SIZE:
+                _TOKEN_COUNTS.popitem(last=False)
+        return result
+    
+    def _cached_count_batch(self, texts: Sequence[str], count: Callable[[List[str]], List[int]]) -> List[int]:
+        """Return memoized token counts for several strings at once.
+        
+        Shares entries with _cached_count(("text", text), ...).
+        
+        Args:
+            texts: Strings to count
+            count: Counts a list of strings on cache misses in one call;
+                exceptions propagate and nothing is stored
+            
+        Returns:
+            Token count of each string, in order
+        """
+        keys = [self._token_cache_key(("text", text)) for text in texts]
+        results = [0] * len(texts)
+        missing = []
+        with _TOKEN_COUNTS_LOCK:
+            for index, key in enumerate(keys):
+                if key in _TOKEN_COUNTS:
+                    _TOKEN_COUNTS.move_to_end(key)
+                    results[index] = _TOKEN_COUNTS[key]
+                else:
+                    missing.append(index)
+        
+        if missing:
+            counts = count([texts[index] for index in missing])
+            with _TOKEN_COUNTS_LOCK:
+                for index, result in zip(missing, counts):
+                    results[index] = result
+                    _TOKEN_COUNTS[keys[index]] = result
+                while len(_TOKEN_COUNTS) > _TOKEN_CACHE_SIZE:
+                    _TOKEN_COUNTS.popitem(last=False)
+        return results
+    
+    def _last_messages_count(self, messages: Sequence[Dict[str, str]]) -> Optional[int]:
+        """Return the total from the previous count if it was for the same messages.
+        
+        Messages are compared by identity. The previous message objects stay
+        referenced, so their ids cannot be reused by new messages.
+        
+        Args:
+            messages: Messages about to be counted
+            
+        Returns:
+            The previous total, or None if the messages differ
+        """
+        last = getattr(self, "_last_counted", None)
+        if last is None:
+            return None
+        last_messages, total = last
+        if len(last_messages) != len(messages):
+            return None
+        for previous, message in zip(last_messages, messages):
+            if previous is not message:
+                return None
+        return total
+    
+    def _remember_messages_count(self, messages: Sequence[Dict[str, str]], total: int) -> None:
+        """Remember the total of a message list for _last_messages_count().
+        
+        Args:
+            messages: Messages that were counted
+            total: Their total token count
+        """
+        self._last_counted = (tuple(messages), total)
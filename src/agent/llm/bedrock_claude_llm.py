@@ -2,12 +2,20 @@
 from typing import List, Dict, Any, Optional
 import anthropic
 from .base import BaseLLM
+# Claude on Bedrock uses the default rate limits of Anthropic's API; these
+# should be adjusted based on your Bedrock quotas
+from .claude_llm import _DEFAULT_LIMITS, _ROLE_MAP, _extract_text
 from .rate_limiter import RateLimiter
 import logging
 
+
 class BedrockClaudeLLM(BaseLLM):
     """Amazon Bedrock Claude API wrapper."""
 
+    __slots__ = ("client", "model", "rate_limiter")
+
+    supports_split_messages = True
+
     def __init__(
         self,
         model: str,
@@ -15,7 +23,9 @@ class BedrockClaudeLLM(BaseLLM):
         aws_access_key: Optional[str] = None,
         aws_secret_key: Optional[str] = None,
         aws_session_token: Optional[str] = None,
-        rate_limits: Optional[Dict[str, Any]] = None
+        rate_limits: Optional[Dict[str, Any]] = None,
+        client: Optional[anthropic.AnthropicBedrock] = None,
+        rate_limiter: Optional[RateLimiter] = None
     ):
         """Initialize Bedrock Claude LLM.
 
@@ -26,8 +36,53 @@ class BedrockClaudeLLM(BaseLLM):
             aws_secret_key: AWS secret key (optional, uses environment/profile if not provided)
             aws_session_token: AWS session token (optional)
             rate_limits: Optional dictionary with rate limit settings
+            client: Optional existing Bedrock client to share; created from the
+                AWS settings if None
+            rate_limiter: Optional rate limiter to share with other instances;
+                created from rate_limits if None
+        """
+        if client is None:
+            client = self.create_client(aws_region, aws_access_key, aws_secret_key, aws_session_token)
+        self.client = client
+        self.model = model
+
+        # Initialize rate limiter
+        if rate_limiter is None:
+            rate_limiter = self.create_rate_limiter(rate_limits)
+        self.rate_limiter = rate_limiter
+
+    @staticmethod
+    def create_rate_limiter(rate_limits: Optional[Dict[str, Any]] = None) -> RateLimiter:
+        """Create a rate limiter for the Bedrock-Claude API.
+
+        Args:
+            rate_limits: Optional dictionary with rate limit settings; provided
+                values override the defaults key by key
+
+        Returns:
+            Rate limiter that can be shared by several BedrockClaudeLLM instances
+        """
+        limits = {**_DEFAULT_LIMITS, **(rate_limits or {})}
+        return RateLimiter(provider="Bedrock-Claude", **{key: limits[key] for key in _DEFAULT_LIMITS})
+
+    @staticmethod
+    def create_client(
+        aws_region: str = "us-east-1",
+        aws_access_key: Optional[str] = None,
+        aws_secret_key: Optional[str] = None,
+        aws_session_token: Optional[str] = None
+    ) -> anthropic.AnthropicBedrock:
+        """Create a Bedrock client.
+
+        Args:
+            aws_region: AWS region for Bedrock
+            aws_access_key: AWS access key (optional, uses environment/profile if not provided)
+            aws_secret_key: AWS secret key (optional, uses environment/profile if not provided)
+            aws_session_token: AWS session token (optional)
+
+        Returns:
+            Client that can be shared by several BedrockClaudeLLM instances
         """
-        # Initialize Bedrock client
         client_kwargs = {"aws_region": aws_region}
 
         # Add credentials if provided, otherwise uses environment variables or AWS profile
@@ -38,31 +93,7 @@ class BedrockClaudeLLM(BaseLLM):
         if aws_session_token:
             client_kwargs["aws_session_token"] = aws_session_token
 
-        self.client = anthropic.AnthropicBedrock(**client_kwargs)
-        self.model = model
-
-        # Default rate limits for Claude on Bedrock
-        # Note: These should be adjusted based on your Bedrock quotas
-        default_limits = {
-            "requests_per_minute": 50,
-            "input_tokens_per_minute": 20000,
-            "output_tokens_per_minute": 8000,
-            "input_token_price_per_million": 3.0,
-            "output_token_price_per_million": 15.0
-        }
-
-        # Use provided rate limits or defaults
-        limits = rate_limits or default_limits
-
-        # Initialize rate limiter
-        self.rate_limiter = RateLimiter(
-            provider="Bedrock-Claude",
-            requests_per_minute=limits.get("requests_per_minute", default_limits["requests_per_minute"]),
-            input_tokens_per_minute=limits.get("input_tokens_per_minute", default_limits["input_tokens_per_minute"]),
-            output_tokens_per_minute=limits.get("output_tokens_per_minute", default_limits["output_tokens_per_minute"]),
-            input_token_price_per_million=limits.get("input_token_price_per_million", default_limits["input_token_price_per_million"]),
-            output_token_price_per_million=limits.get("output_token_price_per_million", default_limits["output_token_price_per_million"])
-        )
+        return anthropic.AnthropicBedrock(**client_kwargs)
 
     def _count_tokens(self, text: str) -> int:
         """Count tokens in a string using a simple estimation.
@@ -130,7 +161,8 @@ class BedrockClaudeLLM(BaseLLM):
         Returns:
             Generated response text
         """
-        # Extract system message if present
+        # Extract system message if present. Messages built by format_message()
+        # are already in Claude's format, so they are passed through as-is.
         system_message = None
         chat_messages = []
 
@@ -138,13 +170,56 @@ class BedrockClaudeLLM(BaseLLM):
             if msg["role"] == "system":
                 system_message = msg["content"]
             else:
-                chat_messages.append(self._convert_to_claude_message(msg))
+                chat_messages.append(msg)
 
         # Count input tokens
         input_tokens = self._count_messages_tokens(messages, system_message)
+        return self._create_message(system_message, chat_messages, input_tokens, temperature, max_tokens)
 
-        # Wait if we're approaching rate limits
-        self.rate_limiter.wait_if_needed(input_tokens, max_tokens)
+    def generate_chat(
+        self,
+        system_message: Optional[str],
+        chat_messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """Generate a response from an already split system message and chat.
+
+        Args:
+            system_message: Optional system prompt
+            chat_messages: Messages built by format_message(), without system messages
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated response text
+        """
+        input_tokens = self._count_messages_tokens(chat_messages, system_message)
+        return self._create_message(system_message, chat_messages, input_tokens, temperature, max_tokens)
+
+    def _create_message(
+        self,
+        system_message: Optional[str],
+        chat_messages: List[Dict[str, str]],
+        input_tokens: int,
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """Call the messages API with rate limiting.
+
+        Args:
+            system_message: Optional system prompt
+            chat_messages: Messages in Claude's format
+            input_tokens: Input token count of the request
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated response text
+        """
+        # Wait if we're approaching rate limits and book the request, so
+        # workers sharing the limiter cannot all pass the same check
+        reservation = self.rate_limiter.reserve(input_tokens, max_tokens)
 
         # Make the API call
         response = self.client.messages.create(
@@ -155,11 +230,11 @@ class BedrockClaudeLLM(BaseLLM):
             max_tokens=max_tokens
         )
 
-        result_text = response.content[0].text
+        result_text = _extract_text(response.content)
 
-        # Count output tokens and record request
+        # Count output tokens and replace the reserved estimate
         output_tokens = self._count_tokens(result_text)
-        self.rate_limiter.record_request(input_tokens, output_tokens)
+        self.rate_limiter.commit(reservation, input_tokens, output_tokens)
 
         return result_text
 
@@ -173,24 +248,11 @@ class BedrockClaudeLLM(BaseLLM):
         Returns:
             Formatted message dictionary
         """
-        # Store in standard format, conversion happens in generate()
-        return {"role": role, "content": content}
-
-    def _convert_to_claude_message(self, message: Dict[str, str]) -> Dict[str, str]:
-        """Convert standard message format to Claude's format.
-
-        Args:
-            message: Standard format message
-
-        Returns:
-            Claude format message
-        """
-        role_mapping = {
-            "user": "user",
-            "assistant": "assistant"
-        }
-
-        role = role_mapping[message["role"]]
-        content = message["content"]
+        if role != "system":
+            # Map once here so generate() can pass stored messages through;
+            # system messages are kept and sent via the system parameter
+            if role not in _ROLE_MAP:
+                raise ValueError(f"Unsupported message role for Claude: {role}")
+            role = _ROLE_MAP[role]
 
         return {"role": role, "content": content}
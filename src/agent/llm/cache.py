@@ -0,0 +1,120 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates
+from typing import Dict, List, Optional
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+
+# orjson is optional; it encodes long message lists much faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Responses are only cached for near-deterministic sampling
+MAX_CACHED_TEMPERATURE = 0.2
+
+# Open caches keyed by resolved database path, shared by all agents
+_CACHES: Dict[str, "ResponseCache"] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+class ResponseCache:
+    """SQLite-backed cache from LLM prompts to generated responses.
+
+    Keys are blake2b digests of the model, the messages, the temperature and
+    the output token limit, so a hit only happens for the exact same request.
+    """
+
+    def __init__(self, path: str):
+        """Open (and create if needed) the cache database.
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # One connection shared between threads, serialized by the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key BLOB PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(
+        model: Optional[str],
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> bytes:
+        """Build the cache key for a request.
+
+        Args:
+            model: Model identifier
+            messages: List of message dictionaries with 'role' and 'content' keys
+            temperature: Sampling temperature
+            max_tokens: Maximum number of tokens to generate
+
+        Returns:
+            Digest identifying the request
+        """
+        request = {
+            "m": model,
+            "c": [[msg["role"], msg["content"]] for msg in messages],
+            "t": round(temperature, 3),
+            "n": max_tokens
+        }
+        payload = None
+        if orjson is not None:
+            try:
+                # Same bytes as the compact json encoding below
+                payload = orjson.dumps(request)
+            except orjson.JSONEncodeError:
+                pass  # e.g. lone surrogates, which only json accepts
+        if payload is None:
+            payload = json.dumps(request, ensure_ascii=False, separators=(",", ":")).encode("utf-8", "surrogatepass")
+        return hashlib.blake2b(payload, digest_size=32).digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        """Look up a cached response.
+
+        Args:
+            key: Key built by make_key()
+
+        Returns:
+            The cached response text, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: bytes, value: str) -> None:
+        """Store a response.
+
+        Args:
+            key: Key built by make_key()
+            value: Generated response text
+        """
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, value) VALUES (?, ?)", (key, value))
+
+
+def get_response_cache(path: str) -> ResponseCache:
+    """Return the shared cache for a database path, opening it on first use.
+
+    Args:
+        path: Path of the SQLite database file
+
+    Returns:
+        The ResponseCache for that file
+    """
+    resolved = str(Path(path).resolve())
+    with _CACHES_LOCK:
+        cache = _CACHES.get(resolved)
+        if cache is None:
+            cache = _CACHES[resolved] = ResponseCache(resolved)
+    return cache
@@ -1,18 +1,57 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
-from typing import List, Dict, Any, Optional
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple
 import anthropic
-from .base import BaseLLM
+from .base import BaseLLM, TokenCountCacheMixin
 from .rate_limiter import RateLimiter
-import logging
+from .tokenizer import get_encoding
 
-class ClaudeLLM(BaseLLM):
+# Claude chat roles; messages with other roles are rejected
+_ROLE_MAP = {
+    "user": "user",
+    "assistant": "assistant"
+}
+
+
+def _extract_text(content: List[Any]) -> str:
+    """Join the text blocks of a Claude response.
+    
+    Args:
+        content: Content blocks of a messages.create response
+        
+    Returns:
+        Concatenated text of all text blocks
+    """
+    # Almost every response is a single text block
+    if len(content) == 1 and getattr(content[0], "type", "text") == "text":
+        return content[0].text
+    return "".join(block.text for block in content if getattr(block, "type", "text") == "text")
+
+
+# Default rate limits for Claude 3.7 Sonnet
+_DEFAULT_LIMITS = MappingProxyType({
+    "requests_per_minute": 50,
+    "input_tokens_per_minute": 20000,
+    "output_tokens_per_minute": 8000,
+    "input_token_price_per_million": 3.0,
+    "output_token_price_per_million": 15.0
+})
+
+
+class ClaudeLLM(TokenCountCacheMixin, BaseLLM):
     """Anthropic Claude API wrapper."""
     
+    __slots__ = ("client", "async_client", "model", "tokenizer", "rate_limiter")
+    
+    supports_split_messages = True
+    
     def __init__(
         self,
         api_key: str,
         model: str,
-        rate_limits: Optional[Dict[str, Any]] = None
+        rate_limits: Optional[Dict[str, Any]] = None,
+        client: Optional[anthropic.Anthropic] = None,
+        rate_limiter: Optional[RateLimiter] = None
     ):
         """Initialize Claude LLM.
         
@@ -20,58 +59,63 @@ class ClaudeLLM(BaseLLM):
             api_key: Anthropic API key
             model: Model identifier (e.g., "claude-3-sonnet-20240229")
             rate_limits: Optional dictionary with rate limit settings
+            client: Optional existing client to share; created from api_key if None
+            rate_limiter: Optional rate limiter to share with other instances;
+                created from rate_limits if None
         """
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = client if client is not None else self.create_client(api_key)
+        self.async_client = None  # Created by agenerate() on first use
         self.model = model
         
-        # Default rate limits for Claude 3.7 Sonnet
-        default_limits = {
-            "requests_per_minute": 50,
-            "input_tokens_per_minute": 20000,
-            "output_tokens_per_minute": 8000,
-            "input_token_price_per_million": 3.0,
-            "output_token_price_per_million": 15.0
-        }
-        
-        # Use provided rate limits or defaults
-        limits = rate_limits or default_limits
+        # Count tokens locally instead of calling the count_tokens API on every
+        # request. Claude's tokenizer is not public, so cl100k_base serves as a
+        # close approximation for rate limiting.
+        self.tokenizer = get_encoding("cl100k_base")
         
         # Initialize rate limiter
-        self.rate_limiter = RateLimiter(
-            provider="Claude",
-            requests_per_minute=limits.get("requests_per_minute", default_limits["requests_per_minute"]),
-            input_tokens_per_minute=limits.get("input_tokens_per_minute", default_limits["input_tokens_per_minute"]),
-            output_tokens_per_minute=limits.get("output_tokens_per_minute", default_limits["output_tokens_per_minute"]),
-            input_token_price_per_million=limits.get("input_token_price_per_million", default_limits["input_token_price_per_million"]),
-            output_token_price_per_million=limits.get("output_token_price_per_million", default_limits["output_token_price_per_million"])
-        )
+        if rate_limiter is None:
+            rate_limiter = self.create_rate_limiter(rate_limits)
+        self.rate_limiter = rate_limiter
+    
+    @staticmethod
+    def create_rate_limiter(rate_limits: Optional[Dict[str, Any]] = None) -> RateLimiter:
+        """Create a rate limiter for the Claude API.
+        
+        Args:
+            rate_limits: Optional dictionary with rate limit settings; provided
+                values override the defaults key by key
+            
+        Returns:
+            Rate limiter that can be shared by several ClaudeLLM instances
+        """
+        limits = {**_DEFAULT_LIMITS, **(rate_limits or {})}
+        return RateLimiter(provider="Claude", **{key: limits[key] for key in _DEFAULT_LIMITS})
+    
+    @staticmethod
+    def create_client(api_key: str) -> anthropic.Anthropic:
+        """Create an Anthropic API client.
+        
+        Args:
+            api_key: Anthropic API key
+            
+        Returns:
+            Client that can be shared by several ClaudeLLM instances
+        """
+        return anthropic.Anthropic(api_key=api_key)
     
     def _count_tokens(self, text: str) -> int:
-        """Count tokens in a string using Claude's tokenizer.
+        """Count tokens in a string locally.
         
         Args:
             text: Text to count tokens for
             
         Returns:
-            Token count
+            Token count (approximate)
         """
         if not text:
             return 0
             
-        try:
-            # Format text as a message for token counting
-            count = self.client.beta.messages.count_tokens(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": text}
-                ]
-            )
-            return count.input_tokens
-        except Exception as e:
-            # Log the error but don't fail
-            logging.warning(f"Failed to count tokens with Claude tokenizer: {e}")
-            # Fallback: rough estimate if tokenizer fails
-            return len(text.split()) * 1.3
+        return self._cached_count(("text", text), lambda: len(self.tokenizer.encode_ordinary(text)))
     
     def _count_messages_tokens(self, messages: List[Dict[str, str]], system_message: Optional[str] = None) -> int:
         """Count tokens in message list with optional system message.
@@ -81,46 +125,78 @@ class ClaudeLLM(BaseLLM):
             system_message: Optional system message
             
         Returns:
-            Total token count
+            Total token count (approximate)
         """
         if not messages:
             return 0
             
-        # Convert messages to Claude format
-        claude_messages = [self._convert_to_claude_message(msg) for msg in messages 
-                          if msg["role"] != "system"]
+        # Count tokens in all non-system messages
+        total_tokens = 0
+        message_count = 0
+        for msg in messages:
+            if msg["role"] == "system":
+                continue
+            message_count += 1
+            if msg.get("content"):
+                total_tokens += self._count_tokens(msg["content"])
         
-        # Format system message if provided
-        system_content = None
+        # Add system message tokens if provided
         if system_message:
-            system_content = system_message
-        
-        try:
-            # Use the API to count tokens for all messages at once
-            count = self.client.beta.messages.count_tokens(
-                model=self.model,
-                messages=claude_messages,
-                system=system_content
-            )
-            return count.input_tokens
-        except Exception as e:
-            # Log the error but don't fail
-            logging.warning(f"Failed to count tokens with Claude tokenizer: {e}")
+            total_tokens += self._count_tokens(system_message)
             
-            # Fallback: count tokens individually
-            total_tokens = 0
-            for msg in claude_messages:
-                if "content" in msg and msg["content"]:
-                    total_tokens += self._count_tokens(msg["content"])
+        # Add overhead for message formatting
+        total_tokens += 10 * message_count  # Add ~10 tokens per message for formatting
+        
+        return total_tokens
+    
+    def _prepare_request(self, messages: List[Dict[str, str]]) -> Tuple[Optional[str], List[Dict[str, str]], int]:
+        """Split off the system message and count input tokens.
+        
+        Args:
+            messages: List of message dictionaries
             
-            # Add system message tokens if provided
-            if system_message:
-                total_tokens += self._count_tokens(system_message)
-                
-            # Add overhead for message formatting
-            total_tokens += 10 * len(claude_messages)  # Add ~10 tokens per message for formatting
+        Returns:
+            Tuple of (system message, chat messages, input token count)
+        """
+        # Extract system message if present. Messages built by format_message()
+        # are already in Claude's format, so they are passed through as-is.
+        system_message = None
+        chat_messages = []
+        
+        for msg in messages:
+            if msg["role"] == "system":
+                system_message = msg["content"]
+            else:
+                chat_messages.append(msg)
+        
+        # Count input tokens
+        input_tokens = self._count_messages_tokens(chat_messages, system_message)
+        return system_message, chat_messages, input_tokens
+    
+    def _finish_request(self, response: Any, input_tokens: int, reservation: Tuple[List, List]) -> str:
+        """Extract the response text and record usage.
+        
+        Args:
+            response: Response returned by messages.create
+            input_tokens: Estimated input token count of the request
+            reservation: Handle returned by the rate limiter's reserve()
             
-            return total_tokens
+        Returns:
+            Generated response text
+        """
+        result_text = _extract_text(response.content)
+        
+        # Record the exact usage reported by the API; the local counts only
+        # approximate Claude's tokenizer
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            input_tokens = usage.input_tokens
+            output_tokens = usage.output_tokens
+        else:
+            output_tokens = self._count_tokens(result_text)
+        self.rate_limiter.commit(reservation, input_tokens, output_tokens)
+        
+        return result_text
     
     def generate(
         self,
@@ -138,21 +214,52 @@ class ClaudeLLM(BaseLLM):
         Returns:
             Generated response text
         """
-        # Extract system message if present
-        system_message = None
-        chat_messages = []
-        
-        for msg in messages:
-            if msg["role"] == "system":
-                system_message = msg["content"]
-            else:
-                chat_messages.append(self._convert_to_claude_message(msg))
+        system_message, chat_messages, input_tokens = self._prepare_request(messages)
+        return self._create_message(system_message, chat_messages, input_tokens, temperature, max_tokens)
+    
+    def generate_chat(
+        self,
+        system_message: Optional[str],
+        chat_messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """Generate a response from an already split system message and chat.
         
-        # Count input tokens
-        input_tokens = self._count_messages_tokens(messages, system_message)
+        Args:
+            system_message: Optional system prompt
+            chat_messages: Messages built by format_message(), without system messages
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Generated response text
+        """
+        input_tokens = self._count_messages_tokens(chat_messages, system_message)
+        return self._create_message(system_message, chat_messages, input_tokens, temperature, max_tokens)
+    
+    def _create_message(
+        self,
+        system_message: Optional[str],
+        chat_messages: List[Dict[str, str]],
+        input_tokens: int,
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """Call the messages API with rate limiting.
         
-        # Wait if we're approaching rate limits (estimate output tokens as max_output_tokens)
-        self.rate_limiter.wait_if_needed(input_tokens, max_tokens)
+        Args:
+            system_message: Optional system prompt
+            chat_messages: Messages in Claude's format
+            input_tokens: Input token count of the request
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Generated response text
+        """
+        # Wait if we're approaching rate limits and book the request (estimate output tokens as max_output_tokens)
+        reservation = self.rate_limiter.reserve(input_tokens, max_tokens)
         
         # Make the API call
         response = self.client.messages.create(
@@ -163,13 +270,44 @@ class ClaudeLLM(BaseLLM):
             max_tokens=max_tokens
         )
         
-        result_text = response.content[0].text
+        return self._finish_request(response, input_tokens, reservation)
+    
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """Generate a response using the async Claude client with rate limiting.
+        
+        Args:
+            messages: List of message dictionaries
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Generated response text
+        """
+        system_message, chat_messages, input_tokens = self._prepare_request(messages)
         
-        # Count output tokens and record request
-        output_tokens = self._count_tokens(result_text)
-        self.rate_limiter.record_request(input_tokens, output_tokens)
+        # Sleep without blocking other requests on the event loop, and book the
+        # request so concurrent coroutines cannot all pass the same check
+        reservation = await self.rate_limiter.areserve(input_tokens, max_tokens)
         
-        return result_text
+        # Create the async client on first use, sharing the sync client's key
+        if self.async_client is None:
+            self.async_client = anthropic.AsyncAnthropic(api_key=self.client.api_key)
+        
+        # Make the API call
+        response = await self.async_client.messages.create(
+            model=self.model,
+            messages=chat_messages,
+            system=system_message,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        
+        return self._finish_request(response, input_tokens, reservation)
     
     def format_message(self, role: str, content: str) -> Dict[str, str]:
         """Format message for Claude API.
@@ -181,24 +319,11 @@ class ClaudeLLM(BaseLLM):
         Returns:
             Formatted message dictionary
         """
-        # Store in standard format, conversion happens in generate()
-        return {"role": role, "content": content}
-    
-    def _convert_to_claude_message(self, message: Dict[str, str]) -> Dict[str, str]:
-        """Convert standard message format to Claude's format.
-        
-        Args:
-            message: Standard format message
-            
-        Returns:
-            Claude format message
-        """
-        role_mapping = {
-            "user": "user",
-            "assistant": "assistant"
-        }
-        
-        role = role_mapping[message["role"]]
-        content = message["content"]
+        if role != "system":
+            # Map once here so generate() can pass stored messages through;
+            # system messages are kept and sent via the system parameter
+            if role not in _ROLE_MAP:
+                raise ValueError(f"Unsupported message role for Claude: {role}")
+            role = _ROLE_MAP[role]
         
-        return {"role": role, "content": content} 
\ No newline at end of file
+        return {"role": role, "content": content}
@@ -1,24 +1,176 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional, Tuple
 from pathlib import Path
+import copy
+import hashlib
 import yaml
 
 from .base import BaseLLM
-from .openai_llm import OpenAILLM
-from .claude_llm import ClaudeLLM
-from .bedrock_claude_llm import BedrockClaudeLLM
-from .huggingface_llm import HuggingFaceLLM
-from .gemini_llm import GeminiLLM
+
+# Use the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Parsed configuration files keyed by (absolute path, mtime in ns)
+_CONFIG_CACHE: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+# API clients shared between LLM instances with the same provider and credentials
+_CLIENT_CACHE: Dict[Tuple, Any] = {}
+
+# Rate limiters shared between LLM instances with the same provider, model and limits
+_RATE_LIMITERS: Dict[Tuple, Any] = {}
+
+
+def _secret_digest(secret: Optional[str]) -> Optional[bytes]:
+    """Hash a credential so cache keys do not hold it in plain text."""
+    if secret is None:
+        return None
+    return hashlib.blake2b(secret.encode(), digest_size=16).digest()
+
+
+def _get_client(key: Tuple, create: Callable[[], Any]) -> Any:
+    """Return the cached client for key, creating it on first use.
+    
+    Sharing a client lets agents reuse its connection pool instead of each
+    setting up their own connections and credentials.
+    """
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        client = _CLIENT_CACHE.setdefault(key, create())
+    return client
+
+
+def _get_rate_limiter(
+    llm_type: str,
+    config: Dict[str, Any],
+    rate_limits: Dict[str, Any],
+    create: Callable[[Dict[str, Any]], Any]
+) -> Any:
+    """Return the rate limiter shared by every LLM of this provider and model.
+    
+    Agents and parallel workers each create their own LLM instances; sharing
+    one limiter keeps their combined traffic within the provider's limits
+    instead of each instance being allowed the full quota.
+    """
+    key = (llm_type, config["model"], tuple(sorted(rate_limits.items())))
+    rate_limiter = _RATE_LIMITERS.get(key)
+    if rate_limiter is None:
+        rate_limiter = _RATE_LIMITERS.setdefault(key, create(rate_limits))
+    return rate_limiter
+
+
+# Constructors for each LLM type, taking (llm config, rate limits)
+_FACTORIES: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], BaseLLM]] = {}
+
+
+def register(llm_type: str) -> Callable:
+    """Register a constructor for an LLM type.
+    
+    Args:
+        llm_type: Value of the "type" config field handled by the constructor
+        
+    Returns:
+        Decorator adding the constructor to the registry
+    """
+    def decorator(factory: Callable[[Dict[str, Any], Dict[str, Any]], BaseLLM]):
+        _FACTORIES[llm_type] = factory
+        return factory
+    return decorator
+
+
+# Provider modules are imported inside the constructors so only the selected
+# SDK gets loaded
+
+@register("openai")
+def _create_openai(config: Dict[str, Any], rate_limits: Dict[str, Any]) -> BaseLLM:
+    from .openai_llm import OpenAILLM
+    return OpenAILLM(
+        api_key=config["api_key"],
+        model=config["model"],
+        rate_limits=rate_limits,
+        rate_limiter=_get_rate_limiter("openai", config, rate_limits, OpenAILLM.create_rate_limiter)
+    )
+
+
+@register("claude")
+def _create_claude(config: Dict[str, Any], rate_limits: Dict[str, Any]) -> BaseLLM:
+    from .claude_llm import ClaudeLLM
+    api_key = config["api_key"]
+    client = _get_client(
+        ("claude", _secret_digest(api_key)),
+        lambda: ClaudeLLM.create_client(api_key)
+    )
+    return ClaudeLLM(
+        api_key=api_key,
+        model=config["model"],
+        rate_limits=rate_limits,
+        client=client,
+        rate_limiter=_get_rate_limiter("claude", config, rate_limits, ClaudeLLM.create_rate_limiter)
+    )
+
+
+@register("bedrock")
+def _create_bedrock(config: Dict[str, Any], rate_limits: Dict[str, Any]) -> BaseLLM:
+    from .bedrock_claude_llm import BedrockClaudeLLM
+    aws_settings = {
+        "aws_region": config.get("aws_region", "us-east-1"),
+        "aws_access_key": config.get("aws_access_key"),
+        "aws_secret_key": config.get("aws_secret_key"),
+        "aws_session_token": config.get("aws_session_token")
+    }
+    client = _get_client(
+        (
+            "bedrock",
+            aws_settings["aws_region"],
+            _secret_digest(aws_settings["aws_access_key"]),
+            _secret_digest(aws_settings["aws_secret_key"]),
+            _secret_digest(aws_settings["aws_session_token"])
+        ),
+        lambda: BedrockClaudeLLM.create_client(**aws_settings)
+    )
+    return BedrockClaudeLLM(
+        model=config["model"],
+        rate_limits=rate_limits,
+        client=client,
+        rate_limiter=_get_rate_limiter("bedrock", config, rate_limits, BedrockClaudeLLM.create_rate_limiter),
+        **aws_settings
+    )
+
+
+@register("gemini")
+def _create_gemini(config: Dict[str, Any], rate_limits: Dict[str, Any]) -> BaseLLM:
+    from .gemini_llm import GeminiLLM
+    return GeminiLLM(
+        api_key=config["api_key"],
+        model=config["model"],
+        rate_limits=rate_limits,
+        rate_limiter=_get_rate_limiter("gemini", config, rate_limits, GeminiLLM.create_rate_limiter)
+    )
+
+
+@register("huggingface")
+def _create_huggingface(config: Dict[str, Any], rate_limits: Dict[str, Any]) -> BaseLLM:
+    from .huggingface_llm import HuggingFaceLLM
+    return HuggingFaceLLM(
+        model_name=config["model"],
+        device=config.get("device", "cuda"),
+        torch_dtype=config.get("torch_dtype", "float16")
+    )
+
 
 class LLMFactory:
     """Factory class for creating LLM instances."""
     
     @staticmethod
-    def create_llm(config: Dict[str, Any]) -> BaseLLM:
+    def create_llm(config: Dict[str, Any], global_config: Optional[Dict[str, Any]] = None) -> BaseLLM:
         """Create an LLM instance based on configuration.
         
         Args:
             config: Configuration dictionary containing LLM settings
+            global_config: Already loaded full configuration to look up provider
+                rate limits in. If None, the default configuration file is loaded.
             
         Returns:
             An instance of BaseLLM
@@ -37,7 +189,8 @@ class LLMFactory:
         rate_limits = config.get("rate_limits", {})
         
         # If not, check if there are global rate limits for this provider type
-        global_config = LLMFactory.load_config()
+        if global_config is None:
+            global_config = LLMFactory.load_config()
         if not rate_limits and "rate_limits" in global_config:
             # Map LLM types to provider names in rate_limits section
             provider_map = {
@@ -51,41 +204,10 @@ class LLMFactory:
             if provider_limits:
                 rate_limits = provider_limits
         
-        if llm_type == "openai":
-            return OpenAILLM(
-                api_key=config["api_key"],
-                model=model,
-                rate_limits=rate_limits
-            )
-        elif llm_type == "claude":
-            return ClaudeLLM(
-                api_key=config["api_key"],
-                model=model,
-                rate_limits=rate_limits
-            )
-        elif llm_type == "bedrock":
-            return BedrockClaudeLLM(
-                model=model,
-                aws_region=config.get("aws_region", "us-east-1"),
-                aws_access_key=config.get("aws_access_key"),
-                aws_secret_key=config.get("aws_secret_key"),
-                aws_session_token=config.get("aws_session_token"),
-                rate_limits=rate_limits
-            )
-        elif llm_type == "gemini":
-            return GeminiLLM(
-                api_key=config["api_key"],
-                model=model,
-                rate_limits=rate_limits
-            )
-        elif llm_type == "huggingface":
-            return HuggingFaceLLM(
-                model_name=model,
-                device=config.get("device", "cuda"),
-                torch_dtype=config.get("torch_dtype", "float16")
-            )
-        else:
+        factory = _FACTORIES.get(llm_type)
+        if factory is None:
             raise ValueError(f"Unsupported LLM type: {llm_type}")
+        return factory(config, rate_limits)
     
     @staticmethod
     def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
@@ -103,10 +225,15 @@ class LLMFactory:
         if config_path is None:
             config_path = str(Path(__file__).parent.parent.parent.parent / "config" / "agent_config.yaml")
         
-        if not Path(config_path).exists():
+        path = Path(config_path).resolve()
+        if not path.exists():
             raise FileNotFoundError(f"Configuration file not found: {config_path}")
         
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+        # Parse each file once; the mtime in the key makes edits invalidate it
+        key = (str(path), path.stat().st_mtime_ns)
+        if key not in _CONFIG_CACHE:
+            with open(path, 'r') as f:
+                _CONFIG_CACHE[key] = yaml.load(f, Loader=_YamlLoader)
         
-        return config 
\ No newline at end of file
+        # Hand out copies so callers cannot modify the cached configuration
+        return copy.deepcopy(_CONFIG_CACHE[key]) 
\ No newline at end of file
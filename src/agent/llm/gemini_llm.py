@@ -1,18 +1,43 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
-from typing import List, Dict, Any, Optional
-import tiktoken
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import google.generativeai as genai
-from .base import BaseLLM
+from .base import BaseLLM, TokenCountCacheMixin
+from .tokenizer import get_encoding
 from .rate_limiter import RateLimiter
 
-class GeminiLLM(BaseLLM):
+# Default rate limits for Gemini (adjust based on actual API limits)
+_DEFAULT_LIMITS = MappingProxyType({
+    "requests_per_minute": 60,
+    "input_tokens_per_minute": 100000,
+    "output_tokens_per_minute": 50000,
+    "input_token_price_per_million": 0.125,  # Approximate for gemini-1.5-flash
+    "output_token_price_per_million": 0.375  # Approximate for gemini-1.5-flash
+})
+
+# Gemini uses "user" and "model" for roles
+_GEMINI_ROLE_MAP = {
+    "user": "user",
+    "assistant": "model",
+    "system": "user"  # Gemini doesn't have a system role, see _convert_messages_to_gemini_format
+}
+
+
+def _estimate_tokens(text: str) -> int:
+    """Estimate a token count at ~4 characters per token without scanning the text."""
+    return max(1, len(text) // 4)
+
+
+class GeminiLLM(TokenCountCacheMixin, BaseLLM):
     """Google Gemini API wrapper."""
     
     def __init__(
         self,
         api_key: str,
         model: str,
-        rate_limits: Optional[Dict[str, Any]] = None
+        rate_limits: Optional[Dict[str, Any]] = None,
+        rate_limiter: Optional[RateLimiter] = None
     ):
         """Initialize Gemini LLM.
         
@@ -20,41 +45,43 @@ class GeminiLLM(BaseLLM):
             api_key: Google API key
             model: Model identifier (e.g., "gemini-1.5-flash", "gemini-1.5-pro")
             rate_limits: Optional dictionary with rate limit settings
+            rate_limiter: Optional rate limiter to share with other instances;
+                created from rate_limits if None
         """
         genai.configure(api_key=api_key)
         self.model_name = model
         self.model = genai.GenerativeModel(model)
         
+        # Chat session kept between calls, with the messages it already holds
+        self._chat: Optional[Tuple[Any, List[Dict[str, str]]]] = None
+        
         try:
             # Initialize tokenizer for token counting
             # Gemini doesn't have a direct tokenizer in the public API
             # Using tiktoken cl100k_base as a reasonable approximation
-            self.tokenizer = tiktoken.get_encoding("cl100k_base")
+            self.tokenizer = get_encoding("cl100k_base")
         except:
-            # Fallback to basic word counting if tokenizer fails
+            # Fall back to the ~4 characters per token estimate if tokenizer fails
             self.tokenizer = None
         
-        # Default rate limits for Gemini (adjust based on actual API limits)
-        default_limits = {
-            "requests_per_minute": 60,
-            "input_tokens_per_minute": 100000,
-            "output_tokens_per_minute": 50000,
-            "input_token_price_per_million": 0.125,  # Approximate for gemini-1.5-flash
-            "output_token_price_per_million": 0.375  # Approximate for gemini-1.5-flash
-        }
-        
-        # Use provided rate limits or defaults
-        limits = rate_limits or default_limits
-        
         # Initialize rate limiter
-        self.rate_limiter = RateLimiter(
-            provider="Gemini",
-            requests_per_minute=limits.get("requests_per_minute", default_limits["requests_per_minute"]),
-            input_tokens_per_minute=limits.get("input_tokens_per_minute", default_limits["input_tokens_per_minute"]),
-            output_tokens_per_minute=limits.get("output_tokens_per_minute", default_limits["output_tokens_per_minute"]),
-            input_token_price_per_million=limits.get("input_token_price_per_million", default_limits["input_token_price_per_million"]),
-            output_token_price_per_million=limits.get("output_token_price_per_million", default_limits["output_token_price_per_million"])
-        )
+        if rate_limiter is None:
+            rate_limiter = self.create_rate_limiter(rate_limits)
+        self.rate_limiter = rate_limiter
+    
+    @staticmethod
+    def create_rate_limiter(rate_limits: Optional[Dict[str, Any]] = None) -> RateLimiter:
+        """Create a rate limiter for the Gemini API.
+        
+        Args:
+            rate_limits: Optional dictionary with rate limit settings; provided
+                values override the defaults key by key
+            
+        Returns:
+            Rate limiter that can be shared by several GeminiLLM instances
+        """
+        limits = {**_DEFAULT_LIMITS, **(rate_limits or {})}
+        return RateLimiter(provider="Gemini", **{key: limits[key] for key in _DEFAULT_LIMITS})
     
     def _count_tokens(self, text: str) -> int:
         """Count tokens in a string using the model's tokenizer.
@@ -70,16 +97,16 @@ class GeminiLLM(BaseLLM):
             
         try:
             if self.tokenizer:
-                return len(self.tokenizer.encode(text))
+                return self._cached_count(("text", text), lambda: len(self.tokenizer.encode(text)))
             else:
-                # Fallback: rough estimate if tokenizer not available
-                return len(text.split()) * 1.3
+                # Fallback: ~4 characters per token if tokenizer not available
+                return _estimate_tokens(text)
         except Exception as e:
             # Log the error but don't fail
             import logging
             logging.warning(f"Failed to count tokens for Gemini: {e}")
-            # Fallback: rough estimate if tokenizer fails
-            return len(text.split()) * 1.3
+            # Fallback: ~4 characters per token if tokenizer fails
+            return _estimate_tokens(text)
     
     def _count_messages_tokens(self, messages: List[Dict[str, str]]) -> int:
         """Count tokens in all messages.
@@ -92,17 +119,34 @@ class GeminiLLM(BaseLLM):
         """
         if not messages:
             return 0
-            
-        total_tokens = 0
         
-        # Count tokens in each message
-        for message in messages:
-            if "content" in message and message["content"]:
-                total_tokens += self._count_tokens(message["content"])
+        # Counting the same history again (e.g. on a retry) costs nothing
+        total_tokens = self._last_messages_count(messages)
+        if total_tokens is not None:
+            return total_tokens
+            
+        # Encode all uncached messages in one batch call
+        contents = [message["content"] for message in messages if message.get("content")]
+        try:
+            if self.tokenizer is None:
+                # Fallback: ~4 characters per token if tokenizer not available
+                total_tokens = sum(map(_estimate_tokens, contents))
+            else:
+                total_tokens = sum(self._cached_count_batch(
+                    contents,
+                    lambda batch: [len(tokens) for tokens in self.tokenizer.encode_ordinary_batch(batch)]
+                ))
+        except Exception as e:
+            # Log the error but don't fail
+            import logging
+            logging.warning(f"Failed to count tokens for Gemini: {e}")
+            # Fallback: ~4 characters per token if tokenizer fails
+            total_tokens = sum(map(_estimate_tokens, contents))
             
         # Add overhead for message formatting (estimated)
         total_tokens += 4 * len(messages)
         
+        self._remember_messages_count(messages, total_tokens)
         return total_tokens
     
     def _convert_messages_to_gemini_format(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
@@ -116,29 +160,28 @@ class GeminiLLM(BaseLLM):
         """
         gemini_messages = []
         
-        # Gemini uses "user" and "model" for roles
-        role_mapping = {
-            "user": "user",
-            "assistant": "model",
-            "system": "user"  # Gemini doesn't have a system role, handle specifically
-        }
-        
-        # Check if first message is a system message
+        # Gemini has no system role, so a leading system message is folded
+        # into the first user message (or sent as its own user message)
+        system_content = None
+        chat_messages = messages
         if messages and messages[0].get("role") == "system":
-            # For system message, we'll add it as a user message with a prefix
             system_content = messages[0].get("content", "")
+            chat_messages = messages[1:]
+        
+        for message in chat_messages:
+            role = _GEMINI_ROLE_MAP.get(message.get("role", "user"), "user")
+            content = message.get("content", "")
             if system_content:
-                # Add the rest of the messages
-                for message in messages[1:]:
-                    role = role_mapping.get(message.get("role", "user"), "user")
-                    content = message.get("content", "")
-                    gemini_messages.append({"role": role, "parts": content})
-        else:
-            # No system message, just convert roles
-            for message in messages:
-                role = role_mapping.get(message.get("role", "user"), "user")
-                content = message.get("content", "")
-                gemini_messages.append({"role": role, "parts": content})
+                if role == "user":
+                    content = system_content + "\n\n" + content
+                else:
+                    gemini_messages.append({"role": "user", "parts": system_content})
+                system_content = None
+            gemini_messages.append({"role": role, "parts": content})
+        
+        if system_content:
+            # Only a system message was given
+            gemini_messages.append({"role": "user", "parts": system_content})
         
         return gemini_messages
     
@@ -158,28 +201,22 @@ class GeminiLLM(BaseLLM):
         Returns:
             Generated response text
         """
-        # Count input tokens
-        input_tokens = self._count_messages_tokens(messages)
-        
-        # Wait if we're approaching rate limits
-        self.rate_limiter.wait_if_needed(input_tokens, max_tokens if max_tokens else 1000)
+        input_tokens, gemini_messages = self._prepare_request(messages)
         
-        # Format messages for Gemini API
-        gemini_messages = self._convert_messages_to_gemini_format(messages)
+        # Wait if we're approaching rate limits and book the request
+        reservation = self.rate_limiter.reserve(input_tokens, max_tokens if max_tokens else 1000)
         
         # Check if we need to start a chat or just generate
         if len(gemini_messages) > 1:
-            # Start a chat with history
+            # Continue the previous chat, or start one with history
             history = gemini_messages[:-1]  # All but the last message
             last_message = gemini_messages[-1]  # The last message to send
             
-            chat = self.model.start_chat(
-                history=history,
-            )
+            chat = self._take_chat(history)
             
             # Send the last message to get a response
             response = chat.send_message(last_message.get("parts", ""))
-            result_text = response.text
+            self._keep_chat(chat, gemini_messages, response.text)
         else:
             # Single message, use generate_content
             content = gemini_messages[0].get("parts", "") if gemini_messages else ""
@@ -191,14 +228,106 @@ class GeminiLLM(BaseLLM):
                     "max_tokens": max_tokens if max_tokens else None
                 }
             )
+        
+        return self._finish_request(response.text, input_tokens, reservation)
+    
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Generate a response using Gemini's async API with rate limiting.
+        
+        Token counting and message conversion run in a worker thread, so they
+        overlap with the requests other agents have in flight.
+        
+        Args:
+            messages: List of message dictionaries
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Generated response text
+        """
+        loop = asyncio.get_running_loop()
+        input_tokens, gemini_messages = await loop.run_in_executor(None, self._prepare_request, messages)
+        
+        # Sleep without blocking other requests on the event loop
+        reservation = await self.rate_limiter.areserve(input_tokens, max_tokens if max_tokens else 1000)
+        
+        if len(gemini_messages) > 1:
+            chat = self._take_chat(gemini_messages[:-1])
+            response = await chat.send_message_async(gemini_messages[-1].get("parts", ""))
+            self._keep_chat(chat, gemini_messages, response.text)
+        else:
+            content = gemini_messages[0].get("parts", "") if gemini_messages else ""
+            response = await self.model.generate_content_async(
+                content,
+                generation_config={
+                    "temperature": temperature,
+                    "max_tokens": max_tokens if max_tokens else None
+                }
+            )
+        
+        return self._finish_request(response.text, input_tokens, reservation)
+    
+    def _take_chat(self, history: List[Dict[str, str]]) -> Any:
+        """Return a chat session holding the given history.
+        
+        The kept session is reused when it already holds exactly this
+        history, so the SDK does not re-validate the whole conversation.
+        It is taken out while in use, so concurrent calls never share it.
+        
+        Args:
+            history: Gemini-formatted messages before the one to send
+            
+        Returns:
+            Chat session to send the next message on
+        """
+        kept, self._chat = self._chat, None
+        if kept is not None and kept[1] == history:
+            return kept[0]
+        return self.model.start_chat(history=history)
+    
+    def _keep_chat(self, chat: Any, gemini_messages: List[Dict[str, str]], result_text: str) -> None:
+        """Keep a chat session for the next call after a successful reply.
+        
+        Args:
+            chat: Chat session the last message was sent on
+            gemini_messages: Gemini-formatted messages of the request
+            result_text: The model's reply, now also part of the session
+        """
+        self._chat = (chat, gemini_messages + [{"role": "model", "parts": result_text}])
+    
+    def _prepare_request(self, messages: List[Dict[str, str]]) -> Tuple[int, List[Dict[str, str]]]:
+        """Count input tokens and convert messages to Gemini's format.
+        
+        Args:
+            messages: List of message dictionaries
             
-            result_text = response.text
+        Returns:
+            Tuple of (input token count, Gemini-formatted messages)
+        """
+        input_tokens = self._count_messages_tokens(messages)
+        return input_tokens, self._convert_messages_to_gemini_format(messages)
+    
+    def _finish_request(self, result_text: str, input_tokens: int, reservation: Tuple[List, List]) -> str:
+        """Commit the actual usage of a completed request.
         
+        Args:
+            result_text: Generated response text
+            input_tokens: Input token count of the request
+            reservation: Handle returned by the rate limiter's reserve()
+            
+        Returns:
+            The response text
+        """
         # Estimate output tokens (Gemini API doesn't provide usage stats)
         output_tokens = self._count_tokens(result_text)
         
-        # Record the request
-        self.rate_limiter.record_request(input_tokens, output_tokens)
+        # Replace the estimate with the actual usage
+        self.rate_limiter.commit(reservation, input_tokens, output_tokens)
         
         return result_text
     
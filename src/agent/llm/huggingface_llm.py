@@ -1,11 +1,36 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
 from typing import List, Dict, Any, Optional
 from openai import OpenAI
+import sys
 import torch
-import tiktoken
-from .base import BaseLLM
+from .base import BaseLLM, TokenCountCacheMixin
+from .tokenizer import encoding_for_model
 
-class HuggingFaceLLM(BaseLLM):
+# Prepended to user messages whose oldest part was cut to fit the token limit
+_TRUNCATION_MARKER = "[...truncated...] "
+
+# Canonical roles, as stored by format_message()
+_SYSTEM = sys.intern("system")
+_USER = sys.intern("user")
+_ASSISTANT = sys.intern("assistant")
+_CANONICAL_ROLES = frozenset((_SYSTEM, _USER, _ASSISTANT))
+
+# Lowercased role names accepted by format_message(); others become user
+_ROLE_MAP = {
+    "system": _SYSTEM,
+    "user": _USER,
+    "assistant": _ASSISTANT,
+    "human": _USER,
+    "ai": _ASSISTANT
+}
+
+
+def _canonical_role(role: str) -> str:
+    """Lowercase a role, skipping the copy for roles that already are canonical."""
+    return role if role in _CANONICAL_ROLES else role.lower()
+
+
+class HuggingFaceLLM(TokenCountCacheMixin, BaseLLM):
     """HuggingFace model wrapper using vLLM's OpenAI-compatible API."""
     
     def __init__(
@@ -33,12 +58,8 @@ class HuggingFaceLLM(BaseLLM):
             base_url=api_base,
         )
         self.max_input_tokens = max_input_tokens
-        # Initialize tokenizer based on model
-        try:
-            self.tokenizer = tiktoken.encoding_for_model(model_name)
-        except KeyError:
-            # Fall back to cl100k_base for unknown models (used by GPT-4, GPT-3.5-turbo)
-            self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        # Initialize tokenizer based on model (shared between instances)
+        self.tokenizer = encoding_for_model(model_name)
     
     def _count_tokens(self, messages: List[Dict[str, str]]) -> int:
         """Count the number of tokens in a list of messages.
@@ -49,13 +70,13 @@ class HuggingFaceLLM(BaseLLM):
         Returns:
             Total token count
         """
-        token_count = 0
-        
-        for message in messages:
-            # Count tokens in content
-            token_count += len(self.tokenizer.encode(message["content"]))
-            # Add overhead for message format (role, etc.)
-            token_count += 4  # Approximate tokens for message formatting
+        # Count uncached contents with one batch call
+        token_count = sum(self._cached_count_batch(
+            [message["content"] for message in messages],
+            lambda batch: [len(tokens) for tokens in self.tokenizer.encode_ordinary_batch(batch)]
+        ))
+        # Add overhead for message format (role, etc.)
+        token_count += 4 * len(messages)  # Approximate tokens for message formatting
             
         # Add tokens for the formatting between messages
         token_count += 2  # Final assistant message tokens
@@ -74,52 +95,58 @@ class HuggingFaceLLM(BaseLLM):
         if not messages:
             return []
             
-        system_messages = [m for m in messages if m["role"].lower() == "system"]
-        non_system_messages = [m for m in messages if m["role"].lower() != "system"]
+        # Split system and other messages in one pass
+        system_messages = []
+        non_system_messages = []
+        for m in messages:
+            (system_messages if _canonical_role(m["role"]) == _SYSTEM else non_system_messages).append(m)
+        
+        # Encode every message once up front; a single message costs its
+        # content tokens plus the formatting overhead used by _count_tokens
+        content_tokens = {
+            id(message): tokens
+            for message, tokens in zip(
+                messages,
+                self.tokenizer.encode_ordinary_batch([m["content"] for m in messages])
+            )
+        }
         
         # Always keep system messages intact
         result = system_messages.copy()
-        token_budget = self.max_input_tokens - self._count_tokens(result)
+        token_budget = self.max_input_tokens - (sum(len(content_tokens[id(m)]) + 4 for m in result) + 2)
         
         # Process non-system messages from newest to oldest
         for message in reversed(non_system_messages):
-            message_tokens = self._count_tokens([message])
+            message_tokens = len(content_tokens[id(message)]) + 4 + 2
             
             if message_tokens <= token_budget:
                 # We can include the entire message
                 result.insert(len(system_messages), message)
                 token_budget -= message_tokens
-            elif message["role"].lower() == "user" and token_budget > 20:
-                # For user messages, we can truncate content if needed
-                # Keep enough tokens for comprehension (at least some portion)
-                content = message["content"]
-                # Estimate how much content to keep
-                keep_ratio = token_budget / message_tokens
-                # Truncate from beginning to keep most recent content
-                if keep_ratio < 0.5:
-                    # If we need to cut more than half, add indicator of truncation
-                    truncated_content = f"[...truncated...] {content[int(len(content) * (1 - keep_ratio + 0.1)):].strip()}"
-                else:
-                    truncated_content = content[int(len(content) * (1 - keep_ratio)):].strip()
-                
-                truncated_message = {
-                    "role": message["role"],
-                    "content": truncated_content
-                }
-                
-                # Verify the truncated message fits
-                truncated_tokens = self._count_tokens([truncated_message])
-                if truncated_tokens <= token_budget:
+            elif _canonical_role(message["role"]) == _USER and token_budget > 20:
+                # For user messages, keep the most recent tokens that fit next
+                # to the truncation marker and the formatting overhead
+                marker_tokens = len(self.tokenizer.encode_ordinary(_TRUNCATION_MARKER))
+                keep = token_budget - marker_tokens - 4 - 2
+                if keep > 0:
+                    # Decode the kept tail directly instead of guessing a character
+                    # offset; drop a partial character left by cutting inside a
+                    # multi-byte sequence
+                    kept_text = self.tokenizer.decode(content_tokens[id(message)][-keep:])
+                    truncated_message = {
+                        "role": message["role"],
+                        "content": _TRUNCATION_MARKER + kept_text.lstrip("\ufffd").strip()
+                    }
                     result.insert(len(system_messages), truncated_message)
-                    token_budget -= truncated_tokens
+                    token_budget -= keep + marker_tokens + 4 + 2
             
             # If we can't fit any more messages, stop
             if token_budget <= 20:  # Keep some buffer
                 break
-                
-        # Ensure the messages are in the correct order (system first, then chronological)
-        result.sort(key=lambda m: 0 if m["role"].lower() == "system" else 1)
         
+        # Messages are inserted right after the system messages while walking
+        # from newest to oldest, so result is already system first, then
+        # chronological
         return result
     
     def generate(
@@ -145,44 +172,38 @@ class HuggingFaceLLM(BaseLLM):
             messages = self._truncate_messages(messages)
             
         # vLLM expects strictly alternating user/assistant roles with an optional system message at the beginning
-        # Prepare the messages with the proper format
-        formatted_messages = []
+        # Prepare the messages with the proper format in a single pass
+        system_message = None
+        chat_messages = []
         
-        # First, check for a system message to include at the beginning
-        system_messages = [m for m in messages if m["role"].lower() == "system"]
-        if system_messages:
-            # Use the last system message if multiple exist
-            formatted_messages.append({
-                "role": "system",
-                "content": system_messages[-1]["content"]
-            })
-        
-        # Filter out system messages and process the rest
-        user_assistant_messages = [m for m in messages if m["role"].lower() != "system"]
-        
-        # Ensure messages alternate between user and assistant
-        current_role = "user"  # Start with user message
-        
-        for message in user_assistant_messages:
-            role = message["role"].lower()
+        for message in messages:
+            role = _canonical_role(message["role"])
+            if role == _SYSTEM:
+                # Use the last system message if multiple exist
+                system_message = message
+                continue
             
             # Map roles to either user or assistant
-            if role in ["user", "human"]:
-                mapped_role = "user"
+            if role == _USER or role == "human":
+                mapped_role = _USER
             else:
-                mapped_role = "assistant"
+                mapped_role = _ASSISTANT
             
             # If this message would create consecutive messages with the same role,
             # skip adding it to avoid the alternating pattern error
-            if formatted_messages and mapped_role == formatted_messages[-1]["role"]:
+            if chat_messages and mapped_role == chat_messages[-1]["role"]:
                 continue
             
             # Add the properly mapped message
-            formatted_messages.append({
+            chat_messages.append({
                 "role": mapped_role,
                 "content": message["content"]
             })
         
+        # Put the system message at the beginning
+        formatted_messages = [{"role": "system", "content": system_message["content"]}] if system_message else []
+        formatted_messages.extend(chat_messages)
+        
         # Make sure the last message is from the user, so the model will respond as assistant
         if not formatted_messages or formatted_messages[-1]["role"] != "user":
             # If we don't have any messages or the last one isn't from user, we need to add a user message
@@ -214,17 +235,10 @@ class HuggingFaceLLM(BaseLLM):
         Returns:
             Formatted message dictionary
         """
-        # Map to standard OpenAI roles if needed
-        if role.lower() not in ["system", "user", "assistant"]:
-            if role.lower() in ["human"]:
-                role = "user"
-            elif role.lower() in ["ai", "assistant"]:
-                role = "assistant"
-            else:
-                # Default unexpected roles to user
-                role = "user"
-                
-        return {"role": role, "content": content}
+        # Map to canonical lowercase OpenAI roles once, so the loops in
+        # generate() and _truncate_messages() need not lowercase them again.
+        # Unexpected roles default to user.
+        return {"role": _ROLE_MAP.get(role.lower(), _USER), "content": content}
     
     def _messages_to_prompt(self, messages: List[Dict[str, str]]) -> str:
         """Convert messages to a single prompt string.
@@ -1,18 +1,35 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
-from typing import List, Dict, Any, Optional
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
+import logging
 import openai
-import tiktoken
-from .base import BaseLLM
+from .base import BaseLLM, TokenCountCacheMixin
+from .tokenizer import encoding_for_model
 from .rate_limiter import RateLimiter
 
-class OpenAILLM(BaseLLM):
+logger = logging.getLogger(__name__)
+
+# Default rate limits for GPT-4o-mini
+_DEFAULT_LIMITS = MappingProxyType({
+    "requests_per_minute": 500,
+    "input_tokens_per_minute": 200000,
+    "output_tokens_per_minute": 100000,
+    "input_token_price_per_million": 0.15,
+    "output_token_price_per_million": 0.60
+})
+
+
+class OpenAILLM(TokenCountCacheMixin, BaseLLM):
     """OpenAI API wrapper."""
     
     def __init__(
         self,
         api_key: str,
         model: str,
-        rate_limits: Optional[Dict[str, Any]] = None
+        rate_limits: Optional[Dict[str, Any]] = None,
+        rate_limiter: Optional[RateLimiter] = None
     ):
         """Initialize OpenAI LLM.
         
@@ -20,38 +37,40 @@ class OpenAILLM(BaseLLM):
             api_key: OpenAI API key
             model: Model identifier (e.g., "gpt-4", "gpt-3.5-turbo")
             rate_limits: Optional dictionary with rate limit settings
+            rate_limiter: Optional rate limiter to share with other instances;
+                created from rate_limits if None
         """
         self.client = openai.OpenAI(api_key=api_key)
+        self.async_client = None  # Created by agenerate() on first use
         self.model = model
         
-        try:
-            # Initialize tokenizer for the model
-            self.tokenizer = tiktoken.encoding_for_model(model)
-        except:
-            # Fallback to cl100k_base for new models
-            self.tokenizer = tiktoken.get_encoding("cl100k_base")
-        
-        # Default rate limits for GPT-4o-mini
-        default_limits = {
-            "requests_per_minute": 500,
-            "input_tokens_per_minute": 200000,
-            "output_tokens_per_minute": 100000,
-            "input_token_price_per_million": 0.15,
-            "output_token_price_per_million": 0.60
-        }
-        
-        # Use provided rate limits or defaults
-        limits = rate_limits or default_limits
+        # System messages last hashed with their hash, replaced as one tuple
+        # so concurrent requests never see a mismatched pair
+        self._last_prefix: Tuple[Tuple[Dict[str, str], ...], Optional[str]] = ((), None)
+        # Prefix hashes already sent, so alternating prompts do not warn
+        self._seen_prefix_hashes = set()
+        
+        # Initialize tokenizer for the model (shared between instances)
+        self.tokenizer = encoding_for_model(model)
         
         # Initialize rate limiter
-        self.rate_limiter = RateLimiter(
-            provider="OpenAI",
-            requests_per_minute=limits.get("requests_per_minute", default_limits["requests_per_minute"]),
-            input_tokens_per_minute=limits.get("input_tokens_per_minute", default_limits["input_tokens_per_minute"]),
-            output_tokens_per_minute=limits.get("output_tokens_per_minute", default_limits["output_tokens_per_minute"]),
-            input_token_price_per_million=limits.get("input_token_price_per_million", default_limits["input_token_price_per_million"]),
-            output_token_price_per_million=limits.get("output_token_price_per_million", default_limits["output_token_price_per_million"])
-        )
+        if rate_limiter is None:
+            rate_limiter = self.create_rate_limiter(rate_limits)
+        self.rate_limiter = rate_limiter
+    
+    @staticmethod
+    def create_rate_limiter(rate_limits: Optional[Dict[str, Any]] = None) -> RateLimiter:
+        """Create a rate limiter for the OpenAI API.
+        
+        Args:
+            rate_limits: Optional dictionary with rate limit settings; provided
+                values override the defaults key by key
+            
+        Returns:
+            Rate limiter that can be shared by several OpenAILLM instances
+        """
+        limits = {**_DEFAULT_LIMITS, **(rate_limits or {})}
+        return RateLimiter(provider="OpenAI", **{key: limits[key] for key in _DEFAULT_LIMITS})
     
     def _count_tokens(self, text: str) -> int:
         """Count tokens in a string using the model's tokenizer.
@@ -66,13 +85,13 @@ class OpenAILLM(BaseLLM):
             return 0
             
         try:
-            return len(self.tokenizer.encode(text))
+            return self._cached_count(("text", text), lambda: len(self.tokenizer.encode(text)))
         except Exception as e:
             # Log the error but don't fail
             import logging
             logging.warning(f"Failed to count tokens with OpenAI tokenizer: {e}")
-            # Fallback: rough estimate if tokenizer fails
-            return len(text.split()) * 1.3
+            # Fallback: ~4 characters per token if tokenizer fails
+            return max(1, len(text) // 4)
     
     def _count_messages_tokens(self, messages: List[Dict[str, str]]) -> int:
         """Count tokens in all messages.
@@ -85,13 +104,25 @@ class OpenAILLM(BaseLLM):
         """
         if not messages:
             return 0
-            
-        total_tokens = 0
         
-        # Count tokens in each message
-        for message in messages:
-            if "content" in message and message["content"]:
-                total_tokens += self._count_tokens(message["content"])
+        # Counting the same history again (e.g. on a retry) costs nothing
+        total_tokens = self._last_messages_count(messages)
+        if total_tokens is not None:
+            return total_tokens
+            
+        # Encode all uncached messages in one batch call
+        contents = [message["content"] for message in messages if message.get("content")]
+        try:
+            total_tokens = sum(self._cached_count_batch(
+                contents,
+                lambda batch: [len(tokens) for tokens in self.tokenizer.encode_ordinary_batch(batch)]
+            ))
+        except Exception as e:
+            # Log the error but don't fail
+            import logging
+            logging.warning(f"Failed to count tokens with OpenAI tokenizer: {e}")
+            # Fallback: ~4 characters per token if tokenizer fails
+            total_tokens = sum(max(1, len(content) // 4) for content in contents)
             
         # Add overhead for message formatting (varies by model, but ~4 tokens per message)
         total_tokens += 4 * len(messages)
@@ -99,6 +130,7 @@ class OpenAILLM(BaseLLM):
         # Add tokens for model overhead (varies by model)
         total_tokens += 3  # Every reply is primed with <|start|>assistant<|message|>
         
+        self._remember_messages_count(messages, total_tokens)
         return total_tokens
     
     def generate(
@@ -117,27 +149,151 @@ class OpenAILLM(BaseLLM):
         Returns:
             Generated response text
         """
-        # Count input tokens
-        input_tokens = self._count_messages_tokens(messages)
+        messages, prefix_hash, input_tokens = self._prepare_request(messages)
         
-        # Wait if we're approaching rate limits (estimate output tokens as max_output_tokens)
-        self.rate_limiter.wait_if_needed(input_tokens, max_tokens)
+        # Wait if we're approaching rate limits and book the request (estimate output tokens as max_output_tokens)
+        reservation = self.rate_limiter.reserve(input_tokens, max_tokens)
         
         # Make the API call
         response = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             temperature=temperature,
-            max_tokens=max_tokens if max_tokens else None
+            max_tokens=max_tokens if max_tokens else None,
+            **self._cache_options(prefix_hash)
+        )
+        
+        return self._finish_request(response, input_tokens, reservation)
+    
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """Generate a response using the async OpenAI client with rate limiting.
+        
+        Message ordering and token counting run in a worker thread, so they
+        overlap with the requests other agents have in flight instead of
+        stalling the loop.
+        
+        Args:
+            messages: List of message dictionaries
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Generated response text
+        """
+        loop = asyncio.get_running_loop()
+        messages, prefix_hash, input_tokens = await loop.run_in_executor(None, self._prepare_request, messages)
+        
+        # Sleep without blocking other requests on the event loop
+        reservation = await self.rate_limiter.areserve(input_tokens, max_tokens)
+        
+        # Create the async client on first use, sharing the sync client's key
+        if self.async_client is None:
+            self.async_client = openai.AsyncOpenAI(api_key=self.client.api_key)
+        
+        # Make the API call
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens if max_tokens else None,
+            **self._cache_options(prefix_hash)
         )
         
+        return self._finish_request(response, input_tokens, reservation)
+    
+    def _prepare_request(self, messages: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], Optional[str], int]:
+        """Put system messages first, hash the prefix and count input tokens.
+        
+        OpenAI only reuses cached prompt prefixes that are byte-identical, so
+        the static system prompt always leads, followed by the conversation.
+        
+        Args:
+            messages: List of message dictionaries
+            
+        Returns:
+            Tuple of (ordered messages, prefix hash or None when the request
+            has no system prompt, input token count)
+        """
+        system_messages = tuple(message for message in messages if message["role"] == "system")
+        if any(message["role"] != "system" for message in messages[:len(system_messages)]):
+            # Keep the relative order of the other messages
+            messages = [*system_messages, *(message for message in messages if message["role"] != "system")]
+        
+        prefix_hash = self._hash_prefix(system_messages)
+        return messages, prefix_hash, self._count_messages_tokens(messages)
+    
+    def _hash_prefix(self, system_messages: Tuple[Dict[str, str], ...]) -> Optional[str]:
+        """Hash the system messages, warning when a new prompt prefix appears.
+        
+        Args:
+            system_messages: System messages of the request, in order
+            
+        Returns:
+            Hex digest of the system messages, or None if there are none
+        """
+        if not system_messages:
+            # Without a system prompt there is no static prefix to key the cache on
+            return None
+        
+        # Agents reuse their system message objects, so most calls skip hashing
+        previous_messages, previous_hash = self._last_prefix
+        if len(system_messages) == len(previous_messages) and all(
+            message is previous for message, previous in zip(system_messages, previous_messages)
+        ):
+            return previous_hash
+        
+        digest = hashlib.blake2b(digest_size=16)
+        for message in system_messages:
+            data = message["content"].encode("utf-8", "surrogatepass")
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+        prefix_hash = digest.hexdigest()
+        
+        if prefix_hash not in self._seen_prefix_hashes:
+            if self._seen_prefix_hashes:
+                logger.warning("System prompt changed for %s; cached prompt prefixes will not be reused", self.model)
+            self._seen_prefix_hashes.add(prefix_hash)
+        self._last_prefix = (system_messages, prefix_hash)
+        return prefix_hash
+    
+    @staticmethod
+    def _cache_options(prefix_hash: Optional[str]) -> Dict[str, Any]:
+        """Build the prompt cache arguments for chat.completions.create.
+        
+        Args:
+            prefix_hash: Prefix hash returned by _prepare_request for this request
+            
+        Returns:
+            Keyword arguments passing the prefix hash as the prompt cache key, or
+            an empty dictionary when the request has no system prompt
+        """
+        if prefix_hash is None:
+            return {}
+        return {"extra_body": {"prompt_cache_key": prefix_hash}}
+    
+    def _finish_request(self, response: Any, input_tokens: int, reservation: Tuple[List, List]) -> str:
+        """Extract the response text and commit the actual usage.
+        
+        Args:
+            response: Response returned by chat.completions.create
+            input_tokens: Estimated input token count of the request
+            reservation: Handle returned by the rate limiter's reserve()
+            
+        Returns:
+            Generated response text
+        """
         result_text = response.choices[0].message.content
         
         # Count output tokens and record request
         output_tokens = response.usage.completion_tokens if hasattr(response, 'usage') else self._count_tokens(result_text)
         input_tokens = response.usage.prompt_tokens if hasattr(response, 'usage') else input_tokens
         
-        self.rate_limiter.record_request(input_tokens, output_tokens)
+        self.rate_limiter.commit(reservation, input_tokens, output_tokens)
         
         return result_text
     
@@ -1,8 +1,9 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from collections import deque
 import threading
+import asyncio
 import logging
 
 # Configure logging
@@ -50,8 +51,8 @@ class RateLimiter:
         
         # Track usage within a sliding window (1 minute)
         self.request_timestamps = deque()
-        self.input_token_usage = deque()  # Tuples of (timestamp, token_count)
-        self.output_token_usage = deque()  # Tuples of (timestamp, token_count)
+        self.input_token_usage = deque()  # (timestamp, token_count) pairs
+        self.output_token_usage = deque()  # (timestamp, token_count) pairs
         
         # Total usage stats
         self.total_requests = 0
@@ -66,9 +67,9 @@ class RateLimiter:
         """Remove entries older than 1 minute from the queue."""
         one_minute_ago = current_time - 60
         
-        # Handle different queue formats (timestamps vs. (timestamp, value) tuples)
-        if usage_queue and isinstance(usage_queue[0], tuple):
-            # For token usage queues that store (timestamp, count) tuples
+        # Handle different queue formats (timestamps vs. (timestamp, value) pairs)
+        if usage_queue and isinstance(usage_queue[0], (tuple, list)):
+            # For token usage queues that store (timestamp, count) pairs
             while usage_queue and usage_queue[0][0] < one_minute_ago:
                 usage_queue.popleft()
         else:
@@ -80,66 +81,220 @@ class RateLimiter:
         """Get the total count from a usage queue."""
         return sum(count for _, count in usage_queue)
     
+    def _check_request_size(self, input_tokens: int, estimated_output_tokens: Optional[int]) -> int:
+        """
+        Fill in the output estimate and warn about requests that can never fit.
+        
+        Args:
+            input_tokens: Number of input tokens for the upcoming request
+            estimated_output_tokens: Estimated number of output tokens
+            
+        Returns:
+            The estimated number of output tokens
+        """
+        if estimated_output_tokens is None:
+            estimated_output_tokens = input_tokens // 2  # Rough fallback estimate
+        
+        # If this single request is bigger than the entire capacity, warn or handle
+        if input_tokens > self.input_tokens_per_minute or estimated_output_tokens > self.output_tokens_per_minute:
+            logger.warning(
+                f"Request uses more tokens ({input_tokens} in / {estimated_output_tokens} out) "
+                f"than the configured per-minute capacity. This request may never succeed."
+            )
+        return estimated_output_tokens
+    
+    def _get_wait_time(self, input_tokens: int, estimated_output_tokens: int) -> float:
+        """
+        Compute how long to wait before the upcoming request fits the limits.
+        
+        Must be called with the lock held.
+        
+        Args:
+            input_tokens: Number of input tokens for the upcoming request
+            estimated_output_tokens: Estimated number of output tokens
+            
+        Returns:
+            Seconds to wait, or 0 if the request can proceed now
+        """
+        current_time = time.time()
+        
+        # Clean up old entries
+        self._clean_old_entries(self.request_timestamps, current_time)
+        self._clean_old_entries(self.input_token_usage, current_time)
+        self._clean_old_entries(self.output_token_usage, current_time)
+        
+        # Calculate current usage
+        current_requests = len(self.request_timestamps)
+        current_input_tokens = self._get_usage_count(self.input_token_usage)
+        current_output_tokens = self._get_usage_count(self.output_token_usage)
+        
+        # Check if adding this request would exceed limits
+        if ((current_requests + 1) <= self.requests_per_minute and
+            (current_input_tokens + input_tokens) <= self.input_tokens_per_minute and
+            (current_output_tokens + estimated_output_tokens) <= self.output_tokens_per_minute):
+            # We can proceed now
+            return 0
+        
+        # Otherwise, compute how long to wait
+        wait_time = 0
+        if self.request_timestamps:
+            wait_time = max(wait_time, 60 - (current_time - self.request_timestamps[0]))
+        if self.input_token_usage:
+            wait_time = max(wait_time, 60 - (current_time - self.input_token_usage[0][0]))
+        if self.output_token_usage:
+            wait_time = max(wait_time, 60 - (current_time - self.output_token_usage[0][0]))
+        
+        # If wait_time is still <= 0, we won't fix usage by waiting
+        if wait_time <= 0:
+            logger.warning(
+                "Waiting cannot reduce usage enough to allow this request; "
+                "request exceeds per-minute capacity or usage remains too high."
+            )
+            return 0
+        
+        return wait_time
+    
     def wait_if_needed(self, input_tokens: int, estimated_output_tokens: Optional[int] = None):
         """
         Check if we're about to exceed rate limits and wait if necessary.
         This improved version uses a while loop instead of recursion to
         avoid potential infinite waiting scenarios.
         
+        The lock is only held while checking usage, so other threads and the
+        event loop can keep going while this one sleeps.
+        
+        Args:
+            input_tokens: Number of input tokens for the upcoming request
+            estimated_output_tokens: Estimated number of output tokens
+        """
+        with self.lock:
+            estimated_output_tokens = self._check_request_size(input_tokens, estimated_output_tokens)
+        
+        while True:
+            with self.lock:
+                wait_time = self._get_wait_time(input_tokens, estimated_output_tokens)
+            if wait_time <= 0:
+                break
+            
+            logger.info(f"Rate limit approaching for {self.provider}. Waiting {wait_time:.2f} seconds...")
+            time.sleep(wait_time)
+    
+    async def await_if_needed(self, input_tokens: int, estimated_output_tokens: Optional[int] = None):
+        """
+        Async version of wait_if_needed.
+        
+        The lock is only held while checking usage, so other coroutines and
+        threads can keep going while this one sleeps.
+        
         Args:
             input_tokens: Number of input tokens for the upcoming request
             estimated_output_tokens: Estimated number of output tokens
         """
         with self.lock:
-            if estimated_output_tokens is None:
-                estimated_output_tokens = input_tokens // 2  # Rough fallback estimate
+            estimated_output_tokens = self._check_request_size(input_tokens, estimated_output_tokens)
+        
+        while True:
+            with self.lock:
+                wait_time = self._get_wait_time(input_tokens, estimated_output_tokens)
+            if wait_time <= 0:
+                break
             
-            # If this single request is bigger than the entire capacity, warn or handle
-            if input_tokens > self.input_tokens_per_minute or estimated_output_tokens > self.output_tokens_per_minute:
-                logger.warning(
-                    f"Request uses more tokens ({input_tokens} in / {estimated_output_tokens} out) "
-                    f"than the configured per-minute capacity. This request may never succeed."
-                )
+            logger.info(f"Rate limit approaching for {self.provider}. Waiting {wait_time:.2f} seconds...")
+            await asyncio.sleep(wait_time)
+    
+    def reserve(self, input_tokens: int, estimated_output_tokens: Optional[int] = None) -> Tuple[List, List]:
+        """
+        Wait until a request fits the limits and book its usage in one step.
+        
+        Unlike wait_if_needed() followed by record_request(), no other
+        request can take the capacity between the check and the booking.
+        The output estimate is booked until commit() replaces it.
+        
+        Args:
+            input_tokens: Number of input tokens for the upcoming request
+            estimated_output_tokens: Estimated number of output tokens
             
-            while True:
-                current_time = time.time()
-                
-                # Clean up old entries
-                self._clean_old_entries(self.request_timestamps, current_time)
-                self._clean_old_entries(self.input_token_usage, current_time)
-                self._clean_old_entries(self.output_token_usage, current_time)
-                
-                # Calculate current usage
-                current_requests = len(self.request_timestamps)
-                current_input_tokens = self._get_usage_count(self.input_token_usage)
-                current_output_tokens = self._get_usage_count(self.output_token_usage)
-                
-                # Check if adding this request would exceed limits
-                if ((current_requests + 1) <= self.requests_per_minute and
-                    (current_input_tokens + input_tokens) <= self.input_tokens_per_minute and
-                    (current_output_tokens + estimated_output_tokens) <= self.output_tokens_per_minute):
-                    # We can proceed now
-                    break
-                
-                # Otherwise, compute how long to wait
-                wait_time = 0
-                if self.request_timestamps:
-                    wait_time = max(wait_time, 60 - (current_time - self.request_timestamps[0]))
-                if self.input_token_usage:
-                    wait_time = max(wait_time, 60 - (current_time - self.input_token_usage[0][0]))
-                if self.output_token_usage:
-                    wait_time = max(wait_time, 60 - (current_time - self.output_token_usage[0][0]))
-                
-                # If wait_time is still <= 0, we won't fix usage by waiting
+        Returns:
+            Handle to pass to commit() once the request has completed
+        """
+        with self.lock:
+            estimated_output_tokens = self._check_request_size(input_tokens, estimated_output_tokens)
+        
+        # Sleep outside the lock and re-check afterwards, booking under the
+        # same lock as the final check
+        while True:
+            with self.lock:
+                wait_time = self._get_wait_time(input_tokens, estimated_output_tokens)
                 if wait_time <= 0:
-                    logger.warning(
-                        "Waiting cannot reduce usage enough to allow this request; "
-                        "request exceeds per-minute capacity or usage remains too high."
-                    )
-                    break
-                
-                logger.info(f"Rate limit approaching for {self.provider}. Waiting {wait_time:.2f} seconds...")
-                time.sleep(wait_time)
+                    return self._book(input_tokens, estimated_output_tokens)
+            
+            logger.info(f"Rate limit approaching for {self.provider}. Waiting {wait_time:.2f} seconds...")
+            time.sleep(wait_time)
+    
+    def _book(self, input_tokens: int, estimated_output_tokens: int) -> Tuple[List, List]:
+        """
+        Add a reserved request to the usage window.
+        
+        Must be called with the lock held.
+        
+        Args:
+            input_tokens: Number of input tokens for the upcoming request
+            estimated_output_tokens: Estimated number of output tokens
+            
+        Returns:
+            Handle to pass to commit() once the request has completed
+        """
+        current_time = time.time()
+        
+        # Mutable entries, so commit() can correct them in place
+        input_entry = [current_time, input_tokens]
+        output_entry = [current_time, estimated_output_tokens]
+        self.request_timestamps.append(current_time)
+        self.input_token_usage.append(input_entry)
+        self.output_token_usage.append(output_entry)
+        
+        return input_entry, output_entry
+    
+    async def areserve(self, input_tokens: int, estimated_output_tokens: Optional[int] = None) -> Tuple[List, List]:
+        """
+        Async version of reserve.
+        
+        The lock is only held while checking and booking, so other coroutines
+        and threads can keep going while this one sleeps.
+        
+        Args:
+            input_tokens: Number of input tokens for the upcoming request
+            estimated_output_tokens: Estimated number of output tokens
+            
+        Returns:
+            Handle to pass to commit() once the request has completed
+        """
+        with self.lock:
+            estimated_output_tokens = self._check_request_size(input_tokens, estimated_output_tokens)
+        
+        while True:
+            with self.lock:
+                wait_time = self._get_wait_time(input_tokens, estimated_output_tokens)
+                if wait_time <= 0:
+                    return self._book(input_tokens, estimated_output_tokens)
+            
+            logger.info(f"Rate limit approaching for {self.provider}. Waiting {wait_time:.2f} seconds...")
+            await asyncio.sleep(wait_time)
+    
+    def commit(self, handle: Tuple[List, List], input_tokens: int, output_tokens: int):
+        """
+        Replace a reservation's estimates with the actual usage and record its cost.
+        
+        Args:
+            handle: Handle returned by reserve()
+            input_tokens: Number of input tokens used
+            output_tokens: Number of output tokens generated
+        """
+        input_entry, output_entry = handle
+        with self.lock:
+            input_entry[1] = input_tokens
+            output_entry[1] = output_tokens
+            self._record_totals(input_tokens, output_tokens)
     
     def record_request(self, input_tokens: int, output_tokens: int):
         """
@@ -157,24 +312,36 @@ class RateLimiter:
             self.input_token_usage.append((current_time, input_tokens))
             self.output_token_usage.append((current_time, output_tokens))
             
-            # Update total stats
-            self.total_requests += 1
-            self.total_input_tokens += input_tokens
-            self.total_output_tokens += output_tokens
-            
-            # Calculate cost
-            input_cost = input_tokens * self.input_token_price
-            output_cost = output_tokens * self.output_token_price
-            total_cost = input_cost + output_cost
-            self.total_cost += total_cost
-            
-            # Log usage and cost
-            logger.info(
-                f"{self.provider} Request: {self.total_requests} | "
-                f"Tokens: {input_tokens}in/{output_tokens}out | "
-                f"Cost: ${total_cost:.6f} | "
-                f"Total Cost: ${self.total_cost:.6f}"
-            )
+            self._record_totals(input_tokens, output_tokens)
+    
+    def _record_totals(self, input_tokens: int, output_tokens: int):
+        """
+        Update the total usage stats and log the request's cost.
+        
+        Must be called with the lock held.
+        
+        Args:
+            input_tokens: Number of input tokens used
+            output_tokens: Number of output tokens generated
+        """
+        # Update total stats
+        self.total_requests += 1
+        self.total_input_tokens += input_tokens
+        self.total_output_tokens += output_tokens
+        
+        # Calculate cost
+        input_cost = input_tokens * self.input_token_price
+        output_cost = output_tokens * self.output_token_price
+        total_cost = input_cost + output_cost
+        self.total_cost += total_cost
+        
+        # Log usage and cost
+        logger.info(
+            f"{self.provider} Request: {self.total_requests} | "
+            f"Tokens: {input_tokens}in/{output_tokens}out | "
+            f"Cost: ${total_cost:.6f} | "
+            f"Total Cost: ${self.total_cost:.6f}"
+        )
     
     def print_usage_stats(self):
         """Print current usage statistics."""
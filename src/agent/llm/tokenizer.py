@@ -0,0 +1,36 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates
+from functools import lru_cache
+import tiktoken
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str) -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process.
+
+    Loading parses the whole BPE merge table, so every LLM instance shares the
+    same Encoding object instead of building its own.
+
+    Args:
+        name: Encoding name (e.g., "cl100k_base")
+
+    Returns:
+        The shared Encoding
+    """
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=None)
+def encoding_for_model(model: str) -> tiktoken.Encoding:
+    """Load the encoding used by a model once per process.
+
+    Args:
+        model: Model name
+
+    Returns:
+        The model's shared Encoding, or cl100k_base for models tiktoken does not know
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Fall back to cl100k_base for unknown models (used by GPT-4, GPT-3.5-turbo)
+        return get_encoding("cl100k_base")
@@ -10,7 +10,7 @@ from visualizer import StatusVisualizer
 import re
 import yaml
 import ast
-import tiktoken
+from .llm.tokenizer import get_encoding
 
 # Dummy visualizer class that mimics StatusVisualizer but does nothing
 class DummyVisualizer:
@@ -373,7 +373,7 @@ class Orchestrator(BaseAgent):
         """
         try:
             # Use tiktoken to count tokens
-            encoding = tiktoken.get_encoding("cl100k_base")  # Using a common encoding
+            encoding = get_encoding("cl100k_base")  # Using a common encoding, loaded once
             current_tokens = len(encoding.encode(self.context))
             
             # Check if we need to truncate considering both context and focal component tokens
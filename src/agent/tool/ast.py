@@ -1,5 +1,6 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
 import ast
+import io
 from typing import Dict, List, Optional, Set, Tuple, Union
 from pathlib import Path
 import os
@@ -122,6 +123,7 @@ class CallGraphBuilder(ASTUtility):
         self.method_info = {}
         self.function_info = {}
         self.file_asts = {}
+        self.file_lines = {}  # Lines of the text each cached AST was parsed from
         self._build_call_graph()
     
     def _parse_file(self, file_path: str) -> ast.AST:
@@ -142,6 +144,7 @@ class CallGraphBuilder(ASTUtility):
         # Add parent references
         transformer = ParentNodeTransformer()
         tree = transformer.visit(tree)
+        self.file_lines[file_path] = io.StringIO(content).readlines()
         self.file_asts[file_path] = tree
         return tree
 
@@ -185,9 +188,10 @@ class CallGraphBuilder(ASTUtility):
             file_path (str): Path to the file relative to repo_path
             node (ast.AST): The AST node to get code for
         """
-        abs_path = self.repo_path / file_path
-        with open(abs_path) as f:
-            content = f.readlines()
+        # Slice the text the node was parsed from; the file may have been
+        # rewritten since, which would shift the line numbers
+        self._parse_file(file_path)
+        content = self.file_lines[file_path]
         return ''.join(content[node.lineno-1:node.end_lineno])
 
     def _is_method(self, node: ast.FunctionDef) -> bool:
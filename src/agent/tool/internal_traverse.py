@@ -98,14 +98,12 @@ class ASTNodeAnalyzer:
             
         # Parse the target file and find the class
         try:
-            with open(full_file_path, 'r') as f:
-                file_content = f.read()
-                target_ast = ast.parse(file_content)
+            file_content, target_ast = self._read_file(full_file_path)
                 
             # Find the class in the target file
             for node in ast.walk(target_ast):
                 if isinstance(node, ast.ClassDef) and node.name == class_name:
-                    return self._get_node_source(target_file_path, node)
+                    return self._get_node_source(target_file_path, node, file_content)
         except Exception as e:
             return f"Error retrieving class {class_name}: {e}"
             
@@ -148,14 +146,12 @@ class ASTNodeAnalyzer:
         
         # Parse the target file and find the function
         try:
-            with open(full_file_path, 'r') as f:
-                file_content = f.read()
-                target_ast = ast.parse(file_content)
+            file_content, target_ast = self._read_file(full_file_path)
                 
             # Find the function in the target file
             for node in ast.walk(target_ast):
                 if isinstance(node, ast.FunctionDef) and node.name == function_name:
-                    return self._get_node_source(target_file_path, node)
+                    return self._get_node_source(target_file_path, node, file_content)
         except Exception as e:
             return f"Error retrieving function {function_name}: {e}"
             
@@ -207,9 +203,7 @@ class ASTNodeAnalyzer:
         
         # Parse the target file and find the class and method
         try:
-            with open(full_file_path, 'r') as f:
-                file_content = f.read()
-                target_ast = ast.parse(file_content)
+            file_content, target_ast = self._read_file(full_file_path)
                 
             # Find the class in the target file
             for node in ast.walk(target_ast):
@@ -217,7 +211,7 @@ class ASTNodeAnalyzer:
                     # Find the method in the class
                     for item in node.body:
                         if isinstance(item, ast.FunctionDef) and item.name == method_name:
-                            return self._get_node_source(target_file_path, item)
+                            return self._get_node_source(target_file_path, item, file_content)
         except Exception as e:
             return f"Error retrieving method {class_name}.{method_name}: {e}"
             
@@ -348,7 +342,8 @@ class ASTNodeAnalyzer:
             folder_path = os.path.join(*path_parts[:-2]) if len(path_parts) > 2 else ''
             target_file_path = os.path.join(folder_path, file_name)
             
-            # Check for calls in the current file
+            # Check for calls in the current file, slicing every caller from one read
+            file_content = None
             for node in ast.walk(ast_tree):
                 # Skip the component itself
                 if node == ast_node:
@@ -356,7 +351,9 @@ class ASTNodeAnalyzer:
                 # Check if this is a function, async function, or class definition
                 if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
                     if self._contains_call_to(node, component_name):
-                        parent_components.append(self._get_node_source(target_file_path, node))
+                        if file_content is None:
+                            file_content = self._read_source(os.path.join(self.repo_path, target_file_path))
+                        parent_components.append(self._get_node_source(target_file_path, node, file_content))
             
             return parent_components
         
@@ -532,21 +529,54 @@ class ASTNodeAnalyzer:
         call_name = self._get_call_name(call_node)
         return f"{call_name}(...)"
 
-    def _get_node_source(self, file_path: str, node: ast.AST) -> str:
+    @staticmethod
+    def _read_source(full_path: str) -> str:
+        """
+        Read a file's text in a single read.
+
+        Docstring writers replace files atomically, so one read always sees a
+        complete version of the file, even while other workers write to it.
+
+        Args:
+            full_path: Absolute path of the file
+
+        Returns:
+            The file content
+        """
+        with open(full_path, 'r') as f:
+            return f.read()
+
+    def _read_file(self, full_path: str) -> Tuple[str, ast.AST]:
+        """
+        Read and parse a file, returning the text the tree was parsed from.
+
+        Node sources must be sliced from this same text: reading the file again
+        could pick up a newer version whose line numbers no longer match the tree.
+
+        Args:
+            full_path: Absolute path of the file
+
+        Returns:
+            Tuple of (file content, parsed AST)
+        """
+        file_content = self._read_source(full_path)
+        return file_content, ast.parse(file_content)
+
+    def _get_node_source(self, file_path: str, node: ast.AST, file_content: Optional[str] = None) -> str:
         """
         Get the source code for an AST node from the original file.
 
         Args:
             file_path: Path to the file containing the node
             node: AST node to get the source for
+            file_content: Text the node was parsed from; the file is read if None
 
         Returns:
             Source code for the node, or an error message
         """
         try:
-            full_path = os.path.join(self.repo_path, file_path)
-            with open(full_path, 'r') as f:
-                file_content = f.read()
+            if file_content is None:
+                file_content = self._read_source(os.path.join(self.repo_path, file_path))
 
             start_line = node.lineno
             end_line = self._get_end_line(node, file_content)
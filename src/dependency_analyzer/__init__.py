@@ -4,12 +4,13 @@ Dependency analyzer module for building and processing import dependency graphs
 between Python code components.
 """
 
-from .ast_parser import CodeComponent, DependencyParser
+from .ast_parser import CodeComponent, DependencyParser, parse_source
 from .topo_sort import topological_sort, resolve_cycles, build_graph_from_components, dependency_first_dfs
 
 __all__ = [
     'CodeComponent', 
     'DependencyParser',
+    'parse_source',
     'topological_sort',
     'resolve_cycles',
     'build_graph_from_components',
@@ -11,12 +11,20 @@ import os
 import json
 import logging
 import builtins
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Dict, List, Set, Tuple, Optional, Any, Union
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# orjson is optional; it serializes large dependency graphs much faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Built-in Python types and modules that should be excluded from dependencies
 BUILTIN_TYPES = {name for name in dir(builtins)}
 STANDARD_MODULES = {
@@ -64,6 +72,9 @@ class CodeComponent:
     
     # Content of the docstring if it exists, empty string otherwise
     docstring: str = ""
+    
+    # Token count of source_code, filled in by callers that tokenize up front
+    token_count: Optional[int] = None
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert this component to a dictionary representation for JSON serialization."""
@@ -302,6 +313,24 @@ class DependencyCollector(ast.NodeVisitor):
         self.dependencies.add(local_component_id)
 
 
+def parse_source(source: str, filename: str = "<unknown>") -> ast.AST:
+    """
+    Parse Python source code into an AST.
+    
+    Equivalent to ast.parse(source, filename) with type comments disabled, but
+    calls compile directly with only PyCF_ONLY_AST set and without inheriting
+    the caller's future flags.
+    
+    Args:
+        source: The Python source code
+        filename: File name used in syntax error messages
+    
+    Returns:
+        The parsed module
+    """
+    return compile(source, filename, "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
+
+
 def add_parent_to_nodes(tree: ast.AST) -> None:
     """
     Add a 'parent' attribute to each node in the AST.
@@ -324,6 +353,14 @@ class DependencyParser:
         self.components: Dict[str, CodeComponent] = {}
         self.dependency_graph: Dict[str, List[str]] = {}
         self.modules: Set[str] = set()
+        # Source text of files read so far, keyed by path, as (mtime, source)
+        self._source_cache: Dict[str, Tuple[float, str]] = {}
+        # Parsed files keyed by path, as (source, tree, import_collector)
+        self._tree_cache: Dict[str, Tuple[str, ast.AST, ImportCollector]] = {}
+        # IDs of the components collected from each parsed file
+        self._file_components: Dict[str, Set[str]] = {}
+        # Serializes re-parses, which may run on several threads at once
+        self._lock = threading.RLock()
         
     def parse_repository(self):
         """
@@ -331,21 +368,26 @@ class DependencyParser:
         """
         logger.info(f"Parsing repository at {self.repo_path}")
         
+        file_paths = [
+            os.path.join(root, file)
+            for root, _, files in os.walk(self.repo_path)
+            for file in files
+            if file.endswith(".py")
+        ]
+        
+        # Read all files up front so their I/O overlaps
+        self._prefetch_sources(file_paths)
+        
         # First pass: collect all modules and code components
-        for root, _, files in os.walk(self.repo_path):
-            for file in files:
-                if not file.endswith(".py"):
-                    continue
-                
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, self.repo_path)
-                
-                # Convert file path to module path
-                module_path = self._file_to_module_path(relative_path)
-                self.modules.add(module_path)
-                
-                # Parse the file to collect components
-                self._parse_file(file_path, relative_path, module_path)
+        for file_path in file_paths:
+            relative_path = os.path.relpath(file_path, self.repo_path)
+            
+            # Convert file path to module path
+            module_path = self._file_to_module_path(relative_path)
+            self.modules.add(module_path)
+            
+            # Parse the file to collect components
+            self._parse_file(file_path, relative_path, module_path)
         
         # Second pass: resolve dependencies
         self._resolve_dependencies()
@@ -356,36 +398,147 @@ class DependencyParser:
         logger.info(f"Found {len(self.components)} code components")
         return self.components
     
+    def parse_file(self, file_path: str) -> Dict[str, CodeComponent]:
+        """
+        Re-parse a single Python file and refresh the components it defines.
+        
+        Dependencies are resolved against the modules and components already known
+        to this parser, so this is meant to be called after parse_repository, e.g.
+        to pick up new line numbers once a docstring has been written to the file.
+        
+        Args:
+            file_path: Path to a Python file inside the repository.
+            
+        Returns:
+            Dictionary of the refreshed components in that file, keyed by component ID.
+        """
+        with self._lock:
+            relative_path = os.path.relpath(file_path, self.repo_path)
+            module_path = self._file_to_module_path(relative_path)
+            self.modules.add(module_path)
+            
+            file_components = self._parse_file(file_path, relative_path, module_path)
+            self._resolve_dependencies(file_components)
+            self._add_class_method_dependencies(file_components)
+            return file_components
+    
+    def invalidate(self, file_path: str):
+        """
+        Forget everything parsed from a file: its cached source and its components.
+        
+        Args:
+            file_path: Path to a Python file inside the repository.
+        """
+        with self._lock:
+            self._source_cache.pop(file_path, None)
+            self._tree_cache.pop(file_path, None)
+            for component_id in self._file_components.pop(file_path, ()):
+                self.components.pop(component_id, None)
+    
+    def reparse_file(self, file_path: str) -> Dict[str, CodeComponent]:
+        """
+        Update the parser in place after a file has changed.
+        
+        The file is parsed again without trusting its cached source (a rewrite
+        within the same mtime tick would otherwise go unnoticed). Its components
+        are replaced in place and definitions removed from the file are dropped
+        afterwards, so other threads never see a component of the file missing.
+        Re-parses are serialized, and components whose source code is unchanged
+        keep their token count.
+        
+        Args:
+            file_path: Path to a Python file inside the repository.
+            
+        Returns:
+            Dictionary of the file's components after the change, keyed by component ID.
+        """
+        with self._lock:
+            previous_components = {
+                component_id: self.components[component_id]
+                for component_id in self._file_components.get(file_path, ())
+                if component_id in self.components
+            }
+            self._source_cache.pop(file_path, None)
+            self._tree_cache.pop(file_path, None)
+            file_components = self.parse_file(file_path)
+            
+            for component_id, previous in previous_components.items():
+                component = file_components.get(component_id)
+                if component is None:
+                    self.components.pop(component_id, None)
+                elif previous.source_code == component.source_code:
+                    component.token_count = previous.token_count
+            return file_components
+    
+    def _read_source(self, file_path: str) -> str:
+        """Read a file's source, reusing the cached text while its mtime is unchanged."""
+        mtime = os.path.getmtime(file_path)
+        cached = self._source_cache.get(file_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        with open(file_path, "r", encoding="utf-8") as f:
+            source = f.read()
+        self._source_cache[file_path] = (mtime, source)
+        return source
+    
+    def _load_file(self, file_path: str) -> Tuple[str, ast.AST, ImportCollector]:
+        """Read and parse a file once, sharing its tree and imports across passes."""
+        source = self._read_source(file_path)
+        cached = self._tree_cache.get(file_path)
+        if cached is not None and cached[0] is source:
+            return cached
+        
+        tree = parse_source(source, file_path)
+        
+        # Add parent field to AST nodes for easier traversal
+        add_parent_to_nodes(tree)
+        
+        # Collect imports
+        import_collector = ImportCollector()
+        import_collector.visit(tree)
+        
+        self._tree_cache[file_path] = (source, tree, import_collector)
+        return source, tree, import_collector
+    
+    def _prefetch_sources(self, file_paths: List[str]):
+        """Read a batch of files into the source cache on a thread pool."""
+        def read(file_path: str):
+            try:
+                self._read_source(file_path)
+            except (OSError, UnicodeDecodeError):
+                # Reported (or raised) when the file is parsed
+                pass
+        
+        with ThreadPoolExecutor() as executor:
+            for _ in executor.map(read, file_paths):
+                pass
+    
     def _file_to_module_path(self, file_path: str) -> str:
         """Convert a file path to a Python module path."""
         # Remove .py extension and convert / to .
         path = file_path[:-3] if file_path.endswith(".py") else file_path
         return path.replace(os.path.sep, ".")
     
-    def _parse_file(self, file_path: str, relative_path: str, module_path: str):
+    def _parse_file(self, file_path: str, relative_path: str, module_path: str) -> Dict[str, CodeComponent]:
         """Parse a single Python file to collect code components."""
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                source = f.read()
-            
-            tree = ast.parse(source)
-            
-            # Add parent field to AST nodes for easier traversal
-            add_parent_to_nodes(tree)
-            
-            # Collect imports
-            import_collector = ImportCollector()
-            import_collector.visit(tree)
+            source, tree, _ = self._load_file(file_path)
             
             # Collect code components
-            self._collect_components(tree, file_path, relative_path, module_path, source)
+            file_components = self._collect_components(tree, file_path, relative_path, module_path, source)
             
         except (SyntaxError, UnicodeDecodeError) as e:
             logger.warning(f"Error parsing {file_path}: {e}")
+            file_components = {}
+        
+        self._file_components[file_path] = set(file_components)
+        return file_components
     
     def _collect_components(self, tree: ast.AST, file_path: str, relative_path: str, 
-                          module_path: str, source: str):
+                          module_path: str, source: str) -> Dict[str, CodeComponent]:
         """Collect all code components (functions, classes, methods) from an AST."""
+        collected = {}
         for node in ast.walk(tree):
             if isinstance(node, ast.ClassDef):
                 # Class definition
@@ -415,7 +568,7 @@ class DependencyParser:
                     docstring=docstring
                 )
                 
-                self.components[class_id] = component
+                self.components[class_id] = collected[class_id] = component
                 
                 # Collect methods within the class
                 for item in node.body:
@@ -446,7 +599,7 @@ class DependencyParser:
                             docstring=method_docstring
                         )
                         
-                        self.components[method_id] = method_component
+                        self.components[method_id] = collected[method_id] = method_component
             
             elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
                 # Only collect top-level functions
@@ -477,28 +630,26 @@ class DependencyParser:
                         docstring=docstring
                     )
                     
-                    self.components[func_id] = component
+                    self.components[func_id] = collected[func_id] = component
+        
+        return collected
     
-    def _resolve_dependencies(self):
+    def _resolve_dependencies(self, components: Optional[Dict[str, CodeComponent]] = None):
         """
         Second pass to resolve dependencies between components.
+        
+        Args:
+            components: Components to resolve; defaults to all parsed components.
         """
-        for component_id, component in self.components.items():
+        if components is None:
+            components = self.components
+        
+        for component_id, component in components.items():
             file_path = component.file_path
             
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    source = f.read()
-                
-                # Parse file to get imports
-                tree = ast.parse(source)
-                
-                # Add parent field to AST nodes for easier traversal
-                add_parent_to_nodes(tree)
-                
-                # Collect imports
-                import_collector = ImportCollector()
-                import_collector.visit(tree)
+                # Reuse the tree and imports collected in the first pass
+                _, tree, import_collector = self._load_file(file_path)
                 
                 # Find the component node in the tree
                 component_node = None
@@ -563,15 +714,21 @@ class DependencyParser:
             except (SyntaxError, UnicodeDecodeError) as e:
                 logger.warning(f"Error analyzing dependencies in {file_path}: {e}")
     
-    def _add_class_method_dependencies(self):
+    def _add_class_method_dependencies(self, components: Optional[Dict[str, CodeComponent]] = None):
         """
         Third pass to make classes dependent on their methods (except __init__).
+        
+        Args:
+            components: Components to process; defaults to all parsed components.
         """
+        if components is None:
+            components = self.components
+        
         # Group components by class
         class_methods = {}
         
         # Collect all methods for each class
-        for component_id, component in self.components.items():
+        for component_id, component in components.items():
             if component.component_type == "method":
                 parts = component_id.split(".")
                 if len(parts) >= 2:
@@ -587,8 +744,8 @@ class DependencyParser:
         
         # Add method dependencies to their classes
         for class_id, method_ids in class_methods.items():
-            if class_id in self.components:
-                class_component = self.components[class_id]
+            if class_id in components:
+                class_component = components[class_id]
                 for method_id in method_ids:
                     class_component.depends_on.add(method_id)
     
@@ -639,8 +796,12 @@ class DependencyParser:
         # Create directories if they don't exist
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(serializable_components, f, indent=2)
+        if orjson is not None:
+            with open(output_path, "wb") as f:
+                f.write(orjson.dumps(serializable_components, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_path, "w", encoding="utf-8") as f:
+                json.dump(serializable_components, f, indent=2)
         
         logger.info(f"Saved dependency graph to {output_path}")
     
@@ -24,51 +24,66 @@ def detect_cycles(graph: Dict[str, Set[str]]) -> List[List[str]]:
     Returns:
         A list of lists, where each inner list contains the nodes in a cycle
     """
-    # Implementation of Tarjan's algorithm
-    index_counter = [0]
+    # Implementation of Tarjan's algorithm, with an explicit stack of
+    # (node, successor iterator) frames instead of recursion so deep
+    # dependency chains cannot hit Python's recursion limit
+    index_counter = 0
     index = {}  # node -> index
     lowlink = {}  # node -> lowlink value
     onstack = set()  # nodes currently on the stack
     stack = []  # stack of nodes
     result = []  # list of cycles (strongly connected components)
     
-    def strongconnect(node):
+    def push(node):
         # Set the depth index for node
-        index[node] = index_counter[0]
-        lowlink[node] = index_counter[0]
-        index_counter[0] += 1
+        nonlocal index_counter
+        index[node] = index_counter
+        lowlink[node] = index_counter
+        index_counter += 1
         stack.append(node)
         onstack.add(node)
-        
-        # Consider successors
-        for successor in graph.get(node, set()):
-            if successor not in index:
-                # Successor has not yet been visited; recurse on it
-                strongconnect(successor)
-                lowlink[node] = min(lowlink[node], lowlink[successor])
-            elif successor in onstack:
-                # Successor is on the stack and hence in the current SCC
-                lowlink[node] = min(lowlink[node], index[successor])
-        
-        # If node is a root node, pop the stack and generate an SCC
-        if lowlink[node] == index[node]:
-            # Start a new strongly connected component
-            scc = []
-            while True:
-                successor = stack.pop()
-                onstack.remove(successor)
-                scc.append(successor)
-                if successor == node:
-                    break
-            
-            # Only include SCCs with more than one node (actual cycles)
-            if len(scc) > 1:
-                result.append(scc)
+        return (node, iter(graph.get(node, set())))
     
     # Visit each node
-    for node in graph:
-        if node not in index:
-            strongconnect(node)
+    for start in graph:
+        if start in index:
+            continue
+        
+        frames = [push(start)]
+        while frames:
+            node, successors = frames[-1]
+            
+            # Consider successors
+            for successor in successors:
+                if successor not in index:
+                    # Successor has not yet been visited; descend into it
+                    frames.append(push(successor))
+                    break
+                elif successor in onstack:
+                    # Successor is on the stack and hence in the current SCC
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                frames.pop()
+                
+                # If node is a root node, pop the stack and generate an SCC
+                if lowlink[node] == index[node]:
+                    # Start a new strongly connected component
+                    scc = []
+                    while True:
+                        successor = stack.pop()
+                        onstack.remove(successor)
+                        scc.append(successor)
+                        if successor == node:
+                            break
+                    
+                    # Only include SCCs with more than one node (actual cycles)
+                    if len(scc) > 1:
+                        result.append(scc)
+                
+                # Propagate the lowlink to the node we descended from
+                if frames:
+                    parent = frames[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
     
     return result
 
@@ -203,33 +218,51 @@ def dependency_first_dfs(graph: Dict[str, Set[str]]) -> List[str]:
         logger.warning("No root nodes found in the graph, using arbitrary starting point")
         root_nodes = list(acyclic_graph.keys())[:1]  # Use the first node as starting point
     
-    # Track visited nodes
-    visited = set()
-    result = []
-    
-    # DFS function that processes dependencies first
-    def dfs(node):
-        if node in visited:
-            return
-        visited.add(node)
-        
-        # Visit all dependencies first
-        for dep in sorted(acyclic_graph.get(node, set())):
-            dfs(dep)
-        
-        # Add this node to the result after all its dependencies
-        result.append(node)
-    
     # Start DFS from each root node
-    for root in sorted(root_nodes):
-        dfs(root)
+    visited = set()
+    result = _dfs_postorder(acyclic_graph, sorted(root_nodes), visited)
     
     # Check if all nodes were visited
     if len(result) != len(acyclic_graph):
         # Some nodes weren't visited - try to visit remaining nodes
-        for node in sorted(acyclic_graph.keys()):
-            if node not in visited:
-                dfs(node)
+        result.extend(_dfs_postorder(acyclic_graph, sorted(acyclic_graph.keys()), visited))
+    
+    return result
+
+def _dfs_postorder(graph: Dict[str, Set[str]], start_nodes: List[str], visited: Set[str]) -> List[str]:
+    """
+    Iterative depth-first traversal emitting each node after all of its dependencies.
+    
+    Equivalent to a recursive DFS that visits dependencies in sorted order, but
+    keeps its own stack, so long dependency chains cannot hit Python's recursion limit.
+    
+    Args:
+        graph: A dependency graph with natural direction (A→B if A depends on B)
+        start_nodes: Nodes to start traversals from, in order
+        visited: Nodes already visited, updated in place
+    
+    Returns:
+        Newly visited nodes in an order where dependencies come before their dependents
+    """
+    result = []
+    
+    for start in start_nodes:
+        if start in visited:
+            continue
+        visited.add(start)
+        stack = [(start, iter(sorted(graph.get(start, set()))))]
+        while stack:
+            node, deps = stack[-1]
+            # Descend into the next unvisited dependency
+            for dep in deps:
+                if dep not in visited:
+                    visited.add(dep)
+                    stack.append((dep, iter(sorted(graph.get(dep, set())))))
+                    break
+            else:
+                # All dependencies done, add this node to the result
+                stack.pop()
+                result.append(node)
     
     return result
 
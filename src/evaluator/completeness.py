@@ -1,7 +1,8 @@
 # Copyright (c) Meta Platforms, Inc. and affiliates
 import ast
 import re
-from typing import Dict, List, Optional
+from collections import deque
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 from evaluator.base import BaseEvaluator
 
@@ -20,12 +21,37 @@ class CompletenessEvaluator(BaseEvaluator):
         weights (List[float]): Weights for each element in scoring.
     """
 
+    # Requirement mappings shared across evaluations, keyed by element names
+    # and required sections
+    _required_maps: Dict[Tuple[Tuple[str, ...], FrozenSet[str]], Dict[str, bool]] = {}
+
     def __init__(self, name: str, description: str):
         super().__init__(name=name, description=description)
         self.element_scores: Dict[str, bool] = {}
         self.element_required: Dict[str, bool] = {}
         self.weights: List[float] = []
 
+    def _required_map(self, required_sections: List[str]) -> Dict[str, bool]:
+        """
+        Returns the element requirement mapping for a set of required sections.
+
+        Evaluations with the same required sections share a single mapping
+        instead of building a new dictionary per node, so the returned
+        dictionary must be treated as read-only.
+
+        Args:
+            required_sections (List[str]): Names of the required sections.
+
+        Returns:
+            Dict[str, bool]: Whether each element is required, in element order.
+        """
+        key = (tuple(self.element_scores), frozenset(required_sections))
+        required = self._required_maps.get(key)
+        if required is None:
+            required = {el: el in required_sections for el in self.element_scores}
+            self._required_maps[key] = required
+        return required
+
     def evaluate(self, node: ast.AST) -> float:
         """
         Evaluates the completeness of a docstring.
@@ -319,10 +345,8 @@ class ClassCompletenessEvaluator(CompletenessEvaluator):
         self.required_sections = self._get_required_sections(node)
 
         # Reset scores and update requirements
-        self.element_scores = {key: False for key in self.element_scores}
-        self.element_required = {
-            key: key in self.required_sections for key in self.element_scores
-        }
+        self.element_scores = dict.fromkeys(self.element_scores, False)
+        self.element_required = self._required_map(self.required_sections)
 
         docstring = ast.get_docstring(node)
         if not docstring:
@@ -595,10 +619,8 @@ class FunctionCompletenessEvaluator(CompletenessEvaluator):
         self.required_sections = self._get_required_sections(node)
 
         # Reset scores and update requirements
-        self.element_scores = {key: False for key in self.element_scores}
-        self.element_required = {
-            key: key in self.required_sections for key in self.element_scores
-        }
+        self.element_scores = dict.fromkeys(self.element_scores, False)
+        self.element_required = self._required_map(self.required_sections)
 
         docstring = ast.get_docstring(node)
         if not docstring:
@@ -735,48 +757,44 @@ class FunctionCompletenessEvaluator(CompletenessEvaluator):
         Returns:
             bool: True if the function has any uncaught raise statements.
         """
-        for child in ast.walk(node):
-            if isinstance(child, ast.Raise):
-                # Check if this raise is inside a try-except block
-                parent = child
-                while parent != node:
-                    if isinstance(parent, ast.ExceptHandler):
-                        # Exception is caught, skip this raise
-                        break
-                    parent = next(
-                        p
-                        for p in ast.walk(node)
-                        if any(
-                            isinstance(c, type(parent)) and c is parent
-                            for c in ast.iter_child_nodes(p)
-                        )
-                    )
-                else:
-                    # No except handler found, exception bubbles up
-                    return True
-
-        # Also check any function calls that may raise
-        for child in ast.walk(node):
-            if isinstance(child, ast.Call):
-                # Here we could recursively check called functions
-                # but for now we'll assume any uncaught function call
-                # could potentially raise
-                try:
-                    parent = child
-                    while parent != node:
-                        if isinstance(parent, ast.ExceptHandler):
-                            break
-                        parent = next(
-                            p
-                            for p in ast.walk(node)
-                            if any(
-                                isinstance(c, type(parent)) and c is parent
-                                for c in ast.iter_child_nodes(p)
-                            )
-                        )
-                    else:
-                        return True
-                except StopIteration:
-                    continue
+        # Walk the function breadth-first, recording each node's parent as it
+        # is reached; ancestors are always visited first, so the parent chain
+        # of a node is known by the time it is checked
+        parents: Dict[ast.AST, ast.AST] = {}
+        pending = deque([node])
+        while pending:
+            child = pending.popleft()
+            # Any raise, or any function call (which we assume could raise),
+            # that is not inside an except handler bubbles up to the caller
+            if isinstance(child, (ast.Raise, ast.Call)) and self._escapes_handlers(
+                child, node, parents
+            ):
+                return True
+            for grandchild in ast.iter_child_nodes(child):
+                parents.setdefault(grandchild, child)
+                pending.append(grandchild)
 
         return False
+
+    @staticmethod
+    def _escapes_handlers(
+        child: ast.AST, node: ast.FunctionDef, parents: Dict[ast.AST, ast.AST]
+    ) -> bool:
+        """
+        Checks whether a node inside a function is outside every except handler.
+
+        Args:
+            child (ast.AST): The node to check, typically a raise or a call.
+            node (ast.FunctionDef): The enclosing function definition node.
+            parents (Dict[ast.AST, ast.AST]): Parent of each node within the function.
+
+        Returns:
+            bool: True if no ancestor of the node up to the function is an except handler.
+        """
+        parent = child
+        while parent is not node:
+            if isinstance(parent, ast.ExceptHandler):
+                # Exception is caught
+                return False
+            parent = parents[parent]
+        return True
@@ -4,7 +4,13 @@ import os
 import re
 import sys
 from typing import List, Dict, Any, Set, Tuple
-import google.generativeai as genai
+try:
+    import google.generativeai as genai
+except ImportError as e:
+    # Gemini is an optional provider; this evaluator cannot run without it
+    raise ImportError(
+        'The truthfulness evaluator requires the "gemini" extra: pip install -e ".[gemini]"'
+    ) from e
 from tqdm import tqdm
 import pandas as pd
 from collections import defaultdict
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for re-parsing changed files with DependencyParser."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.dependency_analyzer import DependencyParser
+
+ORIGINAL_SOURCE = '''\
+def helper():
+    return 1
+
+
+def caller():
+    return helper() + 1
+
+
+def removed():
+    return 2
+'''
+
+CHANGED_SOURCE = '''\
+def helper():
+    return 1
+
+
+def caller():
+    return helper() + 2
+'''
+
+
+def test_reparse_file_replaces_components_in_place(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_text(ORIGINAL_SOURCE)
+    parser = DependencyParser(str(tmp_path))
+    components = parser.parse_repository()
+    assert set(components) == {"module.helper", "module.caller", "module.removed"}
+    assert "module.helper" in components["module.caller"].depends_on
+
+    for component in components.values():
+        component.token_count = 42
+
+    module.write_text(CHANGED_SOURCE)
+    file_components = parser.reparse_file(str(module))
+
+    assert set(file_components) == {"module.helper", "module.caller"}
+    # The parser's own dictionary is updated, and removed definitions are gone
+    assert parser.components is components
+    assert set(components) == {"module.helper", "module.caller"}
+    assert components["module.caller"] is file_components["module.caller"]
+    assert "helper() + 2" in components["module.caller"].source_code
+    assert "module.helper" in components["module.caller"].depends_on
+
+    # Token counts survive only for unchanged source code
+    assert components["module.helper"].token_count == 42
+    assert components["module.caller"].token_count is None
+
+
+def test_invalidate_drops_file_components(tmp_path):
+    (tmp_path / "first.py").write_text("def one():\n    return 1\n")
+    (tmp_path / "second.py").write_text("def two():\n    return 2\n")
+    parser = DependencyParser(str(tmp_path))
+    components = parser.parse_repository()
+
+    parser.invalidate(str(tmp_path / "first.py"))
+    assert set(components) == {"second.two"}
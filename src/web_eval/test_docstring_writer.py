@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for splicing docstrings into source files."""
+
+import ast
+import os
+import sys
+
+import pytest
+
+# The progress visualizer imported by generate_docstrings needs these
+pytest.importorskip("colorama")
+pytest.importorskip("tqdm")
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+for path in (_REPO_ROOT, os.path.join(_REPO_ROOT, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from generate_docstrings import set_docstring_in_file
+from src.dependency_analyzer import CodeComponent
+
+
+def make_component(file_path: str, component_id: str, component_type: str) -> CodeComponent:
+    """Create a component that only carries what set_docstring_in_file looks at."""
+    return CodeComponent(
+        id=component_id,
+        node=None,
+        component_type=component_type,
+        file_path=file_path,
+        relative_path=os.path.basename(file_path)
+    )
+
+
+def write_docstring(tmp_path, source: str, component_id: str, component_type: str, docstring: str) -> str:
+    """Write a docstring into a module with the given source and return the new source."""
+    module = tmp_path / "module.py"
+    module.write_text(source, encoding="utf-8")
+    component = make_component(str(module), component_id, component_type)
+    assert set_docstring_in_file(str(module), component, docstring)
+    return module.read_text(encoding="utf-8")
+
+
+def test_inserts_docstring_and_keeps_comments(tmp_path):
+    source = (
+        "import os  # used below\n"
+        "\n"
+        "def f(x):\n"
+        "    # add one\n"
+        "    return x + 1\n"
+    )
+    result = write_docstring(tmp_path, source, "module.f", "function", "Add one to x.")
+
+    assert "import os  # used below\n" in result
+    assert "    # add one\n" in result
+    assert result.endswith("    return x + 1\n")
+    assert ast.get_docstring(ast.parse(result).body[1]) == "Add one to x."
+
+
+def test_replaces_existing_docstring(tmp_path):
+    source = (
+        "class A:\n"
+        "    def m(self):\n"
+        "        '''Old.'''\n"
+        "        return 1  # one\n"
+    )
+    result = write_docstring(tmp_path, source, "module.A.m", "method", "New docstring.")
+
+    assert "Old." not in result
+    assert "return 1  # one" in result
+    method = ast.parse(result).body[0].body[0]
+    assert ast.get_docstring(method) == "New docstring."
+
+
+def test_inserts_above_decorated_first_statement(tmp_path):
+    source = (
+        "class A:\n"
+        "    @property\n"
+        "    def value(self):\n"
+        "        return 'é'\n"
+    )
+    result = write_docstring(tmp_path, source, "module.A", "class", "Holds a value.")
+
+    class_node = ast.parse(result).body[0]
+    assert ast.get_docstring(class_node) == "Holds a value."
+    assert "    @property\n    def value(self):\n" in result
+
+
+def test_body_on_header_line_falls_back_to_unparse(tmp_path):
+    result = write_docstring(tmp_path, "def f(): return 1\n", "module.f", "function", "Return one.")
+    assert ast.get_docstring(ast.parse(result).body[0]) == "Return one."
+
+
+def test_missing_component_is_reported(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_text("def f():\n    return 1\n")
+    component = make_component(str(module), "module.g", "function")
+    assert not set_docstring_in_file(str(module), component, "Missing.")
+
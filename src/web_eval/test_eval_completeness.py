@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests that the parallel process_directory matches evaluating files one by one."""
+
+import os
+import sys
+from typing import Any, Dict
+
+import pytest
+
+# eval_completeness prints its tables with tabulate
+pytest.importorskip("tabulate")
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+for path in (_REPO_ROOT, os.path.join(_REPO_ROOT, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from eval_completeness import iter_python_files, process_directory, run_docstring_tests
+
+SOURCES = {
+    "documented.py": '''\
+class Parser:
+    """
+    Parse configuration files.
+
+    Attributes:
+        path: Location of the file.
+
+    Example:
+        >>> Parser("a.cfg")
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self, encoding="utf-8"):
+        """
+        Read the file.
+
+        Args:
+            encoding: Text encoding.
+
+        Returns:
+            The file content.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+        with open(self.path, encoding=encoding) as f:
+            return f.read()
+''',
+    "bare.py": '''\
+def add(a, b):
+    return a + b
+
+
+async def fetch(url):
+    """Fetch a URL."""
+    raise NotImplementedError(url)
+''',
+    "pkg/nested.py": '''\
+class Empty:
+    pass
+
+
+def helper(values):
+    """
+    Sum values.
+
+    Args:
+        values: Numbers to add.
+
+    Returns:
+        The sum.
+    """
+    return sum(values)
+''',
+    "pkg/constants.py": "LIMIT = 10\n",
+    "broken.py": "def broken(:\n    pass\n",
+}
+
+
+@pytest.fixture
+def sample_directory(tmp_path):
+    """A directory tree with documented, undocumented and unparsable files."""
+    for relative_path, source in SOURCES.items():
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+    return str(tmp_path)
+
+
+def serial_results(directory: str) -> Dict[str, Any]:
+    """Evaluate every file in order with run_docstring_tests."""
+    files, classes, functions = [], [], []
+    failed_files = 0
+    for py_file in iter_python_files(directory):
+        file_result = run_docstring_tests(py_file)
+        if file_result['status'] != 'success':
+            failed_files += 1
+            continue
+        files.append(py_file)
+        classes.extend(file_result['classes'])
+        functions.extend(file_result['functions'])
+    return {'files': files, 'classes': classes, 'functions': functions, 'failed_files': failed_files}
+
+
+@pytest.mark.parametrize("max_workers", [1, 2, 4])
+def test_process_directory_matches_serial_evaluation(sample_directory, max_workers):
+    expected = serial_results(sample_directory)
+    results = process_directory(sample_directory, max_workers=max_workers)
+
+    assert results['status'] == 'success'
+    assert results['files'] == expected['files']
+    assert results['classes'] == expected['classes']
+    assert results['functions'] == expected['functions']
+
+    statistics = results['statistics']
+    assert statistics['total_files'] == len(SOURCES)
+    assert statistics['failed_files'] == expected['failed_files'] == 1
+    assert statistics['total_classes'] == len(expected['classes'])
+    assert statistics['total_functions'] == len(expected['functions'])
+    scores = [item.completeness_score for item in expected['classes'] + expected['functions']]
+    assert statistics['overall_average_score'] == pytest.approx(sum(scores) / len(scores))
+
+
+def test_process_directory_cache_returns_the_same_results(sample_directory, tmp_path_factory):
+    cache_dir = str(tmp_path_factory.mktemp("cache"))
+    first = process_directory(sample_directory, max_workers=2, cache_dir=cache_dir)
+    second = process_directory(sample_directory, max_workers=2, cache_dir=cache_dir)
+
+    assert second['files'] == first['files']
+    assert second['classes'] == first['classes']
+    assert second['functions'] == first['functions']
+    assert second['statistics'] == first['statistics']
+
+
+def test_process_directory_reports_each_copy_of_identical_files(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("copies")
+    for index in range(7):
+        (directory / f"copy_{index}.py").write_text(SOURCES["pkg/nested.py"])
+    cache_dir = str(tmp_path_factory.mktemp("cache"))
+
+    for options in ({}, {'cache_dir': cache_dir}):
+        results = process_directory(str(directory), max_workers=1, **options)
+        expected = serial_results(str(directory))
+        assert results['files'] == expected['files']
+        assert [item.file for item in results['functions']] == [item.file for item in expected['functions']]
+        assert results['statistics']['total_functions'] == len(expected['functions'])
+
+
+def test_process_directory_without_python_files(tmp_path):
+    results = process_directory(str(tmp_path), max_workers=2)
+    assert results['status'] == 'error'
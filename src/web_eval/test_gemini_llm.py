@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for GeminiLLM, run against a fake google.generativeai module."""
+
+import importlib
+import os
+import sys
+import types
+from typing import Any, Dict, List
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class FakeChat:
+    """Chat session of the fake Gemini SDK."""
+
+    def __init__(self, history: List[Dict[str, str]]):
+        self.history = list(history)
+        self.sent: List[str] = []
+
+    def send_message(self, content: str) -> Any:
+        self.sent.append(content)
+        return types.SimpleNamespace(text=f"reply {len(self.sent)}")
+
+
+class FakeGenerativeModel:
+    """Model of the fake Gemini SDK, recording the chat sessions it starts."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.chats: List[FakeChat] = []
+        self.contents: List[str] = []
+
+    def start_chat(self, history: List[Dict[str, str]]) -> FakeChat:
+        chat = FakeChat(history)
+        self.chats.append(chat)
+        return chat
+
+    def generate_content(self, content: str, generation_config: Dict[str, Any]) -> Any:
+        self.contents.append(content)
+        return types.SimpleNamespace(text="single reply")
+
+
+@pytest.fixture
+def gemini_llm(monkeypatch):
+    """A GeminiLLM backed by a fake google.generativeai module."""
+    pytest.importorskip("tiktoken")
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda api_key: None
+    genai.GenerativeModel = FakeGenerativeModel
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+
+    # The module imported below is bound to the fakes; registering placeholders makes
+    # monkeypatch undo what the import adds. The package dict is patched directly
+    # because getattr on the package would run its lazy import.
+    package_dict = vars(importlib.import_module("agent.llm"))
+    for namespace, name in (
+        (sys.modules, "agent.llm.gemini_llm"), (package_dict, "gemini_llm"), (package_dict, "GeminiLLM")
+    ):
+        monkeypatch.setitem(namespace, name, None)
+        monkeypatch.delitem(namespace, name)
+    gemini_module = importlib.import_module("agent.llm.gemini_llm")
+    return gemini_module.GeminiLLM(api_key="key", model="gemini-test")
+
+
+def test_gemini_folds_system_prompt_into_first_user_message(gemini_llm):
+    convert = gemini_llm._convert_messages_to_gemini_format
+    assert convert([
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello"}
+    ]) == [
+        {"role": "user", "parts": "Be brief.\n\nHi"},
+        {"role": "model", "parts": "Hello"}
+    ]
+    assert convert([
+        {"role": "system", "content": "Be brief."},
+        {"role": "assistant", "content": "Hello"}
+    ]) == [
+        {"role": "user", "parts": "Be brief."},
+        {"role": "model", "parts": "Hello"}
+    ]
+    assert convert([{"role": "system", "content": "Be brief."}]) == [{"role": "user", "parts": "Be brief."}]
+
+
+def test_gemini_reuses_chat_session_for_continued_conversation(gemini_llm):
+    messages = [
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "First"},
+        {"role": "assistant", "content": "Answer"},
+        {"role": "user", "content": "Second"}
+    ]
+    assert gemini_llm.generate(messages) == "reply 1"
+    assert len(gemini_llm.model.chats) == 1
+    assert gemini_llm.model.chats[0].history == [
+        {"role": "user", "parts": "Be brief.\n\nFirst"},
+        {"role": "model", "parts": "Answer"}
+    ]
+
+    # Continuing from the last reply sends on the same session
+    messages += [{"role": "assistant", "content": "reply 1"}, {"role": "user", "content": "Third"}]
+    assert gemini_llm.generate(messages) == "reply 2"
+    assert len(gemini_llm.model.chats) == 1
+    assert gemini_llm.model.chats[0].sent == ["Second", "Third"]
+
+    # A different history starts a new session
+    assert gemini_llm.generate(messages[:2] + [{"role": "assistant", "content": "Other"}, messages[3]]) == "reply 1"
+    assert len(gemini_llm.model.chats) == 2
+
+    # A lone message skips the chat API
+    assert gemini_llm.generate([{"role": "user", "content": "Only"}]) == "single reply"
+    assert gemini_llm.model.contents == ["Only"]
+    assert gemini_llm.rate_limiter.total_requests == 4
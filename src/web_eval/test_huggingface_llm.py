@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for truncating HuggingFaceLLM prompts to the input token limit."""
+
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class FakeEncoding:
+    """Character-level stand-in for a tiktoken Encoding, so no BPE file is downloaded."""
+
+    def encode_ordinary(self, text):
+        return [ord(char) for char in text]
+
+    def encode_ordinary_batch(self, texts):
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, tokens):
+        return "".join(map(chr, tokens))
+
+
+@pytest.fixture
+def huggingface_module(monkeypatch):
+    """The huggingface_llm module, imported with fake openai, torch and tokenizer."""
+    pytest.importorskip("tiktoken")
+    openai = types.ModuleType("openai")
+    openai.OpenAI = lambda **kwargs: types.SimpleNamespace(**kwargs)
+    torch = types.ModuleType("torch")
+    torch.dtype = object
+    monkeypatch.setitem(sys.modules, "openai", openai)
+    monkeypatch.setitem(sys.modules, "torch", torch)
+
+    # The module imported below is bound to the fakes; registering placeholders makes
+    # monkeypatch undo what the import adds. The package dict is patched directly
+    # because getattr on the package would run its lazy import.
+    package_dict = vars(importlib.import_module("agent.llm"))
+    for namespace, name in (
+        (sys.modules, "agent.llm.huggingface_llm"),
+        (package_dict, "huggingface_llm"),
+        (package_dict, "HuggingFaceLLM")
+    ):
+        monkeypatch.setitem(namespace, name, None)
+        monkeypatch.delitem(namespace, name)
+    module = importlib.import_module("agent.llm.huggingface_llm")
+    monkeypatch.setattr(module, "encoding_for_model", lambda model: FakeEncoding())
+    return module
+
+
+def test_huggingface_keeps_messages_within_limit(huggingface_module):
+    llm = huggingface_module.HuggingFaceLLM(model_name="gpt-4o", max_input_tokens=1000)
+    messages = [
+        llm.format_message("system", "You write docstrings."),
+        llm.format_message("user", "Document this."),
+        llm.format_message("assistant", "Done.")
+    ]
+    assert llm._truncate_messages(messages) == messages
+
+
+def test_huggingface_truncates_oldest_tokens_of_user_message(huggingface_module):
+    llm = huggingface_module.HuggingFaceLLM(model_name="gpt-4o", max_input_tokens=100)
+    system = llm.format_message("system", "You write docstrings.")
+    long_user = llm.format_message("user", " ".join(f"word{i}" for i in range(400)))
+    result = llm._truncate_messages([system, llm.format_message("user", "Older"), long_user])
+
+    assert result[0] is system
+    assert len(result) == 2
+    truncated = result[1]["content"]
+    assert truncated.startswith(huggingface_module._TRUNCATION_MARKER)
+    assert truncated.endswith("word399")
+    assert "word0 " not in truncated
+    assert llm._count_tokens(result) <= 100
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for looking up component source with ASTNodeAnalyzer."""
+
+import ast
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.agent.tool.internal_traverse import ASTNodeAnalyzer
+
+ORIGINAL_SOURCE = '''\
+class Box:
+    def get(self):
+        return 1
+'''
+
+# A concurrent writer adds a docstring, shifting every line below it
+REWRITTEN_SOURCE = '''\
+"""Boxes."""
+
+
+class Box:
+    """Holds a value."""
+
+    def get(self):
+        """Return one."""
+        return 1
+'''
+
+
+def test_component_source_comes_from_the_parsed_text(tmp_path, monkeypatch):
+    package = tmp_path / "pkg"
+    package.mkdir()
+    module = package / "mod.py"
+    module.write_text(ORIGINAL_SOURCE)
+
+    reads = []
+    read_source = ASTNodeAnalyzer._read_source
+
+    def read_then_rewrite(full_path):
+        content = read_source(full_path)
+        reads.append(full_path)
+        module.write_text(REWRITTEN_SOURCE)
+        return content
+
+    monkeypatch.setattr(ASTNodeAnalyzer, "_read_source", staticmethod(read_then_rewrite))
+    analyzer = ASTNodeAnalyzer(str(tmp_path))
+    focal = ast.parse("value = 1\n")
+
+    assert analyzer.get_component_by_path(focal.body[0], focal, "pkg.mod.Box") == ORIGINAL_SOURCE.rstrip("\n")
+    module.write_text(ORIGINAL_SOURCE)
+    assert analyzer.get_component_by_path(focal.body[0], focal, "pkg.mod.Box.get") == (
+        "    def get(self):\n        return 1"
+    )
+    assert len(reads) == 2
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for the Store class of the raw test repository."""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+# The raw test repository is a package inside data/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data')))
+
+from raw_test_repo.inventory.inventory_manager import Store
+from raw_test_repo.models.product import Item
+
+
+def make_item(code: str, count: int = 1, exp=None) -> Item:
+    """Create an item with a fixed value."""
+    return Item(code=code, label=f"Item {code}", val=1.5, count=count, exp=exp)
+
+
+def test_store_find_follows_puts_and_removals():
+    store = Store(cap=3)
+    assert store.put(make_item("A"), pos=2)
+    assert store.put(make_item("B"), pos=0)
+    assert store.find("A") == 2
+    assert store.find("B") == 0
+    assert store.get_at(2) is store.get("A")
+
+    assert store.rm("A")
+    assert store.find("A") is None
+    assert store.get_at(2) is None
+    assert store.get("A") is None
+    assert not store.rm("A")
+    assert store.find("B") == 0
+
+
+def test_store_fills_lowest_free_slot():
+    store = Store(cap=3)
+    assert store.put(make_item("A"))
+    assert store.put(make_item("B"))
+    assert store.find("A") == 0
+    assert store.find("B") == 1
+
+    # A freed slot is handed out again before higher ones
+    assert store.rm("A")
+    assert store.put(make_item("C"))
+    assert store.find("C") == 0
+    assert store.put(make_item("D"))
+    assert store.find("D") == 2
+
+    # Every slot is taken now
+    assert not store.put(make_item("E"))
+
+
+def test_store_skips_slots_taken_by_explicit_positions():
+    store = Store(cap=3)
+    assert store.put(make_item("A"), pos=0)
+    assert not store.put(make_item("B"), pos=0)
+    assert not store.put(make_item("B"), pos=3)
+    assert not store.put(make_item("B"), pos=-1)
+
+    # Slot 0 is still in the free heap but occupied, so it is skipped
+    assert store.put(make_item("B"))
+    assert store.find("B") == 1
+
+
+def test_store_merges_counts_of_the_same_code():
+    store = Store(cap=2)
+    assert store.put(make_item("A", count=2))
+    # A duplicate code only adds its count, even with a position given
+    assert store.put(make_item("A", count=3), pos=1)
+    assert store.get("A").count == 5
+    assert store.find("A") == 0
+    assert store.get_at(1) is None
+
+
+def test_store_lists_only_valid_items_by_position():
+    store = Store(cap=4)
+    store.put(make_item("late"), pos=3)
+    store.put(make_item("empty", count=0), pos=0)
+    store.put(make_item("expired", exp=datetime.now() - timedelta(days=1)), pos=1)
+    store.put(make_item("fresh", exp=datetime.now() + timedelta(days=1)), pos=2)
+
+    assert [(pos, item.code) for pos, item in store.ls_with_pos()] == [(2, "fresh"), (3, "late")]
+    assert sorted(item.code for item in store.ls()) == ["fresh", "late"]
+    assert sorted(item.code for item in store.ls_list()) == ["fresh", "late"]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for the parallel component scheduler and atomic file writes."""
+
+import ast
+import os
+import stat
+import sys
+from typing import List, Tuple
+
+import pytest
+
+# The progress visualizer imported by generate_docstrings needs these
+pytest.importorskip("colorama")
+pytest.importorskip("tqdm")
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+for path in (_REPO_ROOT, os.path.join(_REPO_ROOT, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from generate_docstrings import _replace_file, process_components_parallel
+from src.dependency_analyzer import DependencyParser, build_graph_from_components, dependency_first_dfs
+
+
+class RecordingVisualizer:
+    """Stands in for ProgressVisualizer and records status updates in order."""
+
+    def __init__(self):
+        self.updates: List[Tuple[str, str]] = []
+
+    def update(self, component_id: str, status: str):
+        self.updates.append((component_id, status))
+
+
+def test_parallel_processing_documents_dependencies_first(tmp_path):
+    (tmp_path / "base.py").write_text(
+        "def helper():\n"
+        "    return 1\n"
+        "\n"
+        "\n"
+        "def other():\n"
+        "    return helper()\n"
+    )
+    (tmp_path / "user.py").write_text(
+        "from base import helper\n"
+        "\n"
+        "\n"
+        "class Service:\n"
+        "    def __init__(self):\n"
+        "        self.value = helper()\n"
+        "\n"
+        "    def run(self):\n"
+        "        return helper() + self.value\n"
+    )
+    parser = DependencyParser(str(tmp_path))
+    components = parser.parse_repository()
+    graph = build_graph_from_components(components)
+    sorted_components = dependency_first_dfs(graph)
+
+    remaining_by_file = {}
+    for component_id in sorted_components:
+        remaining_by_file.setdefault(components[component_id].file_path, set()).add(component_id)
+
+    visualizer = RecordingVisualizer()
+    process_components_parallel(
+        sorted_components, graph, components, parser,
+        orchestrators=[None, None, None],
+        visualizer=visualizer,
+        remaining_by_file=remaining_by_file,
+        test_mode="placeholder",
+        dependency_graph={},
+        overwrite_docstrings=False
+    )
+
+    # Every component finished, and none before the dependencies ordered ahead of it
+    finished = [component_id for component_id, status in visualizer.updates if status == "completed"]
+    assert sorted(finished) == sorted(sorted_components)
+    assert not any(status == "error" for _, status in visualizer.updates)
+    position = {component_id: index for index, component_id in enumerate(sorted_components)}
+    for component_id, status in visualizer.updates:
+        if status != "processing":
+            continue
+        started = visualizer.updates.index((component_id, status))
+        for dep in graph[component_id]:
+            if position.get(dep, len(position)) < position[component_id]:
+                assert visualizer.updates.index((dep, "completed")) < started
+
+    # Both files are still valid and everything but __init__ got a docstring
+    base = ast.parse((tmp_path / "base.py").read_text())
+    user = ast.parse((tmp_path / "user.py").read_text())
+    assert all(ast.get_docstring(node) for node in base.body)
+    service = user.body[1]
+    assert ast.get_docstring(service)
+    assert ast.get_docstring(service.body[2])
+    assert ast.get_docstring(service.body[1]) is None
+
+
+def test_replace_file_swaps_in_complete_content(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_text("def f():\n    return 1\n")
+    module.chmod(0o750)
+
+    _replace_file(str(module), "def f():\n    return 2\n")
+
+    assert module.read_text() == "def f():\n    return 2\n"
+    assert stat.S_IMODE(module.stat().st_mode) == 0o750
+    # The temporary copy was renamed over the file, not left behind
+    assert [path.name for path in tmp_path.iterdir()] == ["module.py"]
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for the Cash payment handler of the raw test repository."""
+
+import os
+import sys
+from decimal import Decimal
+
+# The raw test repository is a package inside data/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data')))
+
+from raw_test_repo.payment.payment_processor import Cash, TxStatus
+
+
+def test_cash_sums_in_whole_cents():
+    cash = Cash()
+    assert cash.bal == Decimal("0.00")
+    for amount in ("0.10", "0.20", "1.00"):
+        cash.add(Decimal(amount))
+    assert cash.bal == Decimal("1.30")
+
+    tx = cash.proc(Decimal("0.30"))
+    assert tx.st == TxStatus.DONE
+    assert tx.amt == Decimal("0.30")
+    assert cash.bal == Decimal("1.00")
+
+
+def test_cash_rounds_sub_cent_amounts_half_up():
+    cash = Cash()
+    cash.add(Decimal("0.005"))
+    assert cash.bal == Decimal("0.01")
+    cash.add(Decimal("0.004"))
+    assert cash.bal == Decimal("0.01")
+
+    # The charged amount is rounded the same way, and recorded as charged
+    tx = cash.proc(Decimal("0.0149"))
+    assert tx.st == TxStatus.DONE
+    assert tx.amt == Decimal("0.01")
+    assert cash.bal == Decimal("0.00")
+
+
+def test_cash_refunds_and_returns_balance():
+    cash = Cash()
+    cash.add(Decimal("2.00"))
+
+    failed = cash.proc(Decimal("2.50"))
+    assert failed.st == TxStatus.ERR
+    assert not cash.rev(failed)
+    assert cash.bal == Decimal("2.00")
+
+    tx = cash.proc(Decimal("1.25"))
+    assert cash.rev(tx)
+    assert tx.st == TxStatus.RET
+    assert not cash.rev(tx)
+    assert cash.bal == Decimal("2.00")
+
+    assert cash.ret() == Decimal("2.00")
+    assert cash.bal == Decimal("0.00")
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for the Item class of the raw test repository."""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# The raw test repository is a package inside data/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data')))
+
+from raw_test_repo.models.product import Item
+
+
+def test_item_check_uses_the_given_time():
+    exp = datetime(2024, 1, 1)
+    item = Item(code="A", label="Item A", val=1.5, count=1, exp=exp)
+    assert item.check(exp)
+    assert not item.check(exp + timedelta(seconds=1))
+    # An earlier call with a later time must not stick
+    assert item.check(exp - timedelta(days=1))
+
+    item.count = 0
+    assert not item.check(exp - timedelta(days=1))
+
+
+def test_item_price_follows_val():
+    item = Item(code="A", label="Item A", val=1.5, count=1)
+    assert item.price == Decimal("1.5")
+    assert item.price is item.price
+    item.val = 2.25
+    assert item.price == Decimal("2.25")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for reserving and committing RateLimiter capacity."""
+
+import asyncio
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.llm import rate_limiter as rate_limiter_module
+from agent.llm.rate_limiter import RateLimiter
+
+
+def make_rate_limiter(requests_per_minute: int = 100) -> RateLimiter:
+    """Create a rate limiter without a safety buffer."""
+    return RateLimiter(
+        provider="Test",
+        requests_per_minute=requests_per_minute,
+        input_tokens_per_minute=1000,
+        output_tokens_per_minute=1000,
+        input_token_price_per_million=1.0,
+        output_token_price_per_million=2.0,
+        buffer_percentage=0.0
+    )
+
+
+def booked(usage) -> int:
+    """Sum the token counts in a usage window."""
+    return sum(count for _, count in usage)
+
+
+def test_reserve_books_estimate_until_commit():
+    limiter = make_rate_limiter()
+    handle = limiter.reserve(10, 50)
+    assert len(limiter.request_timestamps) == 1
+    assert booked(limiter.input_token_usage) == 10
+    assert booked(limiter.output_token_usage) == 50
+    assert limiter.total_requests == 0
+
+    limiter.commit(handle, 12, 7)
+    assert len(limiter.request_timestamps) == 1
+    assert booked(limiter.input_token_usage) == 12
+    assert booked(limiter.output_token_usage) == 7
+    assert limiter.total_requests == 1
+    assert limiter.total_input_tokens == 12
+    assert limiter.total_output_tokens == 7
+    assert limiter.total_cost == pytest.approx(12 * 1e-6 + 7 * 2e-6)
+
+
+def test_reserve_defaults_output_estimate():
+    limiter = make_rate_limiter()
+    limiter.reserve(40)
+    assert booked(limiter.output_token_usage) == 20
+
+
+def test_areserve_sleeps_until_capacity_frees(monkeypatch):
+    clock = [1000.0]
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(rate_limiter_module, "time", types.SimpleNamespace(time=lambda: clock[0], sleep=None))
+    monkeypatch.setattr(rate_limiter_module, "asyncio", types.SimpleNamespace(sleep=fake_sleep))
+
+    limiter = make_rate_limiter(requests_per_minute=1)
+
+    async def reserve_twice():
+        first = await limiter.areserve(5, 5)
+        second = await limiter.areserve(5, 5)
+        return first, second
+
+    first, second = asyncio.run(reserve_twice())
+    assert sleeps == [60.0]
+    assert first[0][0] == 1000.0
+    assert second[0][0] == 1060.0
+
+    limiter.commit(first, 5, 1)
+    limiter.commit(second, 5, 1)
+    assert limiter.total_requests == 2
+
+
+def test_reserve_releases_lock_while_sleeping(monkeypatch):
+    clock = [1000.0]
+    lock_free_during_sleep = []
+
+    def fake_sleep(seconds):
+        lock_free_during_sleep.append(not limiter.lock.locked())
+        clock[0] += seconds
+
+    monkeypatch.setattr(rate_limiter_module, "time", types.SimpleNamespace(time=lambda: clock[0], sleep=fake_sleep))
+
+    limiter = make_rate_limiter(requests_per_minute=1)
+    limiter.reserve(5, 5)
+    second = limiter.reserve(5, 5)
+    assert second[0][0] == 1060.0
+
+    limiter = make_rate_limiter(requests_per_minute=1)
+    limiter.record_request(5, 5)
+    limiter.wait_if_needed(5, 5)
+
+    assert lock_free_during_sleep == [True, True]
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates
+# -*- coding: utf-8 -*-
+"""Tests for the persistent LLM response cache."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.llm.cache import ResponseCache, get_response_cache
+
+
+def test_response_cache_round_trip(tmp_path):
+    path = tmp_path / "cache" / "responses.sqlite"
+    messages = [{"role": "user", "content": "Document this function"}]
+    key = ResponseCache.make_key("model", messages, 0.1, 100)
+
+    cache = ResponseCache(str(path))
+    assert cache.get(key) is None
+    cache.set(key, "first")
+    cache.set(key, "second")
+    assert cache.get(key) == "second"
+
+    # Entries persist in the database file
+    assert ResponseCache(str(path)).get(key) == "second"
+
+
+def test_response_cache_keys():
+    messages = [{"role": "user", "content": "text"}]
+    key = ResponseCache.make_key("model", messages, 0.1, 100)
+
+    assert key == ResponseCache.make_key("model", [dict(messages[0])], 0.1, 100)
+    assert key == ResponseCache.make_key("model", messages, 0.1000001, 100)
+    assert key != ResponseCache.make_key("other", messages, 0.1, 100)
+    assert key != ResponseCache.make_key("model", [{"role": "system", "content": "text"}], 0.1, 100)
+    assert key != ResponseCache.make_key("model", messages, 0.2, 100)
+    assert key != ResponseCache.make_key("model", messages, 0.1, None)
+
+    # Lone surrogates cannot be encoded by every JSON library
+    surrogate = ResponseCache.make_key("model", [{"role": "user", "content": "\ud800"}], 0.1, 100)
+    assert surrogate != key
+
+
+def test_get_response_cache_shares_instances(tmp_path):
+    cache = get_response_cache(str(tmp_path / "responses.sqlite"))
+    assert get_response_cache(str(tmp_path / "." / "responses.sqlite")) is cache
+    assert get_response_cache(str(tmp_path / "other.sqlite")) is not cache